@@ -0,0 +1,456 @@
+# Bench/hotpaths.py
+"""
+Microbenchmarks for the trigger engine's hot paths.
+
+    python -m Bench.hotpaths                       # table to stdout
+    python -m Bench.hotpaths --json out.json       # machine-readable results
+    python -m Bench.hotpaths --compare base.json   # exit 1 on regressions
+    python -m Bench.hotpaths --only fanout,pool    # substring filter
+
+Every result is {"name", "params", "ns_per_op", "ops_per_sec", "runs"};
+ns_per_op is the median of `repeat` timed runs, each auto-sized to take
+at least `min_time` seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Importing the services builds the Polygon singleton, which insists on a key
+os.environ.setdefault("POLYGON_API_KEY", "bench")
+os.environ.setdefault("TICK_RECORDING", "0")
+
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+REGRESSION_THRESHOLD = 0.20     # 20% slower than baseline fails --compare
+
+
+# ==========================================================
+# HARNESS
+# ==========================================================
+class Suite:
+    def __init__(self, repeat: int = DEFAULT_REPEAT, min_time: float = DEFAULT_MIN_TIME,
+                 only: Optional[List[str]] = None):
+        self.repeat = repeat
+        self.min_time = min_time
+        self.only = only
+        self.results: List[Dict] = []
+
+    def wanted(self, name: str) -> bool:
+        return not self.only or any(f in name for f in self.only)
+
+    def run(self, name: str, fn: Callable[[], None], ops_per_call: int = 1, **params):
+        """Time fn() (a tight loop body). ops_per_call scales per-op numbers."""
+        if not self.wanted(name):
+            return
+        # Calibrate the inner loop count to roughly min_time per run
+        number = 1
+        while True:
+            t = self._time(fn, number)
+            if t >= self.min_time or number >= 1 << 24:
+                break
+            number *= 2 if t <= 0 else max(2, min(10, int(self.min_time / t * 1.2)))
+        runs = [self._time(fn, number) / (number * ops_per_call) for _ in range(self.repeat)]
+        self._record(name, params, runs)
+
+    def run_batch(self, name: str, fn: Callable[[], int], **params):
+        """fn() performs a whole batch itself and returns how many ops it did."""
+        if not self.wanted(name):
+            return
+        runs = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            ops = fn()
+            runs.append((time.perf_counter() - start) / max(ops, 1))
+        self._record(name, params, runs)
+
+    @staticmethod
+    def _time(fn, number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+
+    def _record(self, name, params, runs):
+        med = statistics.median(runs)
+        result = {
+            "name": name,
+            "params": params,
+            "ns_per_op": round(med * 1e9, 1),
+            "ops_per_sec": round(1 / med, 1) if med else None,
+            "runs": [round(r * 1e9, 1) for r in runs],
+        }
+        self.results.append(result)
+        label = name + (" " + " ".join(f"{k}={v}" for k, v in params.items()) if params else "")
+        print(f"{label:<44} {result['ns_per_op']:>14,.1f} ns/op {result['ops_per_sec'] or 0:>16,.0f} ops/s",
+              flush=True)
+
+
+# ==========================================================
+# BENCHMARKS
+# ==========================================================
+def _order(right: str = "C", trigger: float = 250.0):
+    from Helpers.Order import Order
+    order = Order("TSLA", "20251219", 250.0, right, 3, 4.25, 6.5, 1.25, trigger=trigger)
+    order.set_position_size(1500.0)
+    return order
+
+
+def bench_order(suite: Suite):
+    from Helpers.Order import Order
+
+    call, put = _order("C"), _order("P")
+    suite.run("order.is_triggered", lambda: call.is_triggered(250.5), right="C")
+    suite.run("order.is_triggered", lambda: put.is_triggered(250.5), right="P")
+
+    line = call.serialize()
+    suite.run("order.serialize", call.serialize)
+    suite.run("order.deserialize", lambda: Order.deserialize(line))
+
+
+def bench_app_model(suite: Suite):
+    from model import AppModel
+
+    model = AppModel("TSLA")
+    model._expiry, model._strike, model._right = "20251219", 250.0, "C"
+    model._stop_loss, model._take_profit = 1.25, 6.5
+    suite.run("appmodel.serialize", model.serialize, with_order=False)
+    model._order = _order()
+    suite.run("appmodel.serialize", model.serialize, with_order=True)
+
+
+def _tickets(n: int):
+    """n orders spread over a few dozen symbols."""
+    import random
+    rng = random.Random(11)
+    symbols = [f"SYM{i}" for i in range(40)]
+    orders = []
+    for i in range(n):
+        o = _order(rng.choice("CP"), trigger=rng.choice((None, round(rng.uniform(100, 300), 2))))
+        o.symbol = rng.choice(symbols)
+        o.strike = float(rng.choice((240, 245, 250, 255, 260)))
+        o.result = None if i % 3 else f"IB Order ID: {i}"
+        o.previous_id = orders[-1].order_id if orders and not i % 5 else None
+        orders.append(o)
+    return orders
+
+
+def bench_codec(suite: Suite):
+    """Save/load of thousands of tickets: text (Order/AppModel.serialize) vs Helpers.codec.
+    Correctness of the round trips lives in codec_test.py."""
+    from Helpers import codec
+    from Helpers.Order import Order
+    from model import AppModel
+
+    n = 5000
+    orders = _tickets(n)
+    models = []
+    for o in orders:
+        m = AppModel(o.symbol)
+        m._expiry, m._strike, m._right, m._stop_loss, m._take_profit = o.expiry, o.strike, o.right, 1.25, 6.5
+        m._order = o
+        models.append(m)
+
+    data = codec.dumps_orders(orders)
+    text = "\n".join(o.serialize() for o in orders)
+    print(f"  {n} tickets: text {len(text.encode()):,} B, binary {len(data):,} B")
+
+    suite.run_batch("codec.save", lambda: len("\n".join(o.serialize() for o in orders)) and n, path="text", tickets=n)
+    suite.run_batch("codec.save", lambda: len(codec.dumps_orders(orders)) and n, path="binary", tickets=n)
+    suite.run_batch("codec.load", lambda: len([Order.deserialize(ln) for ln in text.split("\n")]),
+                    path="text", tickets=n)
+    suite.run_batch("codec.load", lambda: len(codec.loads_orders(data)), path="binary", tickets=n)
+
+    # AppModel text round-trips only without an order line (AppModel.deserialize wants "Order:")
+    for m in models:
+        m._order = None
+    model_text = [m.serialize() for m in models]
+    model_data = codec.dumps_models(models)
+    suite.run_batch("codec.models.load", lambda: len([AppModel.deserialize([ln]) for ln in model_text]),
+                    path="text", models=n)
+    suite.run_batch("codec.models.load", lambda: len(codec.loads_models(model_data, AppModel)),
+                    path="binary", models=n)
+
+
+def bench_conid_storage(suite: Suite):
+    """PersistentConidStorage: LRU hits, pooled-connection misses and 500-symbol bulk ops."""
+    import shutil
+    import tempfile
+    from Services.persistent_conid_storage import PersistentConidStorage
+
+    tmp = tempfile.mkdtemp(prefix="conid-bench-")
+    try:
+        store = PersistentConidStorage(os.path.join(tmp, "conids.db"))
+        symbols = [f"SYM{i}" for i in range(500)]
+        store.store_many({s: str(1000 + i) for i, s in enumerate(symbols)})
+
+        suite.run("conid.get", lambda: store.get_conid("SYM7"), path="lru")
+        cold = PersistentConidStorage(store.db_path, cache_size=0)
+        suite.run("conid.get", lambda: cold.get_conid("SYM7"), path="sqlite")
+
+        suite.run_batch("conid.store", lambda: [store.store_conid(s, "1") for s in symbols[:50]] and 50,
+                        path="per_symbol")
+        suite.run_batch("conid.store", lambda: store.store_many({s: "1" for s in symbols}), path="store_many")
+        suite.run_batch("conid.get_many", lambda: len(cold.get_many(symbols)), path="sqlite", symbols=500)
+        store.close()
+        cold.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_trigger_dispatch(suite: Suite):
+    """Tick → OrderWaitService entry callback (order stays below trigger, nothing fires)."""
+    from Services.callback_manager import ThreadedCallbackService
+    from Services.order_wait_service import wait_service
+    from Services.watcher_info import ThreadInfo, watcher_info
+
+    order = _order("C", trigger=1e9)
+    wait_service.pending_orders[order.order_id] = order
+    watcher_info.add_watcher(ThreadInfo(order.order_id, order.symbol, mode="ws", order=order))
+    try:
+        suite.run("wait_service.on_tick", lambda: wait_service._on_tick(order.order_id, 250.5))
+    finally:
+        wait_service.pending_orders.pop(order.order_id, None)
+        watcher_info.remove(order.order_id)
+
+    # Submit + execute through a private dispatcher
+    dispatcher = ThreadedCallbackService(max_workers=5)
+    dispatcher.add_callback("TSLA", lambda price: order.is_triggered(price))
+    batch = 20_000
+
+    def dispatch():
+        for i in range(batch):
+            dispatcher.trigger("TSLA", 250.0 + (i & 7))
+        dispatcher.drain()
+        return batch
+
+    suite.run_batch("dispatch.trigger_to_callback", dispatch, callbacks=1)
+    dispatcher.shutdown(wait=False)
+
+
+def bench_fanout(suite: Suite):
+    """ThreadedCallbackService.trigger with N subscribers on one symbol."""
+    from Services.callback_manager import ThreadedCallbackService
+
+    for n in (1, 10, 100, 1000):
+        dispatcher = ThreadedCallbackService(max_workers=5)
+        for _ in range(n):
+            dispatcher.add_callback("TSLA", lambda price: None)
+        ticks = max(20, 20_000 // n)
+
+        def end_to_end():
+            for _ in range(ticks):
+                dispatcher.trigger("TSLA", 250.0)
+            dispatcher.drain()
+            return ticks
+
+        def timed_submit():
+            # submit cost only – drain outside the timed region
+            start = time.perf_counter()
+            for _ in range(ticks):
+                dispatcher.trigger("TSLA", 250.0)
+            elapsed = time.perf_counter() - start
+            dispatcher.drain()
+            return elapsed
+
+        runs = [timed_submit() / ticks for _ in range(suite.repeat)]
+        suite._record("fanout.trigger_submit", {"callbacks": n}, runs)
+        suite.run_batch("fanout.trigger_drain", end_to_end, callbacks=n)
+        dispatcher.shutdown(wait=False)
+
+
+def bench_pool(suite: Suite):
+    """CustomThreadPool submit→execute throughput for no-op tasks."""
+    from Services.thread_pool import CustomThreadPool
+
+    for workers in (1, 5):
+        pool = CustomThreadPool(max_workers=workers)
+        batch = 50_000
+
+        def go():
+            for _ in range(batch):
+                pool.submit(int)
+            pool.join()
+            return batch
+
+        suite.run_batch("pool.throughput", go, workers=workers)
+        pool.shutdown(wait=False)
+
+
+def bench_ws_decode(suite: Suite):
+    """PolygonService._on_message on a trade frame (no subscribers for the symbols)."""
+    from Services.polygon_service import polygon_service
+
+    for events in (1, 50):
+        frame = json.dumps([
+            {"ev": "T", "sym": f"BENCH{i % 10}", "p": 100.0 + i * 0.01, "s": 100,
+             "t": int(time.time() * 1000), "x": 4, "i": str(i), "z": 3}
+            for i in range(events)
+        ])
+        suite.run("ws.on_message", lambda: polygon_service._on_message(None, frame),
+                  ops_per_call=events, events_per_frame=events)
+
+
+def bench_watchers(suite: Suite):
+    from Services.watcher_info import ThreadInfo, WatcherInfo
+
+    for n in (10, 100, 1000):
+        registry = WatcherInfo()
+        for i in range(n):
+            order = _order()
+            registry.add_watcher(ThreadInfo(order.order_id, "TSLA", stop_loss=1.25, order=order))
+        suite.run("watcher_info.list_all", registry.list_all, watchers=n)
+
+        # UI poll when ~1% of the watchers changed since the previous poll
+        watchers = [registry.get_watcher(oid) for oid in list(registry._watchers)[:max(1, n // 100)]]
+
+        def poll():
+            version = registry.version
+            for w in watchers:
+                w.update_status(w.status, last_price=251.0)
+            registry.changes_since(version)
+
+        suite.run("watcher_info.changes_since", poll, watchers=n)
+
+
+def bench_portfolio(suite: Suite):
+    """PortfolioBook.evaluate – P&L, exposure and TP/SL masks for the whole book."""
+    import random
+    from Services.portfolio_engine import PortfolioBook
+
+    rng = random.Random(7)
+    for n in (10, 100, 1000):
+        book = PortfolioBook()
+        for i in range(n):
+            row = book.upsert(f"pos{i}", rng.randint(1, 10), rng.uniform(0.5, 5.0))
+            book.set_contract(row, rng.choice((240.0, 250.0, 260.0)), rng.choice("CP"), "20991217")
+            book.set_market(row, rng.uniform(10.0, 40.0), False, {"delta": rng.uniform(-1, 1)},
+                            underlying=rng.uniform(240.0, 260.0))
+        suite.run("portfolio.evaluate", lambda: book.evaluate(0.40, 0.70, 0.50), positions=n)
+        now = time.time()
+        suite.run("portfolio.price_greeks", lambda: book.price_greeks(now), positions=n)
+
+    # Position Monitor scenario grid: 200 positions × ~2000 shocks
+    from Services.scenario_engine import ScenarioGrid, book_columns, scenario_pnl
+    book = PortfolioBook()
+    for i in range(200):
+        row = book.upsert(f"pos{i}", rng.randint(-5, 10) or 1, 10.0)
+        book.set_contract(row, rng.choice((240.0, 250.0, 260.0)), rng.choice("CP"), "20991217")
+        book.cols["underlying"][row] = rng.uniform(240.0, 260.0)
+        book.cols["iv"][row] = rng.uniform(0.2, 0.8)
+    columns, grid = book_columns(book), ScenarioGrid()
+    suite.run("scenario.pnl", lambda: scenario_pnl(columns, grid), positions=200, scenarios=grid.size)
+
+
+def bench_risk(suite: Suite):
+    """RiskBook pre-trade reserve/release and fill application with N open symbols."""
+    from Services.risk_book import RiskBook, RiskLimits
+
+    for n in (10, 1000):
+        book = RiskBook(RiskLimits(max_contracts=10 ** 9, max_premium=1e12))
+        for i in range(n):
+            book.apply_fill(f"e{i}", f"pos{i}", f"SYM{i}", "BOT", 5, 2.0)
+
+        def reserve_release():
+            book.reserve("order", "SYM0", 3, 2.5)
+            book.release("order")
+
+        suite.run("risk.reserve+release", reserve_release, symbols=n)
+        seq = iter(range(10 ** 9))
+        suite.run("risk.apply_fill", lambda: book.apply_fill(f"x{next(seq)}", "pos0", "SYM0", "BOT", 1, 2.0), symbols=n)
+
+
+BENCHMARKS = (
+    ("order", bench_order),
+    ("appmodel", bench_app_model),
+    ("codec", bench_codec),
+    ("conid", bench_conid_storage),
+    ("dispatch", bench_trigger_dispatch),
+    ("fanout", bench_fanout),
+    ("pool", bench_pool),
+    ("ws", bench_ws_decode),
+    ("watcher", bench_watchers),
+    ("portfolio", bench_portfolio),
+    ("risk", bench_risk),
+)
+
+
+# ==========================================================
+# REPORTING
+# ==========================================================
+def _key(result: Dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: List[Dict], baseline_path: str, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """Results more than `threshold` slower than the baseline file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_key(r): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get(_key(r))
+        if not base or not base["ns_per_op"]:
+            continue
+        ratio = r["ns_per_op"] / base["ns_per_op"]
+        if ratio > 1 + threshold:
+            regressions.append({**r, "baseline_ns_per_op": base["ns_per_op"], "ratio": round(ratio, 3)})
+    return regressions
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path microbenchmarks")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--only", help="comma-separated substrings of benchmark names")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME)
+    args = parser.parse_args()
+
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    suite = Suite(args.repeat, args.min_time, args.only.split(",") if args.only else None)
+    for group, bench in BENCHMARKS:
+        if suite.only and not any(f in group or group in f for f in suite.only):
+            continue
+        bench(suite)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": _git_rev(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "threads_at_exit": threading.active_count(),
+        "results": suite.results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        regressions = compare(suite.results, args.compare, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']} {r['params']}: {r['baseline_ns_per_op']} → {r['ns_per_op']} ns/op "
+                  f"(x{r['ratio']})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,20 @@ from ibapi.order import Order as IBOrder  # import IB's order class
 import logging
 #from model import AppModel
 
+# Called with the Order after every mark_* transition (e.g. the order journal).
+_transition_listeners = []
+
+
+def add_transition_listener(fn):
+    """Register fn(order) to be called after each state transition."""
+    if fn not in _transition_listeners:
+        _transition_listeners.append(fn)
+
+
+def remove_transition_listener(fn):
+    if fn in _transition_listeners:
+        _transition_listeners.remove(fn)
+
 class OrderState(enum.Enum):
     PENDING = "pending"
     ACTIVE = "active"
@@ -36,11 +50,11 @@ class OrderState(enum.Enum):
 class Order:
     def __init__(self, symbol, expiry, strike, right,
                  qty, entry_price, tp_price, sl_price,
-                 action="BUY", type="LMT", trigger=None, appmodel = None):
+                 action="BUY", type="LMT", trigger=None, appmodel = None, order_id=None):
         """
-        Temel Order nesnesi.
+        Temel Order nesnesi. order_id is only passed when restoring a saved order.
         """
-        self.order_id = str(uuid.uuid4())
+        self.order_id = order_id or str(uuid.uuid4())
         self.previous_id = None
         self._position_size: Optional[float] = None   # dollars
         self.type = type
@@ -85,6 +99,13 @@ class Order:
                 import logging
                 logging.error(f"Order[{self.order_id}] UI callback failed: {e}")
 
+    def _emit_transition(self):
+        for fn in _transition_listeners:
+            try:
+                fn(self)
+            except Exception as e:
+                logging.error(f"Order[{self.order_id}] transition listener failed: {e}")
+
     # ----------------------------------------------------------------------
 
     def serialize(self) -> str:
@@ -126,8 +147,7 @@ class Order:
 
         # --- create order ---
         order = cls(symbol, expiry, strike, right, qty, entry_price, tp_price,
-                    sl_price, action, type, trigger)
-        order.order_id = order_id
+                    sl_price, action, type, trigger, order_id=order_id)
         if position_size is not None:
             order.set_position_size(position_size)
 
@@ -143,6 +163,16 @@ class Order:
 
         return order
 
+    def to_bytes(self) -> bytes:
+        """Binary form (Helpers.codec), safe for any character in any field."""
+        from Helpers.codec import dumps_orders
+        return dumps_orders([self])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Order":
+        from Helpers.codec import loads_orders
+        return loads_orders(data)[0]
+
     def is_triggered(self, market_price: float) -> bool:
         """
         Trigger koşulu sağlandı mı?
@@ -178,11 +208,13 @@ class Order:
         if result:
             msg += f" – {result}"
         self._notify(msg, "green")
+        self._emit_transition()
 
     def mark_cancelled(self):
         self.state = OrderState.CANCELLED
         msg = f"Order {self.order_id} Cancelled"
         self._notify(msg, "gray")
+        self._emit_transition()
 
     def mark_failed(self, reason=None):
         self.state = OrderState.FAILED
@@ -191,12 +223,14 @@ class Order:
         if reason:
             msg += f" – {reason}"
         self._notify(msg, "red")
+        self._emit_transition()
     
     def mark_finalized(self, result=None):
         self.state = OrderState.FINALIZED
         self.result = result
         msg =f"Order {self.order_id} finalized with result: {result}"
         self._notify(msg, "green")
+        self._emit_transition()
 
 
     def to_dict(self):
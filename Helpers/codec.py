@@ -0,0 +1,286 @@
+# Helpers/codec.py
+"""
+Schema-versioned binary encoding for Order, AppModel and OrderFrame
+sessions, next to the text formats (Order '_', AppModel ':', Frame '|').
+
+Layout (little endian):
+
+    header      magic b"ARCB", schema u16, kind u8, count u32, created f64
+    strings     u32 n, then n × (u16 length, utf-8 bytes)   – interned, index 0 = None;
+                length UUID_TAG = canonical uuid string stored as 16 raw bytes
+    records     fixed-size structs per kind; strings are u32 table indices,
+                optional floats carry a presence bit in the record's mask
+
+Symbols, expiries, rights, actions, states… are written once per file no
+matter how many tickets share them, and no value can collide with a
+delimiter. Readers keep the layouts of every schema version they know and
+refuse newer ones.
+
+    data = dumps_orders(orders);   orders = loads_orders(data)
+    data = dumps_models(models);   models = loads_models(data, AppModel)
+    data = dumps_session(frames);  created, frames = loads_session(data, AppModel)
+"""
+import re
+import struct
+import time
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from Helpers.Order import Order, OrderState
+
+MAGIC = b"ARCB"
+SCHEMA_VERSION = 1
+
+KIND_ORDERS = 1
+KIND_MODELS = 2
+KIND_SESSION = 3
+
+_HEADER = struct.Struct("<4sHBId")
+_U32 = struct.Struct("<I")
+_U16 = struct.Struct("<H")
+UUID_TAG = 0xFFFF               # string-table length marking a packed uuid
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z")
+
+# ---- schema v1 records ----
+# order_id symbol expiry strike right qty entry tp sl action type trigger pos_size state result previous_id mask ready
+_ORDER_V1 = struct.Struct("<IIIdIidddIIddBIIBB")
+# mask bits, in this order: strike entry tp sl trigger position_size qty
+_O_STRIKE, _O_ENTRY, _O_TP, _O_SL, _O_TRIGGER, _O_POSSIZE, _O_QTY = (1 << i for i in range(7))
+
+# id symbol expiry right strike stop_loss take_profit mask
+_MODEL_V1 = struct.Struct("<IIIIdddB")
+_M_STRIKE, _M_SL, _M_TP, _M_ORDER = (1 << i for i in range(4))
+
+# frame_id view_state symbol has_model
+_FRAME_V1 = struct.Struct("<IIIB")
+
+# order state u8 code → OrderState; frozen with the schema, never derived from
+# the enum's order (new states get codes in a new schema version)
+_STATES_V1 = MappingProxyType({
+    0: OrderState.PENDING,
+    1: OrderState.ACTIVE,
+    2: OrderState.CANCELLED,
+    3: OrderState.FAILED,
+    4: OrderState.FINALIZED,
+})
+
+_LAYOUTS = {1: (_ORDER_V1, _MODEL_V1, _FRAME_V1, _STATES_V1)}
+
+# encoder side: OrderState → code in the schema version being written
+_STATE_CODES = MappingProxyType({state: code for code, state in _LAYOUTS[SCHEMA_VERSION][3].items()})
+
+
+class FrameRecord(NamedTuple):
+    """What an OrderFrame persists: header fields plus its AppModel."""
+    frame_id: Optional[str]
+    state: Optional[str]
+    symbol: Optional[str]
+    model: Optional[object] = None
+
+
+def is_binary(head: bytes) -> bool:
+    return head[:len(MAGIC)] == MAGIC
+
+
+def _opt(value, bit: int, mask: int) -> Tuple[float, int]:
+    if value is None:
+        return 0.0, mask
+    return float(value), mask | bit
+
+
+# ==========================================================
+# ENCODER
+# ==========================================================
+class Encoder:
+    def __init__(self, kind: int):
+        self.kind = kind
+        self._strings: Dict[str, int] = {}
+        self._table: List[str] = []
+        self._body = bytearray()
+        self.count = 0
+        get = self._strings.get
+        # hot path: a dict hit for strings already in the table
+        self._ref = lambda v: get(v) or self.intern(v)
+
+    def intern(self, s) -> int:
+        if s is None:
+            return 0
+        key = s if type(s) is str else str(s)
+        idx = self._strings.get(key)
+        if idx is None:
+            self._table.append(key)
+            idx = self._strings[key] = len(self._table)
+        return idx
+
+    def order(self, o: Order):
+        get, intern = self._strings.get, self.intern
+        oid, symbol, expiry, right, action, otype, result, previous_id = [
+            get(v) or intern(v)
+            for v in (o.order_id, o.symbol, o.expiry, o.right, o.action, o.type, o.result, o.previous_id)]
+        strike, entry, tp, sl, trigger, pos_size, qty = (
+            o.strike, o.entry_price, o.tp_price, o.sl_price, o.trigger, o._position_size, o.qty)
+        mask = ((strike is not None) | (entry is not None) << 1 | (tp is not None) << 2 | (sl is not None) << 3
+                | (trigger is not None) << 4 | (pos_size is not None) << 5 | (qty is not None) << 6)
+        state = _STATE_CODES.get(o.state)
+        if state is None:
+            raise ValueError(f"Order state {o.state!r} has no code in schema version {SCHEMA_VERSION}")
+        self._body += _ORDER_V1.pack(
+            oid, symbol, expiry, 0.0 if strike is None else float(strike), right, 0 if qty is None else int(qty),
+            0.0 if entry is None else float(entry), 0.0 if tp is None else float(tp),
+            0.0 if sl is None else float(sl), action, otype,
+            0.0 if trigger is None else float(trigger), 0.0 if pos_size is None else float(pos_size),
+            state, result, previous_id, mask, bool(getattr(o, "_order_ready", False)),
+        )
+
+    def model(self, m):
+        i = self._ref
+        mask = 0
+        strike, mask = _opt(m._strike, _M_STRIKE, mask)
+        sl, mask = _opt(m._stop_loss, _M_SL, mask)
+        tp, mask = _opt(m._take_profit, _M_TP, mask)
+        if m._order is not None:
+            mask |= _M_ORDER
+        self._body += _MODEL_V1.pack(i(m._id), i(m._symbol), i(m._expiry), i(m._right), strike, sl, tp, mask)
+        if m._order is not None:
+            self.order(m._order)
+
+    def frame(self, f: FrameRecord):
+        i = self._ref
+        self._body += _FRAME_V1.pack(i(f.frame_id), i(f.state), i(f.symbol), f.model is not None)
+        if f.model is not None:
+            self.model(f.model)
+
+    def finish(self, created: Optional[float] = None) -> bytes:
+        parts = [_HEADER.pack(MAGIC, SCHEMA_VERSION, self.kind, self.count,
+                              time.time() if created is None else created),
+                 _U32.pack(len(self._table))]
+        for text in self._table:
+            if len(text) == 36 and _UUID_RE.match(text):
+                parts.append(_U16.pack(UUID_TAG))
+                parts.append(bytes.fromhex(text.replace("-", "")))
+                continue
+            raw = text.encode("utf-8")
+            if len(raw) >= UUID_TAG:
+                raise ValueError(f"String too long for the string table ({len(raw)} bytes)")
+            parts.append(_U16.pack(len(raw)))
+            parts.append(raw)
+        parts.append(bytes(self._body))
+        return b"".join(parts)
+
+
+# ==========================================================
+# DECODER
+# ==========================================================
+class Decoder:
+    def __init__(self, data: bytes, kind: int):
+        if len(data) < _HEADER.size:
+            raise ValueError("Binary session truncated (no header)")
+        magic, version, file_kind, count, created = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a binary ArcTrigger file")
+        if version not in _LAYOUTS:
+            raise ValueError(f"Unsupported schema version {version} (this build reads {sorted(_LAYOUTS)})")
+        if file_kind != kind:
+            raise ValueError(f"Expected record kind {kind}, file holds kind {file_kind}")
+        self.version, self.count, self.created = version, count, created
+        self._order_s, self._model_s, self._frame_s, self._states = _LAYOUTS[version]
+        self._data = memoryview(data)
+
+        off = _HEADER.size
+        (n,), off = _U32.unpack_from(data, off), off + _U32.size
+        strings: List[Optional[str]] = [None]
+        for _ in range(n):
+            (length,) = _U16.unpack_from(data, off)
+            off += _U16.size
+            if length == UUID_TAG:
+                h = self._data[off:off + 16].hex()
+                strings.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+                off += 16
+            else:
+                strings.append(str(self._data[off:off + length], "utf-8"))
+                off += length
+        self._strings = strings
+        self._off = off
+
+    def order(self) -> Order:
+        s = self._strings
+        (oid, symbol, expiry, strike, right, qty, entry, tp, sl, action, otype, trigger,
+         pos_size, state, result, previous_id, mask, ready) = self._order_s.unpack_from(self._data, self._off)
+        self._off += self._order_s.size
+
+        o = Order(s[symbol], s[expiry], strike if mask & _O_STRIKE else None, s[right] or "",
+                  qty if mask & _O_QTY else None,
+                  entry if mask & _O_ENTRY else None, tp if mask & _O_TP else None,
+                  sl if mask & _O_SL else None, s[action] or "BUY", s[otype] or "LMT",
+                  trigger if mask & _O_TRIGGER else None, order_id=s[oid])
+        o.previous_id = s[previous_id]
+        o._position_size = pos_size if mask & _O_POSSIZE else None
+        o.state = self._states.get(state)
+        if o.state is None:
+            raise ValueError(f"Unknown order state code {state} in schema version {self.version}")
+        o.result = s[result]
+        o._order_ready = bool(ready)
+        return o
+
+    def model(self, model_cls):
+        s = self._strings
+        mid, symbol, expiry, right, strike, sl, tp, mask = self._model_s.unpack_from(self._data, self._off)
+        self._off += self._model_s.size
+
+        m = model_cls(s[symbol])
+        m._id = s[mid]
+        m._expiry = s[expiry]
+        m._right = s[right]
+        m._strike = strike if mask & _M_STRIKE else None
+        m._stop_loss = sl if mask & _M_SL else None
+        m._take_profit = tp if mask & _M_TP else None
+        m._order = self.order() if mask & _M_ORDER else None
+        return m
+
+    def frame(self, model_cls) -> FrameRecord:
+        s = self._strings
+        fid, state, symbol, has_model = self._frame_s.unpack_from(self._data, self._off)
+        self._off += self._frame_s.size
+        return FrameRecord(s[fid], s[state], s[symbol], self.model(model_cls) if has_model else None)
+
+
+# ==========================================================
+# FILE-LEVEL HELPERS
+# ==========================================================
+def dumps_orders(orders) -> bytes:
+    enc = Encoder(KIND_ORDERS)
+    for o in orders:
+        enc.order(o)
+        enc.count += 1
+    return enc.finish()
+
+
+def loads_orders(data: bytes) -> List[Order]:
+    dec = Decoder(data, KIND_ORDERS)
+    return [dec.order() for _ in range(dec.count)]
+
+
+def dumps_models(models) -> bytes:
+    enc = Encoder(KIND_MODELS)
+    for m in models:
+        enc.model(m)
+        enc.count += 1
+    return enc.finish()
+
+
+def loads_models(data: bytes, model_cls) -> list:
+    dec = Decoder(data, KIND_MODELS)
+    return [dec.model(model_cls) for _ in range(dec.count)]
+
+
+def dumps_session(frames, created: Optional[float] = None) -> bytes:
+    enc = Encoder(KIND_SESSION)
+    for f in frames:
+        enc.frame(f)
+        enc.count += 1
+    return enc.finish(created)
+
+
+def loads_session(data: bytes, model_cls) -> Tuple[float, List[FrameRecord]]:
+    dec = Decoder(data, KIND_SESSION)
+    return dec.created, [dec.frame(model_cls) for _ in range(dec.count)]
@@ -1,20 +1,88 @@
 import tkinter as tk
 from tkinter import scrolledtext
 import logging
+import threading
+from collections import deque
 
 
 class DebugFrame(tk.Frame):
+    """
+    Debug console. add_text() may be called from any thread: lines go into a
+    bounded ring and are drained onto the widget in batches on a Tk after()
+    timer, so logging never touches Tk off the main thread.
+    """
+
+    RING_SIZE = 5000        # lines buffered between drains; older ones are dropped
+    MAX_LINES = 2000        # lines kept in the widget
+    DRAIN_MS = 100
+    DRAIN_BUDGET = 500      # lines rendered per drain
+
     def __init__(self, master):
         super().__init__(master)
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._dropped = 0
+        self._after_id = None
+
+        self.status = tk.Label(self, anchor="w", fg="orange")
         self.text = scrolledtext.ScrolledText(self, wrap="word", state="disabled")
         self.text.pack(fill="both", expand=True)
 
+        self._after_id = self.after(self.DRAIN_MS, self._drain)
+
     def add_text(self, msg: str):
-        """Append a line of text to the debug console."""
+        """Queue a line for the debug console (thread-safe)."""
+        with self._lock:
+            if len(self._pending) >= self.RING_SIZE:
+                self._pending.popleft()
+                self._dropped += 1
+            self._pending.append(msg)
+
+    # ------------------------------------------------------------------
+    # Tk thread
+    # ------------------------------------------------------------------
+    def _drain(self):
+        self._after_id = None
+        with self._lock:
+            n = min(len(self._pending), self.DRAIN_BUDGET)
+            lines = [self._pending.popleft() for _ in range(n)]
+            # Over budget: keep only what the next drain can show
+            overflow = len(self._pending) - self.DRAIN_BUDGET
+            if overflow > 0:
+                for _ in range(overflow):
+                    self._pending.popleft()
+                self._dropped += overflow
+            dropped = self._dropped
+
+        if lines:
+            self._render(lines)
+        if dropped:
+            self.status.configure(text=f"{dropped:,} lines dropped (log rate above display budget)")
+            if not self.status.winfo_ismapped():
+                self.status.pack(fill="x", before=self.text)
+
+        if self.winfo_exists():
+            self._after_id = self.after(self.DRAIN_MS, self._drain)
+
+    def _render(self, lines):
+        follow = self.text.yview()[1] >= 0.999     # only autoscroll if already at the bottom
         self.text.configure(state="normal")
-        self.text.insert("end", msg + "\n")
+        self.text.insert("end", "\n".join(lines) + "\n")
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.MAX_LINES
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
         self.text.configure(state="disabled")
-        self.text.see("end")
+        if follow:
+            self.text.see("end")
+
+    def destroy(self):
+        if self._after_id is not None:
+            try:
+                self.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        super().destroy()
 
 
 class TkinterHandler(logging.Handler):
@@ -24,5 +92,8 @@ class TkinterHandler(logging.Handler):
         self.debug_frame = debug_frame
 
     def emit(self, record):
-        msg = self.format(record)
-        self.debug_frame.add_text(msg)
+        try:
+            msg = self.format(record)
+            self.debug_frame.add_text(msg)
+        except Exception:
+            self.handleError(record)
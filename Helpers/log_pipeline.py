@@ -0,0 +1,339 @@
+# Helpers/log_pipeline.py
+"""
+Asynchronous logging for the trading process.
+
+Callers only pay for a level check, the sampling filter and a non-blocking
+queue put; formatting and all file / console / Tk I/O happen on a single
+background writer thread. Records keep their msg/args unformatted until the
+writer renders them, so use %-style arguments rather than f-strings:
+
+    logging.info("[TWSService] order %s filled @ %s", order_id, price)
+
+(Arguments are rendered a moment later on the writer thread; pass values,
+not objects you are about to mutate, when the exact snapshot matters.)
+
+Chatty categories (the leading "[Tag]" of the message) are rate limited with
+a token bucket. WARNING and above always pass, as do the audit categories
+(UNSAMPLED) and any record logged with extra=AUDIT – order lifecycle lines
+must survive a burst of orders:
+
+    logging.info("[TWSService] Sent order %s IBID=%s", symbol, ib_id, extra=AUDIT)
+
+Anything dropped is counted and reported by the writer as one summary line
+per category.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# category → (records per second, burst)
+DEFAULT_RATES: Dict[str, Tuple[float, int]] = {
+    "[TWSService]":    (20.0, 100),
+    "[ResolveConId]":  (10.0, 50),
+    "[WaitService]":   (10.0, 50),
+    "[StopLoss-POLL]": (5.0, 20),
+    "[Polygon]":       (10.0, 50),
+    "[OptionsManager]": (5.0, 20),
+}
+
+# audit trail tags – never rate limited, whatever DEFAULT_RATES / default_rate say
+UNSAMPLED = frozenset({
+    "[ORDER_INTENT]", "[SIZE_INTENT]", "[ORDER_BUILD]", "[ORDER_SENT]", "[TWS-LATENCY]",
+})
+
+# extra= for a single record that must bypass sampling
+AUDIT = {"no_sample": True}
+
+QUEUE_SIZE = 50_000          # records buffered before the pipeline starts dropping
+BATCH_SIZE = 512             # records handled per writer wake-up before flushing
+SUMMARY_INTERVAL = 30.0      # seconds between "suppressed N records" lines
+
+
+def record_category(record: logging.LogRecord) -> Optional[str]:
+    """'[TWSService]' for '[TWSService] is_connected …', else None."""
+    msg = record.msg
+    if isinstance(msg, str) and msg.startswith("["):
+        end = msg.find("]")
+        if end > 0:
+            return msg[:end + 1]
+    return None
+
+
+# ==========================================================
+# SAMPLING
+# ==========================================================
+class SamplingFilter(logging.Filter):
+    """
+    Per-category token bucket for records below WARNING.
+    Categories without a configured rate use default_rate (None = unlimited).
+    UNSAMPLED categories and records carrying extra=AUDIT always pass.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, int]]] = None,
+                 default_rate: Optional[Tuple[float, int]] = None):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._rates = dict(DEFAULT_RATES if rates is None else rates)
+        self._default = default_rate
+        self._buckets: Dict[str, List[float]] = {}    # category → [tokens, last refill]
+        self._suppressed: Dict[str, int] = {}
+
+    def set_rate(self, category: str, per_sec: Optional[float], burst: int = 0):
+        """Change (or with per_sec=None, remove) the limit for one category."""
+        with self._lock:
+            if per_sec is None:
+                self._rates.pop(category, None)
+            else:
+                self._rates[category] = (per_sec, max(1, burst or int(per_sec)))
+            self._buckets.pop(category, None)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or getattr(record, "no_sample", False):
+            return True
+        category = record_category(record)
+        if category is None or category in UNSAMPLED:
+            return True
+        rate = self._rates.get(category, self._default)
+        if rate is None:
+            return True
+
+        per_sec, burst = rate
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(category)
+            if bucket is None:
+                bucket = self._buckets[category] = [float(burst), now]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_sec)
+                bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return True
+            self._suppressed[category] = self._suppressed.get(category, 0) + 1
+            return False
+
+    def take_suppressed(self) -> Dict[str, int]:
+        """Suppressed counts since the last call (and reset them)."""
+        with self._lock:
+            out, self._suppressed = self._suppressed, {}
+            return out
+
+
+# ==========================================================
+# PRODUCER SIDE
+# ==========================================================
+class _LazyQueueHandler(logging.Handler):
+    """
+    Enqueues the record untouched. Unlike logging.handlers.QueueHandler this
+    does not pre-format the message; only a traceback is rendered up front,
+    since the frames it refers to will not survive until the writer runs.
+    """
+
+    def __init__(self, pipeline: "LogPipeline"):
+        super().__init__()
+        self._pipeline = pipeline
+        self._exc_formatter = logging.Formatter()
+
+    def emit(self, record: logging.LogRecord):
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        self._pipeline._enqueue(record)
+
+    def handleError(self, record):
+        # Nothing here does I/O; a failure is a bug in _enqueue, don't spam stderr from the hot path
+        self._pipeline._errors += 1
+
+
+# ==========================================================
+# PIPELINE
+# ==========================================================
+class LogPipeline:
+    """
+    Root-logger queue + background writer.
+
+    start(handlers) replaces the root logger's handlers with the queue
+    handler and moves `handlers` onto the writer thread. Handlers can be
+    attached later (e.g. the Tk debug console) with add_handler().
+    """
+
+    _STOP = object()
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, int]]] = None,
+                 queue_size: int = QUEUE_SIZE, summary_interval: float = SUMMARY_INTERVAL):
+        self.sampler = SamplingFilter(rates)
+        self.summary_interval = summary_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._queue_handler = _LazyQueueHandler(self)
+        self._queue_handler.addFilter(self.sampler)
+
+        self._handlers: List[logging.Handler] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._errors = 0
+        self._suppressed_total = 0
+        self._dropped_total = 0
+        self._last_summary = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+    def start(self, handlers: List[logging.Handler], level: int = logging.INFO):
+        root = logging.getLogger()
+        with self._lock:
+            self._handlers = list(handlers)
+            for h in root.handlers[:]:
+                root.removeHandler(h)
+            root.addHandler(self._queue_handler)
+            root.setLevel(level)
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="LogPipeline", daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.stop)
+                    self._atexit_registered = True
+
+    def stop(self, timeout: float = 5.0):
+        """Flush everything queued, then detach from the root logger."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._thread = None
+        root = logging.getLogger()
+        root.removeHandler(self._queue_handler)
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+
+        with self._lock:
+            handlers, self._handlers = self._handlers, []
+        # Anything logged after detaching goes straight to the real handlers
+        for h in handlers:
+            root.addHandler(h)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    # HANDLERS
+    # ------------------------------------------------------------------
+    def add_handler(self, handler: logging.Handler):
+        if not self.running:
+            logging.getLogger().addHandler(handler)
+            return
+        with self._lock:
+            if handler not in self._handlers:
+                self._handlers = self._handlers + [handler]
+
+    def remove_handler(self, handler: logging.Handler):
+        logging.getLogger().removeHandler(handler)
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers = [h for h in self._handlers if h is not handler]
+
+    def handlers(self, kind: type = logging.Handler) -> List[logging.Handler]:
+        with self._lock:
+            pool = self._handlers if self.running else logging.getLogger().handlers
+            return [h for h in pool if isinstance(h, kind)]
+
+    # ------------------------------------------------------------------
+    # QUEUE
+    # ------------------------------------------------------------------
+    def _enqueue(self, record: logging.LogRecord):
+        try:
+            self._queue.put_nowait(record)
+            self._enqueued += 1
+        except queue.Full:
+            # Never block the caller on log I/O
+            self._dropped += 1
+
+    def _run(self):
+        get = self._queue.get
+        while True:
+            try:
+                item = get(timeout=1.0)
+            except queue.Empty:
+                self._maybe_summarise()
+                continue
+
+            batch = [item]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            handlers = self._handlers          # replaced, never mutated in place
+            stop = False
+            for record in batch:
+                if record is self._STOP:
+                    stop = True
+                    continue
+                self._dispatch(handlers, record)
+            self._maybe_summarise(force=stop)
+            if stop:
+                self._flush(handlers)
+                return
+
+    def _dispatch(self, handlers, record):
+        for h in handlers:
+            if record.levelno >= h.level:
+                try:
+                    h.handle(record)
+                except Exception:
+                    self._errors += 1
+        self._written += 1
+
+    def _flush(self, handlers):
+        for h in handlers:
+            try:
+                h.flush()
+            except Exception:
+                self._errors += 1
+
+    def _maybe_summarise(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_summary < self.summary_interval:
+            return
+        self._last_summary = now
+        suppressed = self.sampler.take_suppressed()
+        dropped, self._dropped = self._dropped, 0
+        self._dropped_total += dropped
+        handlers = self._handlers
+        for category, n in sorted(suppressed.items()):
+            self._suppressed_total += n
+            self._dispatch(handlers, self._summary("[LogPipeline] suppressed %d %s records (rate limit)", n, category))
+        if dropped:
+            self._dispatch(handlers, self._summary("[LogPipeline] queue full – dropped %d records", dropped,
+                                                   level=logging.WARNING))
+
+    @staticmethod
+    def _summary(msg, *args, level=logging.INFO) -> logging.LogRecord:
+        return logging.LogRecord("LogPipeline", level, __file__, 0, msg, args, None)
+
+    # ------------------------------------------------------------------
+    # STATS
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "dropped": self._dropped_total + self._dropped,
+            "suppressed": self._suppressed_total,
+            "errors": self._errors,
+            "handlers": len(self._handlers),
+        }
+
+
+log_pipeline = LogPipeline()
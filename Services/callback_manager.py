@@ -1,8 +1,40 @@
 from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional
 from Services.thread_pool import CustomThreadPool
+from Services.feed_lag import feed_lag
 import logging
+import time
+
+
+class _TickDispatch:
+    """Feed-lag bookkeeping for one tick fanned out to several callbacks."""
+    __slots__ = ("symbol", "vendor_ms", "decode_ms", "dispatched_at", "remaining", "started_at", "lock")
+
+    def __init__(self, symbol: str, vendor_ms: Optional[float], decode_ms: Optional[float],
+                 dispatched_at: float, fan_out: int):
+        self.symbol = symbol
+        self.vendor_ms = vendor_ms
+        self.decode_ms = decode_ms
+        self.dispatched_at = dispatched_at
+        self.remaining = fan_out
+        self.started_at: Optional[float] = None
+        self.lock = Lock()
+
+    def started(self, now: float):
+        with self.lock:
+            if self.started_at is None:
+                self.started_at = now
+
+    def finished(self, now: float):
+        with self.lock:
+            self.remaining -= 1
+            if self.remaining:
+                return
+        feed_lag.record_execute(self.symbol, self.vendor_ms, self.decode_ms,
+                                self.dispatched_at, self.started_at, now)
+
+
 class ThreadedCallbackService:
     def __init__(self, max_workers: int = 5):
         self._callbacks: Dict[str, List[Callable[[float], None]]] = {}
@@ -27,19 +59,36 @@ class ThreadedCallbackService:
                 except ValueError as e:
                     logging.error(f"[Callback Error] {symbol}: {e}")
 
-    def trigger(self, symbol: str, value: float):
-        """Submit all callbacks to worker threads."""
+    def trigger(self, symbol: str, value: float, dispatched_at: Optional[float] = None,
+                vendor_ms: Optional[float] = None, decode_ms: Optional[float] = None):
+        """
+        Submit all callbacks to worker threads.
+        dispatched_at (epoch seconds) enables feed-lag measurement of the pool queue
+        wait and callback execution; vendor_ms/decode_ms are this tick's upstream
+        stages, so the end-to-end sample is attributed to the right tick.
+        """
         with self._lock:
             callbacks = list(self._callbacks.get(symbol, []))
+        if not callbacks:
+            return
 
+        tick = None
+        if dispatched_at is not None:
+            tick = _TickDispatch(symbol, vendor_ms, decode_ms, dispatched_at, len(callbacks))
         for cb in callbacks:
-            self._executor.submit(self._safe_execute, cb, value)
+            self._executor.submit(self._safe_execute, cb, value, tick)
 
-    def _safe_execute(self, cb: Callable[[float], None], value: float):
+    def _safe_execute(self, cb: Callable[[float], None], value: float,
+                      tick: Optional[_TickDispatch] = None):
+        if tick is not None:
+            tick.started(time.time())
         try:
             cb(value)
         except Exception as e:
             logging.error(f"[Callback Error] {cb.__name__}: {e}")
+        finally:
+            if tick is not None:
+                tick.finished(time.time())
 
     def clear_symbol(self, symbol: str):
         with self._lock:
@@ -49,6 +98,18 @@ class ThreadedCallbackService:
         with self._lock:
             return list(self._callbacks.keys())
         
+    def drain(self):
+        """Block until every callback queued so far has run."""
+        self._executor.join()
+
+    def pending(self) -> int:
+        """Callbacks queued or running."""
+        return self._executor.pending()
+
+    def queued(self) -> int:
+        """Callbacks still waiting for a worker."""
+        return self._executor.qsize()
+
     def shutdown(self, wait: bool = True):
         logging.info("Shutting down callback executor")
         self._executor.shutdown(wait=wait)
@@ -0,0 +1,118 @@
+# Services/clock.py
+import datetime
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional
+
+from Services.nasdaq_info import EASTERN
+
+
+class Clock:
+    """
+    Wall-clock time source. Services take one of these instead of calling
+    time.sleep / time.time directly, so simulations can swap in VirtualClock.
+    """
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def now(self, tz=EASTERN) -> datetime.datetime:
+        """Timezone-aware current datetime (US/Eastern by default)."""
+        return datetime.datetime.fromtimestamp(self.time(), tz)
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time that only moves when advanced.
+
+    sleep() parks the calling thread until virtual time reaches its wake-up
+    point. advance()/run_until() jump straight from one wake-up to the next,
+    and after each jump wait (in real time) until the woken threads have run
+    to their next sleep() — an eight-hour session replays in seconds.
+    """
+
+    SETTLE_TIMEOUT = 0.005   # max real wait for woken threads to park again
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = float(start if start is not None else time.time())
+        self._start_monotonic = self._now
+        self._cond = threading.Condition()
+        self._wakeups = []                 # heap of (wake time, seq)
+        self._seq = itertools.count()
+
+    @classmethod
+    def at(cls, when: datetime.datetime) -> "VirtualClock":
+        """Clock starting at an aware datetime (e.g. 09:25 ET on a session day)."""
+        return cls(when.timestamp())
+
+    # ------------------------------------------------------------------
+    # CLOCK API
+    # ------------------------------------------------------------------
+    def time(self) -> float:
+        with self._cond:
+            return self._now
+
+    def monotonic(self) -> float:
+        return self.time() - self._start_monotonic
+
+    def sleep(self, seconds: float):
+        with self._cond:
+            wake = self._now + max(0.0, seconds)
+            entry = (wake, next(self._seq))
+            heapq.heappush(self._wakeups, entry)
+            self._cond.notify_all()
+            try:
+                while self._now < wake:
+                    self._cond.wait()
+            finally:
+                self._wakeups.remove(entry)
+                heapq.heapify(self._wakeups)
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # DRIVER API
+    # ------------------------------------------------------------------
+    def sleepers(self) -> int:
+        with self._cond:
+            return len(self._wakeups)
+
+    def _settle(self, expected: int):
+        """
+        Wait (real time) until the threads just woken are parked in sleep()
+        again, i.e. the sleeper count is back to `expected` with none overdue.
+        Threads that finished or blocked elsewhere are given SETTLE_TIMEOUT.
+        """
+        deadline = time.monotonic() + self.SETTLE_TIMEOUT
+        with self._cond:
+            while (self._wakeups and self._wakeups[0][0] <= self._now) or len(self._wakeups) < expected:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def advance(self, seconds: float):
+        """Move virtual time forward by `seconds`, stepping through every wake-up."""
+        self.run_until(self.time() + seconds)
+
+    def run_until(self, target: float):
+        """Advance to `target` (epoch seconds), waking sleepers in order."""
+        while True:
+            with self._cond:
+                if self._now >= target:
+                    return
+                expected = len(self._wakeups)
+                nxt = self._wakeups[0][0] if self._wakeups else target
+                self._now = max(self._now, min(nxt, target))
+                self._cond.notify_all()
+            self._settle(expected)
+
+
+system_clock = Clock()
@@ -0,0 +1,130 @@
+# Services/feed_lag.py
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+# Pipeline stages, in order
+STAGE_VENDOR   = "vendor"    # exchange timestamp → WS message received
+STAGE_DECODE   = "decode"    # received → handed to callback_manager
+STAGE_QUEUE    = "queue"     # handed to callback_manager → first callback starts running
+STAGE_CALLBACK = "callback"  # first callback starts → last callback for the tick returns
+STAGE_TOTAL    = "total"     # exchange timestamp → last callback for the tick returns
+
+_STAGES = (STAGE_VENDOR, STAGE_DECODE, STAGE_QUEUE, STAGE_CALLBACK, STAGE_TOTAL)
+
+
+class FeedLagMonitor:
+    """
+    Rolling per-symbol feed-lag samples (milliseconds) for each pipeline stage.
+
+    All timestamps are wall-clock epoch seconds, so the vendor stage can be
+    compared against the exchange timestamp carried by the trade event.
+    A warning is logged (at most once per WARN_INTERVAL_SEC per symbol) when
+    the end-to-end lag exceeds WARN_THRESHOLD_MS, naming the dominant stage.
+    """
+
+    WINDOW = 1000
+    WARN_THRESHOLD_MS = 500.0
+    WARN_INTERVAL_SEC = 10.0
+
+    def __init__(self, window: int = WINDOW, warn_threshold_ms: float = WARN_THRESHOLD_MS):
+        self.window = window
+        self.warn_threshold_ms = warn_threshold_ms
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Dict[str, deque]] = {}
+        self._last_warn: Dict[str, float] = {}
+
+    # ------------------------------------------------------------------
+    # RECORDING
+    # ------------------------------------------------------------------
+    def _series(self, symbol: str) -> Dict[str, deque]:
+        series = self._samples.get(symbol)
+        if series is None:
+            series = {stage: deque(maxlen=self.window) for stage in _STAGES}
+            self._samples[symbol] = series
+        return series
+
+    def record_receive(self, symbol: str, exchange_ts: Optional[float], received_at: float,
+                       dispatched_at: float) -> Tuple[Optional[float], float]:
+        """
+        WS decode side: exchange time (may be None) → receive → dispatch.
+        Returns (vendor_ms, decode_ms) so they travel with the tick to record_execute.
+        """
+        vendor_ms = (received_at - exchange_ts) * 1000 if exchange_ts else None
+        decode_ms = (dispatched_at - received_at) * 1000
+        with self._lock:
+            series = self._series(symbol)
+            if vendor_ms is not None:
+                series[STAGE_VENDOR].append(vendor_ms)
+            series[STAGE_DECODE].append(decode_ms)
+        return vendor_ms, decode_ms
+
+    def record_execute(self, symbol: str, vendor_ms: Optional[float], decode_ms: Optional[float],
+                       dispatched_at: float, started_at: float, finished_at: float):
+        """
+        Callback side, once per dispatched tick: dispatch → first callback start
+        (CustomThreadPool queue wait) → last subscriber's callback returned.
+        """
+        decode_ms = decode_ms or 0.0
+        queue_ms = (started_at - dispatched_at) * 1000
+        callback_ms = (finished_at - started_at) * 1000
+        with self._lock:
+            series = self._series(symbol)
+            series[STAGE_QUEUE].append(queue_ms)
+            series[STAGE_CALLBACK].append(callback_ms)
+
+            total_ms = (vendor_ms or 0.0) + decode_ms + queue_ms + callback_ms
+            series[STAGE_TOTAL].append(total_ms)
+
+            if total_ms < self.warn_threshold_ms:
+                return
+            if started_at - self._last_warn.get(symbol, 0.0) < self.WARN_INTERVAL_SEC:
+                return
+            self._last_warn[symbol] = started_at
+
+        parts = {STAGE_VENDOR: vendor_ms or 0.0, STAGE_DECODE: decode_ms,
+                 STAGE_QUEUE: queue_ms, STAGE_CALLBACK: callback_ms}
+        worst = max(parts, key=parts.get)
+        logging.warning(
+            f"[FeedLag] {symbol} lag {total_ms:.0f}ms > {self.warn_threshold_ms:.0f}ms "
+            f"(vendor={parts[STAGE_VENDOR]:.0f} decode={decode_ms:.1f} queue={queue_ms:.1f} "
+            f"callback={callback_ms:.1f}) – dominated by {worst}"
+        )
+
+    # ------------------------------------------------------------------
+    # REPORTING
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _percentiles(samples) -> Dict:
+        if not samples:
+            return {"n": 0, "p50": None, "p95": None, "p99": None, "max": None}
+        ordered = sorted(samples)
+        n = len(ordered)
+
+        def pct(p: float):
+            return round(ordered[min(n - 1, int(p * n))], 3)
+
+        return {"n": n, "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": round(ordered[-1], 3)}
+
+    def stats(self, symbol: Optional[str] = None) -> Dict:
+        """{symbol: {stage: {n, p50, p95, p99, max}}} in milliseconds."""
+        with self._lock:
+            symbols = [symbol] if symbol else list(self._samples)
+            snapshot = {
+                sym: {stage: list(q) for stage, q in self._samples[sym].items()}
+                for sym in symbols if sym in self._samples
+            }
+        return {
+            sym: {stage: self._percentiles(samples) for stage, samples in stages.items()}
+            for sym, stages in snapshot.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._last_warn.clear()
+
+
+feed_lag = FeedLagMonitor()
@@ -0,0 +1,211 @@
+# Services/feed_supervisor.py
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from Services.callback_manager import callback_manager
+from Services.rate_limiter import PRIORITY_TRIGGER
+from Services.runtime_manager import runtime_man
+
+
+class FeedSupervisor:
+    """
+    Watches the Polygon WS feed per subscribed symbol.
+
+    • Every WS trade refreshes the symbol's last-tick time (note_tick).
+    • A symbol whose last tick is older than its own staleness threshold (or
+      every symbol, when the socket closes) is switched to batched REST polling;
+      polled prices are pushed through callback_manager exactly like WS ticks.
+    • The threshold follows the symbol's trade rate: GAP_MULTIPLE × its average
+      gap between trades, clamped to [STALE_AFTER_SEC, STALE_AFTER_MAX_SEC], so
+      illiquid / premarket names that are merely quiet don't fail over and burn
+      the shared REST budget. Until MIN_RATE_TICKS gaps are seen the rate is
+      unknown and STALE_AFTER_MAX_SEC applies.
+    • The first WS tick for a degraded symbol switches it back to streaming.
+    • Failover / recovery events and the time spent degraded are recorded.
+    """
+
+    STALE_AFTER_SEC = 3.0        # floor, for liquid names
+    STALE_AFTER_MAX_SEC = 60.0   # ceiling, and the threshold while the rate is unknown
+    GAP_MULTIPLE = 10.0          # stale after this many average inter-trade gaps
+    GAP_ALPHA = 0.2              # EWMA weight of the newest gap
+    MIN_RATE_TICKS = 5
+    CHECK_INTERVAL = 0.25
+    POLL_INTERVAL = 1.0
+    MAX_EVENTS = 500
+
+    def __init__(self, polygon, stale_after: Optional[float] = None, poll_interval: Optional[float] = None):
+        self.polygon = polygon
+        self.stale_after = stale_after or self.STALE_AFTER_SEC
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+
+        self._lock = threading.Lock()
+        self._last_tick: Dict[str, float] = {}       # sym → monotonic time of last WS tick
+        self._avg_gap: Dict[str, float] = {}         # sym → EWMA seconds between WS ticks
+        self._gap_count: Dict[str, int] = {}
+        self._degraded: Dict[str, float] = {}        # sym → monotonic time it went degraded
+        self._degraded_total: Dict[str, float] = {}  # sym → closed degraded seconds
+        self._failovers: Dict[str, int] = {}
+        self._last_rest_ts: Dict[str, int] = {}      # sym → last REST trade timestamp seen
+        self._events = deque(maxlen=self.MAX_EVENTS)
+        self._last_poll = 0.0
+
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="FeedSupervisor", daemon=True)
+        self._thread.start()
+        logging.info("[FeedSupervisor] Started")
+
+    # ------------------------------------------------------------------
+    # FEED HOOKS
+    # ------------------------------------------------------------------
+    def note_tick(self, symbol: str):
+        """Called for every WS trade event."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_tick.get(symbol)
+            if last is not None:
+                gap = min(now - last, self.STALE_AFTER_MAX_SEC)
+                avg = self._avg_gap.get(symbol)
+                self._avg_gap[symbol] = gap if avg is None else avg + self.GAP_ALPHA * (gap - avg)
+                self._gap_count[symbol] = self._gap_count.get(symbol, 0) + 1
+            self._last_tick[symbol] = now
+            if symbol in self._degraded:
+                self._recover(symbol, now, "ws ticks resumed")
+
+    def mark_disconnected(self, reason: str = "ws closed"):
+        """Socket is gone – every subscribed symbol fails over at once."""
+        now = time.monotonic()
+        with self._lock:
+            for sym in self._watched():
+                if sym not in self._degraded:
+                    self._failover(sym, now, reason)
+
+    def forget(self, symbol: str):
+        """Symbol was unsubscribed – drop its state (closing any degraded interval)."""
+        now = time.monotonic()
+        with self._lock:
+            if symbol in self._degraded:
+                self._recover(symbol, now, "unsubscribed")
+            self._last_tick.pop(symbol, None)
+            self._avg_gap.pop(symbol, None)
+            self._gap_count.pop(symbol, None)
+            self._last_rest_ts.pop(symbol, None)
+
+    # ------------------------------------------------------------------
+    # INTERNALS (call with self._lock held)
+    # ------------------------------------------------------------------
+    def _watched(self) -> List[str]:
+        with self.polygon._ws_lock:
+            return list(self.polygon._active_ws_symbols)
+
+    def _stale_after(self, sym: str) -> float:
+        if self._gap_count.get(sym, 0) < self.MIN_RATE_TICKS:
+            return max(self.stale_after, self.STALE_AFTER_MAX_SEC)
+        return min(max(self.stale_after, self.GAP_MULTIPLE * self._avg_gap[sym]), self.STALE_AFTER_MAX_SEC)
+
+    def _failover(self, sym: str, now: float, reason: str):
+        self._degraded[sym] = now
+        self._failovers[sym] = self._failovers.get(sym, 0) + 1
+        self._events.append({"time": time.time(), "symbol": sym, "event": "failover", "reason": reason})
+        logging.warning(f"[FeedSupervisor] {sym} → REST polling ({reason})")
+
+    def _recover(self, sym: str, now: float, reason: str):
+        since = self._degraded.pop(sym)
+        spent = now - since
+        self._degraded_total[sym] = self._degraded_total.get(sym, 0.0) + spent
+        self._events.append({
+            "time": time.time(), "symbol": sym, "event": "recovered",
+            "reason": reason, "degraded_sec": round(spent, 3),
+        })
+        logging.info(f"[FeedSupervisor] {sym} → WS streaming ({reason}, degraded {spent:.1f}s)")
+
+    # ------------------------------------------------------------------
+    # LOOP
+    # ------------------------------------------------------------------
+    def _loop(self):
+        while runtime_man.is_run():
+            try:
+                self._check_staleness()
+                self._poll_degraded()
+            except Exception as e:
+                logging.error(f"[FeedSupervisor] Loop error: {e}")
+            time.sleep(self.CHECK_INTERVAL)
+
+    def _check_staleness(self):
+        now = time.monotonic()
+        with self._lock:
+            for sym in self._watched():
+                last = self._last_tick.get(sym)
+                if last is None:
+                    # Newly subscribed – start the staleness clock now
+                    self._last_tick[sym] = now
+                    continue
+                if sym not in self._degraded:
+                    limit = self._stale_after(sym)
+                    if now - last > limit:
+                        self._failover(sym, now, f"no tick for {now - last:.1f}s (limit {limit:.1f}s)")
+
+    def _poll_degraded(self):
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return
+
+        with self._lock:
+            symbols = list(self._degraded)
+        if not symbols:
+            return
+        self._last_poll = now
+
+        snaps = self.polygon.get_snapshots(symbols, priority=PRIORITY_TRIGGER)
+        if not snaps:
+            return
+
+        for sym, snap in snaps.items():
+            price = snap.get("last")
+            ts = snap.get("last_ts")
+            if price is None:
+                continue
+            with self._lock:
+                if sym not in self._degraded:
+                    continue  # recovered while the request was in flight
+                if ts is not None and self._last_rest_ts.get(sym) == ts:
+                    continue  # no new trade since the previous poll
+                self._last_rest_ts[sym] = ts
+            callback_manager.trigger(sym, price)
+
+    # ------------------------------------------------------------------
+    # REPORTING
+    # ------------------------------------------------------------------
+    def is_degraded(self, symbol: str) -> bool:
+        with self._lock:
+            return symbol in self._degraded
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            symbols = set(self._last_tick) | set(self._degraded_total)
+            out = {}
+            for sym in symbols:
+                open_sec = now - self._degraded[sym] if sym in self._degraded else 0.0
+                last = self._last_tick.get(sym)
+                out[sym] = {
+                    "mode": "REST" if sym in self._degraded else "WS",
+                    "last_tick_age_sec": round(now - last, 3) if last is not None else None,
+                    "stale_after_sec": round(self._stale_after(sym), 3),
+                    "failovers": self._failovers.get(sym, 0),
+                    "degraded_sec": round(self._degraded_total.get(sym, 0.0) + open_sec, 3),
+                }
+            return out
+
+    def events(self) -> List[Dict]:
+        with self._lock:
+            return list(self._events)
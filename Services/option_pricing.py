@@ -0,0 +1,167 @@
+# Services/option_pricing.py
+"""
+Vectorized Black-Scholes pricing, greeks and implied volatility.
+
+Every function takes scalars or equal-length NumPy arrays and works on the
+whole portfolio at once; no network calls. Conventions match the IB model
+greeks: vega per 1 vol point, theta per calendar day.
+
+    iv = implied_vol(mid, spot, strike, t, RISK_FREE_RATE, is_call)
+    g  = greeks(spot, strike, t, RISK_FREE_RATE, iv, is_call)
+"""
+import datetime
+import os
+from typing import Dict
+
+import numpy as np
+
+from Services.nasdaq_info import EASTERN
+
+RISK_FREE_RATE = float(os.getenv("OPTION_RISK_FREE_RATE", "0.045"))
+
+YEAR_SECONDS = 365.0 * 24 * 3600
+MIN_T = 60.0 / YEAR_SECONDS            # floor time-to-expiry at one minute
+VOL_LOW, VOL_HIGH = 1e-4, 5.0          # IV search bracket
+IV_TOL = 1e-6                          # price tolerance for the IV solver
+IV_MAX_ITER = 64
+
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+# ==========================================================
+# NORMAL DISTRIBUTION
+# ==========================================================
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x):
+    """Φ(x), Abramowitz & Stegun 26.2.17 (|error| < 7.5e-8), evaluated in place."""
+    x = np.asarray(x, dtype=float)
+    shape = x.shape
+    x = x.reshape(-1)                      # 0-d inputs would turn into scalars below
+    z = np.abs(x)
+    t = z * 0.2316419
+    t += 1.0
+    np.reciprocal(t, out=t)
+    tail = t * 1.330274429
+    for b in (-1.821255978, 1.781477937, -0.356563782, 0.319381530):
+        tail += b
+        tail *= t
+    z *= z
+    z *= -0.5
+    np.exp(z, out=z)
+    tail *= z
+    tail *= 1.0 / _SQRT_2PI                # tail = 1 - Φ(|x|)
+    out = 1.0 - tail
+    np.copyto(out, tail, where=x < 0)
+    return out.reshape(shape)
+
+
+# ==========================================================
+# TIME
+# ==========================================================
+def expiry_timestamp(expiry: str) -> float:
+    """'YYYYMMDD' → epoch seconds of that day's 16:00 ET close."""
+    day = datetime.datetime.strptime(expiry[:8], "%Y%m%d")
+    # localize, not tzinfo=: a pytz zone passed as tzinfo uses its LMT offset (-4:56)
+    return EASTERN.localize(datetime.datetime(day.year, day.month, day.day, 16, 0)).timestamp()
+
+
+def year_fraction(expiry_ts, now: float):
+    """Years from `now` to the expiry timestamp(s), floored at MIN_T."""
+    return np.maximum((np.asarray(expiry_ts, dtype=float) - now) / YEAR_SECONDS, MIN_T)
+
+
+# ==========================================================
+# PRICING
+# ==========================================================
+def _d1_d2(spot, strike, t, rate, vol):
+    sqrt_t = np.sqrt(t)
+    vs = vol * sqrt_t
+    d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * t) / vs
+    return d1, d1 - vs, sqrt_t
+
+
+def bs_price(spot, strike, t, rate, vol, is_call):
+    spot, strike, t, vol = (np.asarray(a, dtype=float) for a in (spot, strike, t, vol))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, d2, _ = _d1_d2(spot, strike, t, rate, vol)
+        disc = strike * np.exp(-rate * t)
+        call = spot * norm_cdf(d1) - disc * norm_cdf(d2)
+    # put–call parity
+    return np.where(is_call, call, call - spot + disc)
+
+
+def greeks(spot, strike, t, rate, vol, is_call) -> Dict[str, np.ndarray]:
+    """delta, gamma, theta (per day), vega (per vol point) and the model price."""
+    spot, strike, t, vol = (np.asarray(a, dtype=float) for a in (spot, strike, t, vol))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, d2, sqrt_t = _d1_d2(spot, strike, t, rate, vol)
+        pdf = norm_pdf(d1)
+        disc = strike * np.exp(-rate * t)
+        nd1, nd2 = norm_cdf(d1), norm_cdf(d2)
+
+        call = spot * nd1 - disc * nd2
+        decay = -spot * pdf * vol / (2.0 * sqrt_t)
+        return {
+            "price": np.where(is_call, call, call - spot + disc),
+            "delta": np.where(is_call, nd1, nd1 - 1.0),
+            "gamma": pdf / (spot * vol * sqrt_t),
+            "theta": np.where(is_call, decay - rate * disc * nd2, decay + rate * disc * (1.0 - nd2)) / 365.0,
+            "vega": spot * pdf * sqrt_t / 100.0,
+        }
+
+
+# ==========================================================
+# IMPLIED VOLATILITY
+# ==========================================================
+def implied_vol(price, spot, strike, t, rate, is_call, tol: float = IV_TOL, max_iter: int = IV_MAX_ITER):
+    """
+    Safeguarded Newton on σ, all contracts at once. Each element keeps a
+    [lo, hi] bracket; a Newton step that leaves it (or has no vega) is
+    replaced by bisection. Prices outside the no-arbitrage bounds → NaN.
+    """
+    price, spot, strike, t = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, spot, strike, t)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), price.shape)
+
+    disc = strike * np.exp(-rate * t)
+    lower = np.where(is_call, np.maximum(spot - disc, 0.0), np.maximum(disc - spot, 0.0))
+    upper = np.where(is_call, spot, disc)
+    ok = np.isfinite(price) & np.isfinite(spot) & (spot > 0) & (strike > 0) & (price > lower) & (price < upper)
+
+    lo = np.full(price.shape, VOL_LOW)
+    hi = np.full(price.shape, VOL_HIGH)
+    # Brenner–Subrahmanyam starting point
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol = np.clip(np.sqrt(2.0 * np.pi / t) * price / spot, 0.05, 2.0)
+    vol = np.where(ok, vol, np.nan)
+    todo = ok.copy()
+
+    for _ in range(max_iter):
+        if not todo.any():
+            break
+        idx = np.flatnonzero(todo)
+        s, k, tt, v, c = spot[idx], strike[idx], t[idx], vol[idx], is_call[idx]
+        g = greeks(s, k, tt, rate, v, c)
+        diff = g["price"] - price[idx]
+
+        done = np.abs(diff) < tol
+        todo[idx[done]] = False
+
+        # tighten the bracket: price is increasing in σ
+        high = diff > 0
+        hi[idx[high]] = np.minimum(hi[idx[high]], v[high])
+        lo[idx[~high]] = np.maximum(lo[idx[~high]], v[~high])
+
+        vega = g["vega"] * 100.0                      # back to per unit σ
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = v - diff / vega
+        l, h = lo[idx], hi[idx]
+        bad = ~np.isfinite(step) | (step <= l) | (step >= h)
+        nxt = np.where(bad, 0.5 * (l + h), step)
+        upd = ~done
+        vol[idx[upd]] = nxt[upd]
+
+    vol[todo] = np.nan                                 # did not converge
+    return vol
@@ -1,13 +1,17 @@
 import threading
-import time
 import logging
-from typing import Dict, Optional, Callable
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Callable
 from Services.tws_service import create_tws_service, TWSService
 from Services.polygon_service import polygon_service
 from Services.order_manager import order_manager
 from Services.runtime_manager import runtime_man
 from Helpers.Order import Order, OrderState
 from Services.nasdaq_info import is_market_closed_or_pre_market
+from Services.clock import Clock, system_clock
+from Services.portfolio_engine import PortfolioBook
+from Services.scenario_engine import book_columns
+from Services.risk_book import risk_book
 
 
 class OptionPosition:
@@ -30,7 +34,9 @@ class OptionPosition:
         self.ask = None
         self.mid = None
         self.last = None
+        self.underlying = None
 
+        self.iv = None
         self.delta = None
         self.gamma = None
         self.theta = None
@@ -60,6 +66,8 @@ class OptionPosition:
             "mid": self.mid,
             "bid": self.bid,
             "ask": self.ask,
+            "underlying": self.underlying,
+            "iv": self.iv,
             "delta": self.delta,
             "gamma": self.gamma,
             "theta": self.theta,
@@ -73,6 +81,19 @@ class OptionPosition:
         }
 
 
+class PositionSnapshot(NamedTuple):
+    """
+    Immutable published view of all positions. A new one is swapped in
+    whenever a refresh changes anything; readers never take OptionsManager.lock.
+    """
+    version: int
+    rows: Mapping[str, Mapping]     # uuid → read-only OptionPosition.to_dict()
+    book: Mapping = MappingProxyType({})   # scenario inputs: PortfolioBook columns of open rows
+
+
+_EMPTY_SNAPSHOT = PositionSnapshot(0, MappingProxyType({}))
+
+
 class OptionsManager:
     """
     ARC TIER PORTFOLIO ENGINE
@@ -85,16 +106,24 @@ class OptionsManager:
 
     REFRESH_INTERVAL = 0.5     # 500ms
     STALE_TIMEOUT = 10         # seconds
+    STREAM_RETRY_SEC = 30      # back-off after a failed quote subscription
 
     # ARC TP/SL AUTOMATION THRESHOLDS (%)
     TP_MEDIUM = 0.40
     TP_AGGRESSIVE = 0.70
     SL_FORCE = None            # You can override dynamic SL from order metadata
 
-    def __init__(self, tws: TWSService):
+    def __init__(self, tws: TWSService, clock: Clock = system_clock):
         self.tws = tws
+        self.clock = clock
         self.positions: Dict[str, OptionPosition] = {}
         self.lock = threading.Lock()
+        self._snapshot: PositionSnapshot = _EMPTY_SNAPSHOT
+        self.book = PortfolioBook()          # columnar mirror for P&L / TP / SL
+
+        # Streaming quotes (loop thread only): position uuid → conId
+        self._streams: Dict[str, int] = {}
+        self._stream_retry_at: Dict[str, float] = {}
 
         self._stop = False
         self.thread = threading.Thread(target=self._loop, daemon=True)
@@ -112,7 +141,8 @@ class OptionsManager:
                 self.refresh_positions()
             except Exception as e:
                 logging.exception(f"[OptionsManager] refresh loop crashed: {e}")
-            time.sleep(self.REFRESH_INTERVAL)
+            self.clock.sleep(self.REFRESH_INTERVAL)
+        self._close_streams()
 
     # ---------------------------------------------------------------------
     # SYNCHRONIZE WITH TWS POSITION MAP
@@ -120,32 +150,106 @@ class OptionsManager:
 
     def refresh_positions(self):
         tws_map = self.tws._positions_by_order_id.copy()
+        self._sync_quote_streams(tws_map)
 
         with self.lock:
             # --- ADD OR UPDATE POSITIONS ---
             for uuid, data in tws_map.items():
                 if uuid not in self.positions:
                     self.positions[uuid] = OptionPosition(uuid, data)
+                    row = self.book.upsert(uuid, data["qty"], data["avg_price"])
+                    self.book.set_contract(row, data["strike"], data["right"], data["expiry"])
                     logging.info(f"[OptionsManager] Tracking new position {uuid}")
                 else:
                     self.positions[uuid].qty = data["qty"]
                     self.positions[uuid].avg_price = data["avg_price"]
+                    self.book.upsert(uuid, data["qty"], data["avg_price"])
 
             # --- REMOVE CLOSED POSITIONS ---
             closed = [uuid for uuid, pos in self.positions.items()
                       if uuid not in tws_map]
 
             for uuid in closed:
-                self.positions[uuid].status = "CLOSED"
-                logging.info(f"[OptionsManager] Position closed {uuid}")
+                if self.positions[uuid].status != "CLOSED":
+                    self.positions[uuid].status = "CLOSED"
+                    self.book.deactivate(uuid)
+                    logging.info(f"[OptionsManager] Position closed {uuid}")
 
             # --- REFRESH MARKET DATA + GREEKS ---
+            live = []
             for pos in self.positions.values():
                 if pos.status == "CLOSED":
                     continue
                 self._refresh_market_snapshot(pos)
-                self._compute_pnl(pos)
-                self._risk_check(pos)
+                row = self.book.row(pos.uuid)
+                self.book.set_market(row, pos.mid, pos.stale, {
+                    "delta": pos.delta, "gamma": pos.gamma, "theta": pos.theta, "vega": pos.vega,
+                }, underlying=pos.underlying)
+                live.append((row, pos))
+
+            # --- P&L + TP/SL FOR THE WHOLE BOOK ---
+            self._evaluate_book(live)
+
+            self._publish()
+
+    def _publish(self):
+        """Swap in a new PositionSnapshot if any row changed (caller holds self.lock)."""
+        rows = {uuid: pos.to_dict() for uuid, pos in self.positions.items()}
+        current = self._snapshot
+        if rows == current.rows:
+            return
+        self._snapshot = PositionSnapshot(
+            current.version + 1,
+            MappingProxyType({uuid: MappingProxyType(row) for uuid, row in rows.items()}),
+            MappingProxyType(book_columns(self.book)),
+        )
+
+    # ---------------------------------------------------------------------
+    # STREAMING QUOTE SUBSCRIPTIONS
+    # ---------------------------------------------------------------------
+
+    def _sync_quote_streams(self, tws_map: Dict[str, dict]):
+        """
+        One streaming TWS subscription per open position (shared per conId by
+        TWSService). Runs outside self.lock – subscribing may resolve a conId.
+        """
+        open_ids = {uuid for uuid, data in tws_map.items() if data.get("qty")}
+
+        for uuid in [u for u in self._streams if u not in open_ids]:
+            self.tws.unsubscribe_option_quotes(self._streams.pop(uuid))
+        for uuid in [u for u in self._stream_retry_at if u not in open_ids]:
+            del self._stream_retry_at[uuid]
+
+        if not self.tws.is_connected():
+            return
+        now = self.clock.time()
+        for uuid in open_ids:
+            if uuid in self._streams or self._stream_retry_at.get(uuid, 0) > now:
+                continue
+            data = tws_map[uuid]
+            conid = self.tws.subscribe_option_quotes(data["symbol"], data["expiry"], data["strike"], data["right"])
+            if conid:
+                self._streams[uuid] = conid
+                self._stream_retry_at.pop(uuid, None)
+            else:
+                self._stream_retry_at[uuid] = now + self.STREAM_RETRY_SEC
+
+    def _close_streams(self):
+        for conid in self._streams.values():
+            try:
+                self.tws.unsubscribe_option_quotes(conid)
+            except Exception:
+                pass
+        self._streams.clear()
+
+    def _streamed_quote(self, pos: OptionPosition) -> Optional[dict]:
+        """Fresh quote from the shared TWS quote table, shaped like a snapshot."""
+        conid = self._streams.get(pos.uuid)
+        quote = self.tws.get_quote(conid) if conid else None
+        if not quote or not quote.get("mid") or quote["age"] > self.STALE_TIMEOUT:
+            return None
+        quote["greeks"] = {k: quote[k] for k in ("delta", "gamma", "theta", "vega") if k in quote}
+        return quote
 
     # ---------------------------------------------------------------------
     # MARKET SNAPSHOT WITH FALLBACK LOGIC
@@ -154,28 +258,21 @@ class OptionsManager:
     def _refresh_market_snapshot(self, pos: OptionPosition):
         """
         Hybrid logic:
-        • RTH → try TWS first
+        • RTH → streamed TWS quote (no request on this path)
         • If failure or outside RTH → Polygon snapshot
         • If both fail → stale flag
         """
 
-        now = time.time()
+        now = self.clock.time()
         pos.last_update = now
 
-        use_polygon = is_market_closed_or_pre_market()
+        use_polygon = is_market_closed_or_pre_market(self.clock.now())
         tws_ok = self.tws.is_connected()
 
         snap = None
 
         if tws_ok and not use_polygon:
-            try:
-                tsnap = self.tws.get_option_snapshot(
-                    pos.symbol, pos.expiry, pos.strike, pos.right, timeout=1
-                )
-                if tsnap:
-                    snap = tsnap
-            except Exception:
-                pass
+            snap = self._streamed_quote(pos)
 
         if not snap:
             try:
@@ -190,6 +287,7 @@ class OptionsManager:
             return
 
         pos.stale = False
+        pos.underlying = snap.get("underlying") or polygon_service.last_price(pos.symbol) or pos.underlying
         pos.bid = snap.get("bid")
         pos.ask = snap.get("ask")
         pos.last = snap.get("last")
@@ -204,52 +302,41 @@ class OptionsManager:
             pos.vega = greeks.get("vega")
 
     # ---------------------------------------------------------------------
-    # PNL ENGINE
-    # ---------------------------------------------------------------------
-
-    def _compute_pnl(self, pos: OptionPosition):
-        if pos.stale:
-            return
-
-        if not pos.mid:
-            return
-
-        pos.unrealized_pnl = (pos.mid - pos.avg_price) * pos.qty * 100
-        pos.exposure = pos.delta * pos.qty * 100 if pos.delta else None
-
-    # ---------------------------------------------------------------------
-    # RISK / TP / SL CHECKS
+    # PNL ENGINE + RISK / TP / SL CHECKS
     # ---------------------------------------------------------------------
 
-    def _risk_check(self, pos: OptionPosition):
+    def _evaluate_book(self, live):
         """
-        ARC MODE:
+        ARC MODE (vectorized over self.book):
         • SL → immediate forced sell
         • TP > 70% → automatic sell
         • TP > 40% → warning signal
         """
+        # local IV + greeks from mid / underlying first – exposure needs delta
+        self.book.price_greeks(self.clock.time())
+        flags = self.book.evaluate(self.TP_MEDIUM, self.TP_AGGRESSIVE, self.SL_FORCE)
+
+        cols = self.book.cols
+        for row, pos in live:
+            for name in ("unrealized_pnl", "exposure", "iv", "delta", "gamma", "theta", "vega"):
+                v = cols[name][row]
+                setattr(pos, name, None if v != v else float(v))      # NaN → None
+            risk_book.set_delta(pos.uuid, pos.delta)
+
+        for row in flags["sl"]:
+            pos = self.positions[self.book.uuid_at(row)]
+            pos._sl_triggered = True
+            logging.warning(f"[OptionsManager] SL AUTO-SELL {pos.uuid}")
+            self._auto_close_position(pos)
 
-        if pos.mid == None or pos.stale or pos.unrealized_pnl is None:
-            return
-        
-            
-        # pct return on premium
-        pct = (pos.mid - pos.avg_price) / pos.avg_price
-
-        # STOP LOSS
-        if self.SL_FORCE is not None and pct <= -abs(self.SL_FORCE):
-            if not pos._sl_triggered:
-                pos._sl_triggered = True
-                logging.warning(f"[OptionsManager] SL AUTO-SELL {pos.uuid}")
-                self._auto_close_position(pos)
-
-        # TAKE PROFITS
-        if pct >= self.TP_AGGRESSIVE and not pos._tp_triggered:
+        for row in flags["tp_aggressive"]:
+            pos = self.positions[self.book.uuid_at(row)]
             pos._tp_triggered = True
             logging.warning(f"[OptionsManager] AGGRESSIVE TP AUTO-SELL {pos.uuid}")
             self._auto_close_position(pos)
-        elif pct >= self.TP_MEDIUM and not pos._tp_triggered:
-            logging.info(f"[OptionsManager] Medium TP signal for {pos.uuid}")
+
+        for row in flags["tp_medium"]:
+            logging.info("[OptionsManager] Medium TP signal for %s", self.book.uuid_at(row))
 
     # ---------------------------------------------------------------------
     # AUTO EXECUTION
@@ -271,20 +358,22 @@ class OptionsManager:
     # PUBLIC API
     # ---------------------------------------------------------------------
 
+    def snapshot(self) -> PositionSnapshot:
+        """Latest published positions; lock-free, safe from the UI thread."""
+        return self._snapshot
+
     def list_positions(self):
-        with self.lock:
-            return [p.to_dict() for p in self.positions.values()]
+        return [dict(row) for row in self._snapshot.rows.values()]
 
     def get_position(self, uuid):
-        with self.lock:
-            pos = self.positions.get(uuid)
-            return pos.to_dict() if pos else None
+        row = self._snapshot.rows.get(uuid)
+        return dict(row) if row else None
 
     def close_position(self, uuid):
-        with self.lock:
-            pos = self.positions.get(uuid)
-            if not pos:
-                return False
+        # Plain dict lookup – don't wait behind a refresh holding self.lock
+        pos = self.positions.get(uuid)
+        if not pos:
+            return False
         return self._auto_close_position(pos)
 
     def stop(self):
@@ -1,6 +1,5 @@
 import threading
 import queue
-import time
 import logging
 from typing import Set
 
@@ -8,6 +7,7 @@ from Helpers.Order import Order, OrderState
 #from model import general_app
 from Services.polygon_service import polygon_service
 from Services.tws_service import create_tws_service, TWSService
+from Services.clock import Clock, system_clock
 
 class OrderFixerService:
     """
@@ -20,12 +20,13 @@ class OrderFixerService:
     - Can be invoked from anywhere in runtime
     """
 
-    def __init__(self, tws: TWSService = create_tws_service()):
+    def __init__(self, tws: TWSService = create_tws_service(), clock: Clock = system_clock):
         self._queue: queue.Queue[Order] = queue.Queue()
         self._active: Set[str] = set()   # order_id currently being fixed
         self._lock = threading.Lock()
         self._running = True
         self.tws = tws
+        self.clock = clock
         self._worker = threading.Thread(
             target=self._run,
             name="OrderFixerService",
@@ -63,11 +64,11 @@ class OrderFixerService:
         Blocking helper: wait until order becomes FIXED or timeout expires.
         """
         self.fix_async(order)
-        start = time.time()
-        while time.time() - start < timeout:
+        start = self.clock.time()
+        while self.clock.time() - start < timeout:
             if self.is_ready(order):
                 return True
-            time.sleep(0.05)
+            self.clock.sleep(0.05)
         return False
 
     def is_ready(self, order: Order) -> bool:
@@ -198,7 +199,7 @@ class OrderFixerService:
         else:
             # Not ready yet → requeue gently
             if changed:
-                time.sleep(0.05)
+                self.clock.sleep(0.05)
             self.fix_async(order)
 
 
@@ -0,0 +1,392 @@
+# Services/order_journal.py
+"""
+Append-only journal of order state, so a restart loses at most the last
+group commit instead of up to AUTO_SAVE_INTERVAL_MIN of transitions.
+
+One JSON record per line:
+    order   Order fields + the watcher it was armed with (trigger / stop_loss)
+    state   mark_active / mark_finalized / mark_cancelled / mark_failed
+    ib      IB orderId → custom uuid mapping
+    pos     TWSService position entry after a fill / orderStatus
+
+Callers never block: append() queues the record and the writer thread
+writes everything queued so far with one write + fsync (group commit).
+Every COMPACT_RECORDS records (or COMPACT_SEC) the writer folds the
+materialized state into the snapshot file and truncates the journal.
+
+Startup:
+    order_journal.start()                     # snapshot + tail → state
+    order_journal.restore(tws, wait_service)  # position maps, watchers
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from Helpers.Order import Order, OrderState, add_transition_listener, remove_transition_listener
+
+JOURNAL_DIR = os.getenv("ORDER_JOURNAL_DIR", "journal")
+JOURNAL_FILE = "orders.journal"
+SNAPSHOT_FILE = "orders.snapshot"
+SNAPSHOT_VERSION = 1
+
+FSYNC = os.getenv("ORDER_JOURNAL_FSYNC", "1") != "0"
+COMPACT_RECORDS = 10000         # journal records before folding into the snapshot
+COMPACT_SEC = 300               # ... or this long since the last compaction
+REARM_MAX_AGE_SEC = 12 * 3600   # don't re-arm watchers armed longer ago than this
+
+_TERMINAL = (OrderState.CANCELLED.value, OrderState.FAILED.value)
+# IB order statuses after which a position row with qty 0 will never fill
+_DEAD_POSITION_STATUSES = ("filled", "cancelled", "apicancelled", "inactive")
+
+
+def _empty_state() -> Dict:
+    return {"orders": {}, "ib": {}, "positions": {}}
+
+
+def _order_record(order: Order) -> Dict:
+    rec = order.to_dict()
+    rec.update({
+        "type": order.type,
+        "previous_id": order.previous_id,
+        "position_size": order._position_size,
+        "ready": bool(getattr(order, "_order_ready", False)),
+    })
+    return rec
+
+
+def _order_from_record(rec: Dict) -> Order:
+    order = Order(rec["symbol"], rec["expiry"], rec["strike"], rec["right"], rec["qty"],
+                  rec["entry_price"], rec["tp_price"], rec["sl_price"],
+                  rec.get("action", "BUY"), rec.get("type", "LMT"), rec.get("trigger"),
+                  order_id=rec["order_id"])
+    order.previous_id = rec.get("previous_id")
+    if rec.get("position_size"):
+        order.set_position_size(rec["position_size"])
+    order.state = OrderState.deserialize(rec.get("state", OrderState.ACTIVE.value))
+    order.result = rec.get("result")
+    order._order_ready = rec.get("ready", False)
+    return order
+
+
+def apply_record(state: Dict, rec: Dict):
+    """Fold one journal record into the materialized state."""
+    op = rec.get("op")
+    if op == "order":
+        order = rec["order"]
+        state["orders"][order["order_id"]] = order
+    elif op == "state":
+        order = state["orders"].setdefault(rec["id"], {"order_id": rec["id"]})
+        order["state"] = rec["state"]
+        order["result"] = rec.get("result")
+    elif op == "ib":
+        state["ib"][str(rec["ib"])] = {"id": rec["id"], "custom": rec.get("custom", False)}
+    elif op == "pos":
+        state["positions"][rec["id"]] = rec["pos"]
+
+
+def compact_state(state: Dict) -> Dict:
+    """
+    Drop what a restart no longer needs: closed positions, empty positions
+    whose IB order is dead (or, with no IB status yet, whose order is
+    cancelled/failed), cancelled/failed orders, finalized orders without an
+    open position, transitions of orders that were never journaled in full,
+    and IB ids mapping to nothing that is left.
+    """
+    def live(oid: str, p: Dict) -> bool:
+        if p.get("qty"):
+            return True
+        status = p.get("status")
+        if status:
+            return status not in _DEAD_POSITION_STATUSES
+        return state["orders"].get(oid, {}).get("state") not in _TERMINAL
+
+    positions = {oid: p for oid, p in state["positions"].items() if live(oid, p)}
+
+    orders = {}
+    for oid, o in state["orders"].items():
+        st = o.get("state")
+        if "symbol" not in o or st in _TERMINAL:
+            continue
+        if st == OrderState.FINALIZED.value and oid not in positions:
+            continue
+        orders[oid] = o
+
+    keep = set(orders) | set(positions)
+    ib = {k: v for k, v in state["ib"].items() if v["id"] in keep}
+    return {"orders": orders, "ib": ib, "positions": positions}
+
+
+class OrderJournal:
+    def __init__(self, directory: str = JOURNAL_DIR, fsync: bool = FSYNC):
+        self.directory = directory
+        self.fsync = fsync
+        self._cond = threading.Condition()
+        self._queue: List[Dict] = []
+        self._seq = 0                 # last sequence number handed out
+        self._committed = 0           # last sequence number on disk
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+        # writer-thread state
+        self._state = _empty_state()
+        self._snapshot_seq = 0
+        self._since_compact = 0
+        self._compacted_at = time.time()
+        self.stats = {"records": 0, "batches": 0, "compactions": 0, "recovered": 0, "recover_ms": 0.0}
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, JOURNAL_FILE)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+    def start(self) -> Dict:
+        """Recover snapshot + tail, then start the writer. Returns the recovered state."""
+        if self._running:
+            return self._state
+        os.makedirs(self.directory, exist_ok=True)
+        self._recover()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._running = True
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="OrderJournal")
+        self._thread.start()
+        add_transition_listener(self.transition)
+        return self._state
+
+    def close(self):
+        """Flush everything queued, compact, stop the writer."""
+        if not self._running:
+            return
+        remove_transition_listener(self.transition)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        self._compact()
+        self._file.close()
+        self._file = None
+        logging.info("[OrderJournal] Closed (%d records, %d batches, %d compactions)",
+                     self.stats["records"], self.stats["batches"], self.stats["compactions"])
+
+    def sync(self, timeout: float = 5.0) -> bool:
+        """Barrier: wait until everything appended before this call is on disk."""
+        with self._cond:
+            target = self._seq
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed >= target or not self._running, timeout)
+
+    # ------------------------------------------------------------------
+    # APPEND
+    # ------------------------------------------------------------------
+    def append(self, op: str, **fields):
+        if not self._running:
+            return
+        with self._cond:
+            self._seq += 1
+            fields["op"] = op
+            fields["s"] = self._seq
+            fields["t"] = time.time()
+            self._queue.append(fields)
+            self._cond.notify()
+
+    def transition(self, order: Order):
+        self.append("state", id=order.order_id, state=order.state.value, result=order.result)
+
+    def watch(self, order: Order, kind: str, mode: str, stop: Optional[float] = None):
+        rec = _order_record(order)
+        rec["watch"] = {"kind": kind, "mode": mode, "stop": stop, "armed": time.time()}
+        self.append("order", order=rec)
+
+    def ib_mapping(self, ib_order_id: int, order_id: str, custom: bool = True):
+        self.append("ib", ib=ib_order_id, id=order_id, custom=custom)
+
+    def position(self, order_id: str, pos: Dict):
+        self.append("pos", id=order_id, pos=dict(pos))
+
+    # ------------------------------------------------------------------
+    # WRITER
+    # ------------------------------------------------------------------
+    def _writer(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                batch, self._queue = self._queue, []
+                stopping = not self._running
+            if batch:
+                self._commit(batch)
+            if stopping and not batch:
+                return
+            if self._since_compact >= COMPACT_RECORDS or \
+                    (self._since_compact and time.time() - self._compacted_at >= COMPACT_SEC):
+                self._compact()
+
+    def _commit(self, batch: List[Dict]):
+        try:
+            self._file.write("".join(json.dumps(r, separators=(",", ":"), default=str) + "\n" for r in batch))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except Exception as e:
+            logging.error("[OrderJournal] Commit of %d records failed: %s", len(batch), e)
+        for rec in batch:
+            apply_record(self._state, rec)
+        self._since_compact += len(batch)
+        self.stats["records"] += len(batch)
+        self.stats["batches"] += 1
+        with self._cond:
+            self._committed = batch[-1]["s"]
+            self._cond.notify_all()
+
+    def _compact(self):
+        """Write the materialized state as the new snapshot, then truncate the journal."""
+        state = compact_state(self._state)
+        payload = {"version": SNAPSHOT_VERSION, "seq": self._committed, "ts": time.time(), "state": state}
+        tmp = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            # records up to `seq` are in the snapshot; recovery skips them if truncation is lost
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.flush()
+        except Exception as e:
+            logging.error("[OrderJournal] Compaction failed: %s", e)
+            return
+        self._state = state
+        self._snapshot_seq = self._committed
+        self._since_compact = 0
+        self._compacted_at = time.time()
+        self.stats["compactions"] += 1
+
+    # ------------------------------------------------------------------
+    # RECOVERY
+    # ------------------------------------------------------------------
+    def _recover(self):
+        start = time.perf_counter()
+        state, seq = _empty_state(), 0
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            if snap.get("version") == SNAPSHOT_VERSION:
+                state, seq = snap["state"], snap["seq"]
+            else:
+                logging.warning("[OrderJournal] Unknown snapshot version %s – ignored", snap.get("version"))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error("[OrderJournal] Snapshot unreadable, replaying journal only: %s", e)
+
+        replayed, good = 0, 0
+        try:
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break                    # torn tail from a crash mid-write
+                    good += len(line)
+                    if rec["s"] > seq:
+                        apply_record(state, rec)
+                        seq = rec["s"]
+                        replayed += 1
+            if good != os.path.getsize(self.journal_path):
+                logging.warning("[OrderJournal] Dropping torn journal tail at byte %d", good)
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good)
+        except FileNotFoundError:
+            pass
+
+        self._state = state
+        self._seq = self._committed = self._snapshot_seq = seq
+        self._since_compact = replayed
+        self.stats["recovered"] = replayed
+        self.stats["recover_ms"] = (time.perf_counter() - start) * 1000
+        logging.info("[OrderJournal] Recovered %d orders, %d positions (%d journal records) in %.1f ms",
+                     len(state["orders"]), len(state["positions"]), replayed, self.stats["recover_ms"])
+
+    def restore(self, tws, wait_service, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Rebuild TWSService position maps, risk_book exposure and
+        OrderWaitService watchers from the recovered state. Entries already
+        present in the services win. Watchers are re-armed on a background
+        thread (they hit Polygon).
+        """
+        from Services.order_manager import order_manager
+        from Services.risk_book import risk_book
+
+        now = time.time() if now is None else now
+        state = compact_state(self._state)        # never resurrect what compaction would drop
+        counts = {"positions": 0, "ib": 0, "finalized": 0, "triggers": 0, "stop_losses": 0}
+
+        for oid, pos in state["positions"].items():
+            if oid not in tws._positions_by_order_id:
+                tws._positions_by_order_id[oid] = dict(pos)
+                counts["positions"] += 1
+                if pos.get("qty") and pos.get("symbol"):
+                    # one synthetic execution per position: caps hold across the restart
+                    risk_book.apply_fill(f"journal:{oid}", oid, pos["symbol"], "BOT",
+                                         pos["qty"], pos.get("avg_price") or 0.0)
+        for ib, m in state["ib"].items():
+            ib = int(ib)
+            if ib not in tws._ib_to_order_id:
+                tws._ib_to_order_id[ib] = m["id"]
+                counts["ib"] += 1
+            if m["custom"]:
+                tws._ib_to_custom_id.setdefault(ib, m["id"])
+
+        rearm = []
+        for oid, rec in state["orders"].items():
+            if "symbol" not in rec:
+                continue                          # only a state record survived
+            st = rec.get("state")
+            watch = rec.get("watch") or {}
+            pos = state["positions"].get(oid)
+            if st == OrderState.FINALIZED.value and pos and pos.get("qty"):
+                order_manager.add_finalized_order(oid, _order_from_record(rec))
+                counts["finalized"] += 1
+            elif st == OrderState.ACTIVE.value and pos is not None and oid not in tws._pending_orders:
+                # sent but not filled yet: let orderStatus finalize it
+                tws._pending_orders[oid] = _order_from_record(rec)
+
+            if not watch or now - watch.get("armed", 0) > REARM_MAX_AGE_SEC:
+                continue
+            if watch["kind"] == "trigger" and st == OrderState.PENDING.value and pos is None:
+                rearm.append(("trigger", rec, watch))
+            elif watch["kind"] == "stop_loss" and st in (OrderState.ACTIVE.value, OrderState.PENDING.value):
+                parent = state["positions"].get(rec.get("previous_id")) or {}
+                if parent.get("qty"):
+                    rearm.append(("stop_loss", rec, watch))
+
+        def _rearm():
+            for kind, rec, watch in rearm:
+                try:
+                    order = _order_from_record(rec)
+                    if kind == "trigger":
+                        wait_service.add_order(order, mode=watch["mode"])
+                    else:
+                        wait_service.start_stop_loss_watcher(order, watch["stop"], mode=watch["mode"])
+                    logging.info("[OrderJournal] Re-armed %s watcher for %s (%s)", kind, order.order_id, order.symbol)
+                except Exception as e:
+                    logging.error("[OrderJournal] Failed to re-arm %s watcher %s: %s", kind, rec.get("order_id"), e)
+
+        counts["triggers"] = sum(1 for k, _, _ in rearm if k == "trigger")
+        counts["stop_losses"] = len(rearm) - counts["triggers"]
+        if rearm:
+            threading.Thread(target=_rearm, daemon=True, name="OrderJournal-rearm").start()
+        logging.info("[OrderJournal] Restored %s", counts)
+        return counts
+
+
+order_journal = OrderJournal()
@@ -1,7 +1,7 @@
 import threading
-import time
 import logging
 from Services.nasdaq_info import is_market_closed_or_pre_market, rth_proximity_factor
+from Services.clock import Clock, system_clock
 from Services.tws_service import create_tws_service, TWSService
 from Services.polygon_service import polygon_service, PolygonService
 #from model import general_app
@@ -18,9 +18,11 @@ class OrderQueueService:
         self,
         tws: TWSService = create_tws_service(),
         polyg: PolygonService = polygon_service,
+        clock: Clock = system_clock,
     ):
         self._tws_service = tws
         self._polygon_service = polyg
+        self.clock = clock
 
         self._queued_orders: list[Order] = []
         self._lock = threading.Lock()
@@ -126,9 +128,10 @@ class OrderQueueService:
 
         while self._running:
             try:
-                delay = rth_proximity_factor()
+                now_et = self.clock.now()
+                delay = rth_proximity_factor(now_et)
 
-                if not is_market_closed_or_pre_market():
+                if not is_market_closed_or_pre_market(now_et):
                     logging.info(
                         "[OrderQueueService] Market OPEN → executing queued orders."
                     )
@@ -140,7 +143,7 @@ class OrderQueueService:
                     count = len(self._queued_orders)
 
                 # Reduced frequency logging
-                now = time.time()
+                now = self.clock.time()
                 if count > 0 and (now - last_log_time) >= log_interval:
                     logging.info(
                         f"[OrderQueueService] Pre-market: {count} order(s) queued, "
@@ -152,11 +155,11 @@ class OrderQueueService:
                         f"[OrderQueueService] Pre-market: {count} order(s) queued"
                     )
 
-                time.sleep(delay)
+                self.clock.sleep(delay)
 
             except Exception as e:
                 logging.error(f"[OrderQueueService] Monitor error: {e}")
-                time.sleep(5)
+                self.clock.sleep(5)
 
     # ------------------------------------------------------------------
     # EXECUTION
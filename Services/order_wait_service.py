@@ -1,7 +1,7 @@
 import threading
-import time
 import logging
 from Helpers.Order import Order, OrderState
+from Helpers.log_pipeline import AUDIT
 from Services.order_manager import order_manager
 from Services.watcher_info import (
     ThreadInfo, watcher_info,
@@ -10,13 +10,18 @@ from Services.watcher_info import (
 from Services.runtime_manager import runtime_man
 from Services.tws_service import create_tws_service, TWSService
 from Services.polygon_service import polygon_service, PolygonService
+from Services.rate_limiter import PRIORITY_TRIGGER
 from Services.amo_service import amo, LOSS
 from Services.nasdaq_info import is_market_closed_or_pre_market
+from Services.clock import Clock, system_clock
+from Services.order_journal import order_journal
 
 class OrderWaitService:
-    def __init__(self, polygon_service: PolygonService, tws_service: TWSService, poll_interval=0.1):
+    def __init__(self, polygon_service: PolygonService, tws_service: TWSService, poll_interval=0.1,
+                 clock: Clock = system_clock):
         self.polygon = polygon_service
         self.tws = tws_service
+        self.clock = clock
         self.trigger_lock = threading.Lock()
         self.trigger_status = set()
         # Active pending orders, keyed by order_id
@@ -50,15 +55,15 @@ class OrderWaitService:
         delay = 5  # Increased from 2 to 5 seconds for status logging
         last = 0
 
-        logging.info(f"[WaitService] Snapshot thread started | order_id={order_id} | symbol={order.symbol}")
+        logging.info("[WaitService] Snapshot thread started | order_id=%s | symbol=%s", order_id, order.symbol)
 
         try:
             while runtime_man.is_run() and order.state == OrderState.PENDING:
-                logging.debug(f"[WaitService] Loop tick | order_id={order_id} | state={order.state}")
+                logging.debug("[WaitService] Loop tick | order_id=%s | state=%s", order_id, order.state)
                 
                 # Order preparation check - should ideally be done before watcher starts
                 if not order._order_ready:
-                    logging.warning(f"[WaitService] Order not ready, preparing | order_id={order_id}")
+                    logging.warning("[WaitService] Order not ready, preparing | order_id=%s", order_id)
                     model = order._model
                     _args = order._args
                     _order = model.prepare_option_order(action= _args["action"]
@@ -69,39 +74,40 @@ class OrderWaitService:
                                                         ,type="LMT"
                                                         ,status_callback=_args["status_callback"])
                     order = _order
-                    logging.info(f"[WaitService] Order prepared in watcher | order_id={order_id}")
+                    logging.info("[WaitService] Order prepared in watcher | order_id=%s", order_id, extra=AUDIT)
 
                 # Consolidated lock check
                 with self.lock:
                     if order_id not in self.pending_orders:
-                        logging.info(f"[WaitService] Order missing from pending_orders | order_id={order_id}")
+                        logging.info("[WaitService] Order missing from pending_orders | order_id=%s", order_id)
                         watcher_info.remove(order_id)
                         return
 
                     if order_id in self.cancelled_orders:
-                        logging.info(f"[WaitService] Order cancelled | order_id={order_id}")
+                        logging.info("[WaitService] Order cancelled | order_id=%s", order_id)
                         watcher_info.remove(order_id)
                         return
 
-                logging.debug(f"[WaitService] Fetching snapshot | symbol={order.symbol}")
-                snap = self.polygon.get_snapshot(order.symbol)
+                logging.debug("[WaitService] Fetching snapshot | symbol=%s", order.symbol)
+                snap = self.polygon.get_snapshot(order.symbol, priority=PRIORITY_TRIGGER)
 
                 if not snap:
-                    logging.debug(f"[WaitService] Empty snapshot | symbol={order.symbol}")
-                    time.sleep(self.poll_interval)
+                    logging.debug("[WaitService] Empty snapshot | symbol=%s", order.symbol)
+                    self.clock.sleep(self.poll_interval)
                     continue
 
                 last_price = snap.get("last")
-                now = time.time()
+                now = self.clock.time()
 
                 logging.debug(
-                    f"[WaitService] Snapshot | symbol={order.symbol} | price={last_price}"
+                    "[WaitService] Snapshot | symbol=%s | price=%s", order.symbol, last_price
                 )
 
                 # Periodic status logging (reduced frequency)
                 if now - last > delay:
                     logging.info(
-                        f"[WaitService] Monitoring {order.symbol} | price={last_price} | trigger={order.trigger}"
+                        "[WaitService] Monitoring %s | price=%s | trigger=%s",
+                        order.symbol, last_price, order.trigger
                     )
                     last = now
 
@@ -110,13 +116,15 @@ class OrderWaitService:
 
                 if last_price and order.is_triggered(last_price):
                     logging.info(
-                        f"[WaitService] 🎯 TRIGGER MET | order_id={order_id} | price={last_price} | trigger={order.trigger}"
+                        "[WaitService] 🎯 TRIGGER MET | order_id=%s | price=%s | trigger=%s",
+                        order_id, last_price, order.trigger, extra=AUDIT
                     )
 
                     # Check if premarket - if so, prompt rebase/cancel instead of firing
-                    if is_market_closed_or_pre_market():
+                    if is_market_closed_or_pre_market(self.clock.now()):
                         logging.info(
-                            f"[WaitService] Premarket trigger hit - prompting rebase/cancel | order_id={order_id}"
+                            "[WaitService] Premarket trigger hit - prompting rebase/cancel | order_id=%s",
+                            order_id
                         )
                         self._handle_premarket_trigger(order_id, order, tinfo, last_price)
                         # Continue watching (don't return)
@@ -124,6 +132,7 @@ class OrderWaitService:
                         with self.trigger_lock:
                             if order in self.trigger_status:
                                 self.trigger_status.remove(order)
+                        self.clock.sleep(self.poll_interval)
                         continue
                     else:
                         # RTH - fire the order
@@ -133,14 +142,14 @@ class OrderWaitService:
                             if order_id in self.pending_orders:
                                 del self.pending_orders[order_id]
 
-                        logging.info(f"[WaitService] Watcher completed | order_id={order_id}")
+                        logging.info("[WaitService] Watcher completed | order_id=%s", order_id)
                         return
 
-                time.sleep(self.poll_interval)
+                self.clock.sleep(self.poll_interval)
 
         except Exception as e:
             logging.error(
-                f"[WaitService] Exception in snapshot thread | order_id={order_id} | error={str(e)}"
+                "[WaitService] Exception in snapshot thread | order_id=%s | error=%s", order_id, str(e)
             )
             tinfo.update_status(STATUS_FAILED, info={"error": str(e)})
 
@@ -155,6 +164,7 @@ class OrderWaitService:
         # Register ThreadInfo
         tinfo = ThreadInfo(order_id, order.symbol, watcher_type="trigger", stop_loss=order.sl_price, mode=mode,order=order)
         watcher_info.add_watcher(tinfo)
+        order_journal.watch(order, "trigger", mode)
         tinfo.update_status(STATUS_RUNNING)
 
         if mode == "ws":
@@ -166,7 +176,7 @@ class OrderWaitService:
                 order.symbol,
                 callback_func # Pass the stored function
             )
-            logging.info(f"[TriggerWatcher] Started WS watcher for {order.symbol} (order {order_id}) - WS mode.")
+            logging.info("[TriggerWatcher] Started WS watcher for %s (order %s) - WS mode.", order.symbol, order_id)
             return None  # no thread object for ws
 
         elif mode == "poll":
@@ -177,11 +187,11 @@ class OrderWaitService:
                 daemon=True
             )
             t.start()
-            logging.info(f"[TriggerWatcher] Started polling watcher for {order.symbol} (order {order_id}) - Poll mode.")
+            logging.info("[TriggerWatcher] Started polling watcher for %s (order %s) - Poll mode.", order.symbol, order_id)
             return t
 
         else:
-            logging.warning(f"[TriggerWatcher] Unknown mode '{mode}', defaulting to 'ws'")
+            logging.warning("[TriggerWatcher] Unknown mode '%s', defaulting to 'ws'", mode)
             # Fallback path must also store the callback
             callback_func = lambda price, oid=order_id: self._on_tick(oid, price)
             self._ws_callbacks[order_id] = callback_func
@@ -199,7 +209,7 @@ class OrderWaitService:
         order_id = exit_order.order_id
         
         try:
-            logging.info(f"[StopLoss] Submitting MKT exit order for {exit_order.symbol} at {last_price}...")
+            logging.info("[StopLoss] Submitting MKT exit order for %s at %s...", exit_order.symbol, last_price, extra=AUDIT)
             
             success = self.tws.sell_position_by_order_id(
                 exit_order.previous_id,
@@ -211,8 +221,8 @@ class OrderWaitService:
 
             if success:
                 logging.info(
-                    f"[StopLoss] Sold {live_qty} {exit_order.symbol} "
-                    f"via TWS position map – MKT Exit. Watcher finalized."
+                    "[StopLoss] Sold %s %s via TWS position map – MKT Exit. Watcher finalized.",
+                    live_qty, exit_order.symbol, extra=AUDIT
                 )
                 # ✅ RE-ADDED CRITICAL FINALIZATION LOGIC
                 exit_order.mark_finalized(f"Stop-loss triggered @ {last_price}") 
@@ -220,12 +230,12 @@ class OrderWaitService:
                     tinfo.update_status(STATUS_FINALIZED, last_price=last_price)
                 return True
             else:
-                logging.error(f"[StopLoss] TWS refused stop-loss sell for {order_id} – will retry/fail.")
+                logging.error("[StopLoss] TWS refused stop-loss sell for %s – will retry/fail.", order_id)
                 # We return False so the while loop in _stop_loss_thread can decide to retry or fail.
                 return False 
 
         except Exception as e:
-            logging.exception(f"[StopLoss] Exception in finalize exit for {order_id}: {e}")
+            logging.exception("[StopLoss] Exception in finalize exit for %s: %s", order_id, e)
             exit_order.mark_failed(str(e))
             if tinfo:
                 tinfo.update_status(STATUS_FAILED, last_price=last_price, info={"error": str(e)})
@@ -246,6 +256,7 @@ class OrderWaitService:
                          stop_loss=stop_loss_price)
         self.set_stop_loss(order, stop_loss_price)
         watcher_info.add_watcher(tinfo)
+        order_journal.watch(order, "stop_loss", mode, stop=stop_loss_price)
         tinfo.update_status(STATUS_RUNNING)
 
         # 💡 Route to the correct handler based on mode
@@ -261,13 +272,13 @@ class OrderWaitService:
             self._ws_callbacks[order_id] = callback_func # Store for unsubscription
             
             self.polygon.subscribe(order.symbol, callback_func)
-            logging.info(f"[StopLoss-WS] Started WS watcher for {order.symbol} (order {order_id})")
+            logging.info("[StopLoss-WS] Started WS watcher for %s (order %s)", order.symbol, order_id)
             return None # No thread object
 
         else:
             # --- Polling Mode (Thread-Based) ---
             if mode != "poll":
-                logging.warning(f"[StopLoss] Unknown mode '{mode}' for {order_id}. Defaulting to 'poll'.")
+                logging.warning("[StopLoss] Unknown mode '%s' for %s. Defaulting to 'poll'.", mode, order_id)
             
             # 💡 Renamed target method
             t = threading.Thread(
@@ -277,7 +288,7 @@ class OrderWaitService:
                 name=f"StopLoss-{order.symbol}-{order_id[:4]}-poll"
             )
             t.start()
-            logging.info(f"[StopLoss] Started sl watcher for {order.symbol} (order {order_id})")
+            logging.info("[StopLoss] Started sl watcher for %s (order %s)", order.symbol, order_id)
             return t
 
     def _run_stop_loss_watcher_poll_thread(self, order: Order, stop_loss_price: float, tinfo: ThreadInfo):
@@ -294,7 +305,7 @@ class OrderWaitService:
         cached_conid = None
 
         logging.info(
-            f"[StopLoss-POLL] Watching {order.symbol} stop-loss @ {stop_loss_price}  ({order.right})")
+            "[StopLoss-POLL] Watching %s stop-loss @ %s  (%s)", order.symbol, stop_loss_price, order.right)
         try:
 
             while runtime_man.is_run():
@@ -302,37 +313,37 @@ class OrderWaitService:
                 with self._arclock:
                     sl = self._stoplosses.get(order.order_id)
                     if sl is None:
-                        logging.warning(f"[StopLoss-POLL] Stop-loss removed externally | order_id={order.order_id}")
+                        logging.warning("[StopLoss-POLL] Stop-loss removed externally | order_id=%s", order.order_id)
                         tinfo.update_status(STATUS_CANCELLED)
                         return
                 
                 if order.state not in (OrderState.ACTIVE, OrderState.PENDING):
                     logging.info(
-                        f"[StopLoss-POLL] Order {order.order_id} no longer active – stopping watcher.")
+                        "[StopLoss-POLL] Order %s no longer active – stopping watcher.", order.order_id)
                     tinfo.update_status(STATUS_CANCELLED)
                     return
                 
                 # 💡 Check for external cancellation
                 with self.lock:
                     if order.order_id in self.cancelled_orders:
-                        logging.info(f"[StopLoss-POLL] Watcher {order.order_id} cancelled by service.")
+                        logging.info("[StopLoss-POLL] Watcher %s cancelled by service.", order.order_id)
                         tinfo.update_status(STATUS_CANCELLED)
                         return
 
                 # 2. Fetch market data
-                snap = self.polygon.get_snapshot(order.symbol)
+                snap = self.polygon.get_snapshot(order.symbol, priority=PRIORITY_TRIGGER)
                 if not snap:
-                    logging.debug(f"[StopLoss-POLL] No snapshot for {order.symbol}")
-                    time.sleep(self.poll_interval)
+                    logging.debug("[StopLoss-POLL] No snapshot for %s", order.symbol)
+                    self.clock.sleep(self.poll_interval)
                     continue
 
-                now = time.time()
+                now = self.clock.time()
                 last_price = snap.get("last")
                 
                 # Periodic status logging (reduced frequency)
                 if last_price and now - last_print >= delay:
                     logging.info(
-                        f"[StopLoss-POLL] Monitoring {order.symbol} → {last_price}, stop={sl}")
+                        "[StopLoss-POLL] Monitoring %s → %s, stop=%s", order.symbol, last_price, sl)
                     last_print = now
                 
                 if last_price:
@@ -351,15 +362,15 @@ class OrderWaitService:
                     if not conid:
                         if now - warn_times["contract"] >= 30:
                             logging.warning(
-                                f"[StopLoss-POLL] No conId for {order.symbol} "
-                                f"{order.expiry} {order.strike}{order.right} – retrying")
+                                "[StopLoss-POLL] No conId for %s %s %s%s – retrying",
+                                order.symbol, order.expiry, order.strike, order.right)
                             warn_times["contract"] = now
-                        time.sleep(self.poll_interval)
+                        self.clock.sleep(self.poll_interval)
                         continue
                     
                     cached_conid = conid
                     contract.conId = conid
-                    logging.debug(f"[StopLoss-POLL] Cached conId {conid} for {order.symbol}")
+                    logging.debug("[StopLoss-POLL] Cached conId %s for %s", conid, order.symbol)
                 else:
                     contract = self.tws.create_option_contract(
                         order.symbol, order.expiry, order.strike, order.right)
@@ -376,10 +387,10 @@ class OrderWaitService:
                     if premium is None:
                         if now - warn_times["premium"] >= 30:
                             logging.warning(
-                                f"[StopLoss-POLL] No premium for {order.symbol} "
-                                f"{order.expiry} {order.strike}{order.right} – retrying")
+                                "[StopLoss-POLL] No premium for %s %s %s%s – retrying",
+                                order.symbol, order.expiry, order.strike, order.right)
                             warn_times["premium"] = now
-                        time.sleep(self.poll_interval)
+                        self.clock.sleep(self.poll_interval)
                         continue
 
                 # 6. Position check (with improved throttling)
@@ -387,16 +398,17 @@ class OrderWaitService:
                 if not pos or pos.get("qty", 0) <= 0:
                     if now - warn_times["position"] >= 30:
                         logging.warning(
-                            f"[StopLoss-POLL] No live position for {order.previous_id} – will keep watching")
+                            "[StopLoss-POLL] No live position for %s – will keep watching",
+                            order.previous_id)
                         warn_times["position"] = now
-                    time.sleep(self.poll_interval)
+                    self.clock.sleep(self.poll_interval)
                     continue
 
                 # 7. Exit when triggered
                 if triggered:
                     logging.info(
-                        f"[StopLoss-POLL] 🚨 TRIGGERED! {order.symbol} "
-                        f"Price {last_price} vs Stop {stop_loss_price}"
+                        "[StopLoss-POLL] 🚨 TRIGGERED! %s Price %s vs Stop %s",
+                        order.symbol, last_price, stop_loss_price, extra=AUDIT
                     )
                     live_qty = int(pos["qty"])
                     
@@ -405,10 +417,10 @@ class OrderWaitService:
                     if success:
                         return
                 
-                time.sleep(self.poll_interval)
+                self.clock.sleep(self.poll_interval)
 
         except Exception as e:
-            logging.exception(f"[StopLoss-POLL] Outer exception in stop-loss watcher: {e}")
+            logging.exception("[StopLoss-POLL] Outer exception in stop-loss watcher: %s", e)
             tinfo.update_status(STATUS_FAILED, info={"error": str(e)})
         finally:
             watcher_info.remove(order.order_id) # Cleanup watcher info on thread exit
@@ -424,11 +436,11 @@ class OrderWaitService:
             self.pending_orders[order_id] = order
 
         # ✅ IMMEDIATE TRIGGER CHECK
-        current_price = self.polygon.get_last_trade(order.symbol)
+        current_price = self.polygon.get_last_trade(order.symbol, priority=PRIORITY_TRIGGER)
         if current_price and order.is_triggered(current_price):
             logging.info(
-                f"[WaitService] 🚨 TRIGGER ALREADY MET! Executing immediately. "
-                f"Current: {current_price}, Trigger: {order.trigger}"
+                "[WaitService] 🚨 TRIGGER ALREADY MET! Executing immediately. Current: %s, Trigger: %s",
+                current_price, order.trigger, extra=AUDIT
             )
             self._finalize_order(order_id, order, tinfo=None, last_price=current_price)
             return order_id
@@ -457,13 +469,13 @@ class OrderWaitService:
             if order_id in self.pending_orders:
                 order = self.pending_orders.pop(order_id, None)
                 if order:
-                    logging.info(f"[WaitService] Cancelling PENDING order {order_id}")
+                    logging.info("[WaitService] Cancelling PENDING order %s", order_id)
                     symbol = order.symbol
             
             elif order_id in self.active_stop_losses: # 💡 NEW: Check active stop-losses
                 order = self.active_stop_losses.pop(order_id, None)
                 if order:
-                    logging.info(f"[WaitService] Cancelling STOP-LOSS watcher {order_id}")
+                    logging.info("[WaitService] Cancelling STOP-LOSS watcher %s", order_id)
                     symbol = order.symbol
 
             if order:
@@ -471,7 +483,7 @@ class OrderWaitService:
                 self.cancelled_orders.add(order_id)
                 watcher_info.update_watcher(order_id, STATUS_CANCELLED)
             else:
-                logging.warning(f"[WaitService] cancel_order: No active watcher found for {order_id}")
+                logging.warning("[WaitService] cancel_order: No active watcher found for %s", order_id)
                 return # Not found, nothing to do
 
         # Unsubscribe logic (outside lock)
@@ -480,9 +492,9 @@ class OrderWaitService:
             try:
                 self.polygon.unsubscribe(symbol, callback_func)
             except Exception as e:
-                logging.debug(f"[WaitService] Unsubscribe ignored for {symbol}: {e}")
+                logging.debug("[WaitService] Unsubscribe ignored for %s: %s", symbol, e)
         elif not callback_func:
-            logging.debug(f"[WaitService] No WS callback found for order {order_id} (likely poll mode).")
+            logging.debug("[WaitService] No WS callback found for order %s (likely poll mode).", order_id)
 
     def list_pending_orders(self):
         with self.lock:
@@ -502,12 +514,13 @@ class OrderWaitService:
         with self.trigger_lock:
             if order.is_triggered(price) and  order not in self.trigger_status:
                 self.trigger_status.add(order)
-                logging.info(f"[WaitService-WS] TRIGGERED! {order.symbol} @ {price}, trigger={order.trigger}")
+                logging.info("[WaitService-WS] TRIGGERED! %s @ %s, trigger=%s", order.symbol, price, order.trigger, extra=AUDIT)
                 
                 # Check if premarket - if so, prompt rebase/cancel instead of firing
-                if is_market_closed_or_pre_market():
+                if is_market_closed_or_pre_market(self.clock.now()):
                     logging.info(
-                        f"[WaitService-WS] Premarket trigger hit - prompting rebase/cancel | order_id={order_id}"
+                        "[WaitService-WS] Premarket trigger hit - prompting rebase/cancel | order_id=%s",
+                        order_id
                     )
                     self._handle_premarket_trigger(order_id, order, tinfo, price)
                     # Continue watching (don't remove from pending_orders)
@@ -524,7 +537,7 @@ class OrderWaitService:
                         try:
                             self.polygon.unsubscribe(order.symbol, callback_func)
                         except Exception as e:
-                            logging.debug(f"[WaitService-WS] Unsubscribe ignored for {order.symbol}: {e}")
+                            logging.debug("[WaitService-WS] Unsubscribe ignored for %s: %s", order.symbol, e)
 
                     with self.lock:
                         self.pending_orders.pop(order_id, None) # Remove from pending
@@ -550,8 +563,7 @@ class OrderWaitService:
 
         if triggered:
             logging.info(
-                f"[StopLoss-WS] TRIGGERED! {order.symbol} "
-                f"Price {price} vs Stop {stop_loss_level}"
+                "[StopLoss-WS] TRIGGERED! %s Price %s vs Stop %s", order.symbol, price, stop_loss_level, extra=AUDIT
             )
             
             # --- Triggered: Execute TWS-heavy logic NOW ---
@@ -560,7 +572,7 @@ class OrderWaitService:
             conid = self.tws.resolve_conid(contract)
             
             if not conid:
-                logging.error(f"[StopLoss-WS] Triggered, but FAILED to resolve conid for {order_id}. Retrying next tick.")
+                logging.error("[StopLoss-WS] Triggered, but FAILED to resolve conid for %s. Retrying next tick.", order_id)
                 if tinfo: tinfo.update_status(STATUS_FAILED, info={"error": "Failed to resolve conId"})
                 return # Will retry on next tick if still triggered
             
@@ -568,7 +580,7 @@ class OrderWaitService:
 
             pos = self.tws.get_position_by_order_id(order.previous_id)
             if not pos or pos.get("qty", 0) <= 0:
-                logging.warning(f"[StopLoss-WS] Triggered, but no position found for {order.previous_id}. Closing watcher.")
+                logging.warning("[StopLoss-WS] Triggered, but no position found for %s. Closing watcher.", order.previous_id)
                 self._cleanup_ws_watcher(order_id, order.symbol) # Position is gone, close watcher
                 if tinfo: tinfo.update_status(STATUS_FINALIZED, info={"message": "Position not found"})
                 return
@@ -595,7 +607,7 @@ class OrderWaitService:
             try:
                 self.polygon.unsubscribe(symbol, callback_func)
             except Exception as e:
-                logging.error(f"[WaitService] WS unsubscribe failed for {order_id}: {e}")
+                logging.error("[WaitService] WS unsubscribe failed for %s: %s", order_id, e)
 
   
     def _handle_premarket_trigger(self, order_id: str, order: Order, tinfo: ThreadInfo, last_price: float):
@@ -618,9 +630,9 @@ class OrderWaitService:
         
         if model:
             # Get latest premarket extreme and calculate new trigger/strike
-            if not is_market_closed_or_pre_market():
+            if not is_market_closed_or_pre_market(self.clock.now()):
                 # Shouldn't happen, but just in case
-                logging.warning(f"[WaitService] _handle_premarket_trigger called outside premarket")
+                logging.warning("[WaitService] _handle_premarket_trigger called outside premarket")
                 return
             
             from model import general_app
@@ -639,8 +651,9 @@ class OrderWaitService:
                     # Strike stays as original - don't recalculate
                     
                     logging.info(
-                        f"[WaitService] Auto-rebased premarket trigger | order_id={order_id} | "
-                        f"old_trigger={old_trigger} | new_trigger={new_trigger} | strike={order.strike} (unchanged)"
+                        "[WaitService] Auto-rebased premarket trigger | order_id=%s | "
+                        "old_trigger=%s | new_trigger=%s | strike=%s (unchanged)",
+                        order_id, old_trigger, new_trigger, order.strike, extra=AUDIT
                     )
                     if cb:
                         cb(
@@ -650,7 +663,7 @@ class OrderWaitService:
                 else:
                     # Rebase failed - no valid market data
                     logging.warning(
-                        f"[WaitService] Premarket trigger hit but invalid market data | order_id={order_id}"
+                        "[WaitService] Premarket trigger hit but invalid market data | order_id=%s", order_id
                     )
                     if cb:
                         cb(
@@ -660,7 +673,7 @@ class OrderWaitService:
             else:
                 # Rebase failed - no market data
                 logging.warning(
-                    f"[WaitService] Premarket trigger hit but no market data | order_id={order_id}"
+                    "[WaitService] Premarket trigger hit but no market data | order_id=%s", order_id
                 )
                 if cb:
                     cb(
@@ -669,7 +682,7 @@ class OrderWaitService:
                     )
         else:
             logging.warning(
-                f"[WaitService] Premarket trigger hit but no model found | order_id={order_id}"
+                "[WaitService] Premarket trigger hit but no model found | order_id=%s", order_id
             )
             if cb:
                 cb(
@@ -685,15 +698,16 @@ class OrderWaitService:
         """Sends the entry order to TWS and handles cleanup and status updates."""
         
         # Ensure we're in RTH (shouldn't be called in premarket, but double-check)
-        if is_market_closed_or_pre_market():
+        if is_market_closed_or_pre_market(self.clock.now()):
             logging.error(
-                f"[WaitService] _finalize_order called in premarket - this should not happen! | order_id={order_id}"
+                "[WaitService] _finalize_order called in premarket - this should not happen! | order_id=%s",
+                order_id
             )
             return
         
         # If order not ready, prepare it now (fetch price, calculate quantity)
         if not getattr(order, "_order_ready", False):
-            logging.info(f"[WaitService] Order not ready - preparing now | order_id={order_id}")
+            logging.info("[WaitService] Order not ready - preparing now | order_id=%s", order_id)
             model = getattr(order, "_model", None)
             if model and hasattr(order, "_args"):
                 try:
@@ -712,11 +726,11 @@ class OrderWaitService:
                     order.qty = prepared_order.qty
                     order._order_ready = True
                     logging.info(
-                        f"[WaitService] Order prepared | order_id={order_id} | "
-                        f"price={order.entry_price} | qty={order.qty}"
+                        "[WaitService] Order prepared | order_id=%s | price=%s | qty=%s",
+                        order_id, order.entry_price, order.qty, extra=AUDIT
                     )
                 except Exception as e:
-                    logging.error(f"[WaitService] Failed to prepare order: {e}")
+                    logging.error("[WaitService] Failed to prepare order: %s", e)
                     order.mark_failed(f"Preparation failed: {e}")
                     return
         
@@ -729,22 +743,24 @@ class OrderWaitService:
 
 
         try:
-            start_ts = time.time() * 1000
-            logging.info(f"[TWS-LATENCY] {order.symbol} Trigger hit → sending ENTRY order "
-                        f"({order.right}{order.strike}) at {start_ts:.0f} ms")
+            start_ts = self.clock.time() * 1000
+            logging.info(
+                "[TWS-LATENCY] %s Trigger hit → sending ENTRY order (%s%s) at %.0f ms",
+                order.symbol, order.right, order.strike, start_ts)
             success = self.tws.place_custom_order(order)
             if success:
-                end_ts = time.time() * 1000
+                end_ts = self.clock.time() * 1000
                 latency = end_ts - start_ts
-                logging.info(f"[TWS-LATENCY] {order.symbol} Order sent in {latency:.1f} ms "
-                            f"(start {start_ts:.0f} → end {end_ts:.0f})")
+                logging.info(
+                    "[TWS-LATENCY] %s Order sent in %.1f ms (start %.0f → end %.0f)",
+                    order.symbol, latency, start_ts, end_ts)
 
                 order.mark_active(result=f"IB Order ID: {order._ib_order_id}")
                 if getattr(order, "_status_callback", None):
                     try:
                         order._status_callback(f"Finalized: {order.symbol} {order.order_id}", "green")
                     except Exception as e:
-                        logging.error(f"[WaitService] UI callback failed for finalized order {order.order_id}: {e}")
+                        logging.error("[WaitService] UI callback failed for finalized order %s: %s", order.order_id, e)
                 
                 if getattr(order, "_fill_event", None):
                     filled = order._fill_event.wait(timeout=60)
@@ -755,7 +771,7 @@ class OrderWaitService:
                         watcher_info.update_watcher(order_id, STATUS_FINALIZED)
                         _update_tinfo_status(STATUS_FINALIZED)
                     else:
-                        logging.warning(f"[WaitService] Order {order_id} not filled within timeout window.")
+                        logging.warning("[WaitService] Order %s not filled within timeout window.", order_id)
                         # Even if not filled, we mark the *watcher* as finalized if the order was sent
                         _update_tinfo_status(STATUS_FAILED, info={"error": "Fill event timed out"}) 
 
@@ -778,8 +794,9 @@ class OrderWaitService:
                         ex_order = exit_order.set_position_size(order._position_size) 
                         ex_order.previous_id = order.order_id
                         ex_order.mark_active()
-                        logging.info(f"[WAITSERVICE] Spawned EXIT watcher {ex_order.order_id} "
-                                f"stop={stop_loss_level} ({order.right})")
+                        logging.info(
+                            "[WAITSERVICE] Spawned EXIT watcher %s stop=%s (%s)",
+                            ex_order.order_id, stop_loss_level, order.right, extra=AUDIT)
                         
                  
                         self.start_stop_loss_watcher(ex_order, stop_loss_level, mode="poll")
@@ -814,7 +831,7 @@ class OrderWaitService:
                 return True
             return False
         except Exception as e:
-            logging.error(f"[WaitService] Cancel active order failed {order_id}: {e}")
+            logging.error("[WaitService] Cancel active order failed %s: %s", order_id, e)
             watcher_info.update_watcher(order_id, STATUS_FAILED, info={"error": str(e)})
             return False
 
@@ -1,17 +1,66 @@
 # persistent_conid_storage.py
 
 import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+
+CACHE_SIZE = 4096          # symbols kept in the read-through LRU
+SQLITE_MAX_VARS = 500      # placeholders per IN (...) query
+
+# Constant SQL text, so each thread's connection keeps them in its statement cache
+_UPSERT_SQL = """
+    INSERT INTO conids (symbol, conid, updated_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT(symbol)
+    DO UPDATE SET
+        conid = excluded.conid,
+        updated_at = excluded.updated_at
+"""
+_SELECT_SQL = "SELECT conid, updated_at FROM conids WHERE symbol = ?"
+
+_MISSING = (None, None)    # cached "no row" entry
 
 
 class PersistentConidStorage:
-    def __init__(self, db_path: str = "conids.db"):
+    """
+    symbol → conid in SQLite. Each thread reuses one WAL-mode connection,
+    and reads go through an in-memory LRU that every write updates, so hot
+    lookups (resolve_conid on every STK resolution) never touch the disk.
+    """
+
+    def __init__(self, db_path: str = "conids.db", cache_size: int = CACHE_SIZE):
         self.db_path = db_path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._conns: Dict[int, Tuple[weakref.ref, sqlite3.Connection]] = {}   # thread ident → (thread, conn)
+        self._conns_lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[Optional[str], Optional[str]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         self._init_db()
 
-    def _get_conn(self):
-        return sqlite3.connect(self.db_path)
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close()/pruning may close it; it is used by one thread
+            conn = sqlite3.connect(self.db_path, cached_statements=32, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._prune_dead_locked()
+                self._conns[threading.get_ident()] = (weakref.ref(threading.current_thread()), conn)
+        return conn
+
+    def _prune_dead_locked(self):
+        """Close connections of threads that have exited (watcher threads come and go)."""
+        for ident, (ref, conn) in list(self._conns.items()):
+            thread = ref()
+            if thread is None or not thread.is_alive():
+                conn.close()
+                del self._conns[ident]
 
     def _init_db(self):
         with self._get_conn() as conn:
@@ -24,52 +73,62 @@ class PersistentConidStorage:
                 )
                 """
             )
-            conn.commit()
 
+    def close(self) -> None:
+        """Close every thread's connection (they reopen lazily on next use)."""
+        with self._conns_lock:
+            for _, conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+            self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # CACHE
+    # ------------------------------------------------------------------
+    def _cache_get(self, symbol: str):
+        with self._cache_lock:
+            row = self._cache.get(symbol)
+            if row is not None:
+                self._cache.move_to_end(symbol)
+            return row
+
+    def _cache_put(self, symbol: str, row: Tuple[Optional[str], Optional[str]]):
+        with self._cache_lock:
+            self._cache[symbol] = row
+            self._cache.move_to_end(symbol)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _row(self, symbol: str) -> Tuple[Optional[str], Optional[str]]:
+        """(conid, updated_at) for a symbol, read-through the LRU."""
+        row = self._cache_get(symbol)
+        if row is None:
+            found = self._get_conn().execute(_SELECT_SQL, (symbol,)).fetchone()
+            row = tuple(found) if found else _MISSING
+            self._cache_put(symbol, row)
+        return row
+
+    # ------------------------------------------------------------------
+    # SINGLE SYMBOL
+    # ------------------------------------------------------------------
     def store_conid(self, symbol: str, conid: str) -> None:
         """
         Insert or update a conid for a given symbol.
         """
-        now = datetime.utcnow().isoformat()
-        with self._get_conn() as conn:
-            conn.execute(
-                """
-                INSERT INTO conids (symbol, conid, updated_at)
-                VALUES (?, ?, ?)
-                ON CONFLICT(symbol)
-                DO UPDATE SET
-                    conid = excluded.conid,
-                    updated_at = excluded.updated_at
-                """,
-                (symbol, conid, now),
-            )
-            conn.commit()
+        self.store_many({symbol: conid})
 
     def get_conid(self, symbol: str) -> Optional[str]:
         """
         Retrieve the conid for a given symbol.
         """
-        with self._get_conn() as conn:
-            cur = conn.execute(
-                "SELECT conid FROM conids WHERE symbol = ?",
-                (symbol,),
-            )
-            row = cur.fetchone()
-            return row[0] if row else None
+        return self._row(symbol)[0]
 
     def get_last_update(self, symbol: str) -> Optional[datetime]:
         """
         Get last update datetime for a symbol.
         """
-        with self._get_conn() as conn:
-            cur = conn.execute(
-                "SELECT updated_at FROM conids WHERE symbol = ?",
-                (symbol,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            return datetime.fromisoformat(row[0])
+        updated_at = self._row(symbol)[1]
+        return datetime.fromisoformat(updated_at) if updated_at else None
 
     def is_fresh(self, symbol: str, days: int = 7) -> bool:
         """
@@ -80,9 +139,59 @@ class PersistentConidStorage:
             return False
         return datetime.utcnow() - last_update <= timedelta(days=days)
 
+    # ------------------------------------------------------------------
+    # BULK
+    # ------------------------------------------------------------------
+    def store_many(self, items: Union[Mapping[str, str], Iterable[Tuple[str, str]]]) -> int:
+        """
+        Upsert many (symbol, conid) pairs in one transaction. Returns the count.
+        """
+        pairs = list(items.items() if isinstance(items, Mapping) else items)
+        if not pairs:
+            return 0
+        now = datetime.utcnow().isoformat()
+        rows = [(symbol, str(conid), now) for symbol, conid in pairs]
+        with self._get_conn() as conn:
+            conn.executemany(_UPSERT_SQL, rows)
+        for symbol, conid, updated_at in rows:
+            self._cache_put(symbol, (conid, updated_at))
+        return len(rows)
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        symbol → conid (None if unknown) for many symbols: LRU hits first,
+        the rest in chunked IN (...) queries.
+        """
+        out: Dict[str, Optional[str]] = {}
+        misses = []
+        for symbol in dict.fromkeys(symbols):
+            row = self._cache_get(symbol)
+            if row is None:
+                misses.append(symbol)
+            else:
+                out[symbol] = row[0]
+
+        conn = self._get_conn()
+        for i in range(0, len(misses), SQLITE_MAX_VARS):
+            chunk = misses[i:i + SQLITE_MAX_VARS]
+            found = {
+                symbol: (conid, updated_at)
+                for symbol, conid, updated_at in conn.execute(
+                    f"SELECT symbol, conid, updated_at FROM conids WHERE symbol IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            }
+            for symbol in chunk:
+                row = found.get(symbol, _MISSING)
+                self._cache_put(symbol, row)
+                out[symbol] = row[0]
+        return out
+
 
 # Example usage:
 storage = PersistentConidStorage()
 # storage.store_conid("AAPL", "265598")
 # conid = storage.get_conid("AAPL")
 # is_recent = storage.is_fresh("AAPL")
+# storage.store_many({"AAPL": "265598", "TSLA": "76792991"})
+# conids = storage.get_many(["AAPL", "TSLA"])
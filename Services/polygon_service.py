@@ -7,12 +7,20 @@ import websocket
 import datetime
 import os
 from datetime import time as datetime_time  # Import 'time' with an alias
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 # Import the new callback manager
 from Services.callback_manager import callback_manager, ThreadedCallbackService 
+from Services.feed_supervisor import FeedSupervisor
+from Services.feed_lag import feed_lag
+from Services.tick_recorder import tick_recorder
 # --- CORRECTED IMPORT ---
 # Use the constants from your provided library
 from Services.nasdaq_info import EASTERN, MARKET_OPEN
+from Services.rate_limiter import (
+    RestScheduler, priority_label,
+    PRIORITY_TRIGGER, PRIORITY_ORDER, PRIORITY_POSITIONS
+)
 
 # Try to load dotenv if available (optional dependency)
 try:
@@ -28,6 +36,15 @@ except Exception as e:
 
 
 class PolygonService:
+    # REST budget shared by every caller (requests/second, bucket size)
+    REST_RATE_PER_SEC = 20
+    REST_BURST = 20
+
+    # Gap-fill after WS reconnect
+    GAP_FILL_BUDGET_SEC = 1.5        # max time _on_open may spend replaying
+    GAP_FILL_MAX_WINDOW_SEC = 900    # never look back further than this
+    GAP_FILL_SECOND_BARS_SEC = 600   # second bars up to this gap, minute bars above
+
     def __init__(self):
         # ✅ SECURITY FIX: Get API key from environment variable
         self.api_key = os.getenv("POLYGON_API_KEY")
@@ -37,8 +54,9 @@ class PolygonService:
                 "Please create a .env file with: POLYGON_API_KEY=your_key_here"
             )
 
-        self.base_url = "https://api.polygon.io"
-        self.ws_url = "wss://socket.polygon.io/stocks"
+        # Overridable so the app can run against Sim/polygon_standin.py
+        self.base_url = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io")
+        self.ws_url = os.getenv("POLYGON_WS_URL", "wss://socket.polygon.io/stocks")
 
         # WS için:
         # ❌ self.subscriptions = {}  <-- REMOVED: Now managed by callback_manager
@@ -50,12 +68,48 @@ class PolygonService:
         
         self._premarket_cache = {}
 
+        # Priority-aware token bucket for all REST traffic
+        self.scheduler = RestScheduler(self.REST_RATE_PER_SEC, self.REST_BURST)
+
+        # Per-symbol WS staleness tracking with REST failover
+        self.feed = FeedSupervisor(self)
+
+        # Last WS trade price per symbol (no REST) – read by local option pricing
+        self._last_prices: Dict[str, float] = {}
+
+        # Epoch seconds of the last WS disconnect (None while connected)
+        self._ws_disconnected_at: Optional[float] = None
 
         # Background websocket start
         #self._start_ws()
 
+    # ---------------- REST SCHEDULING ----------------
+    def _rest_get(self, url: str, params: Dict, timeout: float, priority: int = PRIORITY_ORDER):
+        """
+        Single gate for every REST request.
+        Waits for a token of the given priority class; returns None when the
+        request was shed (low-priority traffic during bursts).
+        """
+        if not self.scheduler.acquire(priority):
+            logging.debug(f"[Polygon] REST request shed ({priority_label(priority)}) → {url}")
+            return None
+
+        resp = requests.get(url, params=params, timeout=timeout)
+        if resp.status_code == 429:
+            self.scheduler.penalize()
+        return resp
+
+    def feed_lag_stats(self, symbol: Optional[str] = None) -> Dict:
+        """Per-symbol WS feed-lag percentiles (vendor / decode / queue / total, ms)."""
+        return feed_lag.stats(symbol)
+
+    def rest_stats(self) -> Dict:
+        """Per-priority queue-wait metrics of the REST scheduler."""
+        return self.scheduler.stats()
+
     # ---------------- REST METHODS ----------------
-    def get_option_snapshot(self, underlying: str, expiry: str, strike: float, right: str):
+    def get_option_snapshot(self, underlying: str, expiry: str, strike: float, right: str,
+                            priority: int = PRIORITY_POSITIONS):
         """
         Fetch current snapshot for a given option contract (TWS-compatible format).
         Uses the latest Polygon v3 API (no /{occ} path).
@@ -75,7 +129,9 @@ class PolygonService:
                 "limit": 1  # just get the matching contract
             }
 
-            resp = requests.get(url, params=params, timeout=6)
+            resp = self._rest_get(url, params, timeout=6, priority=priority)
+            if resp is None:
+                return None
             if resp.status_code == 404:
                 logging.warning(f"[Polygon] Snapshot not found for {underlying} {strike}{right} {expiry}")
                 return None
@@ -110,14 +166,17 @@ class PolygonService:
 
 
 
-    def _get_option_from_chain(self, underlying: str, expiry: str, strike: float, right: str):
+    def _get_option_from_chain(self, underlying: str, expiry: str, strike: float, right: str,
+                               priority: int = PRIORITY_POSITIONS):
         """
         Fallback: scan full chain with wider tolerance and debug logs.
         """
         try:
             url  = f"{self.base_url}/v3/snapshot/options/{underlying.upper()}"
             params = {"apiKey": self.api_key}
-            resp = requests.get(url, params=params, timeout=8)
+            resp = self._rest_get(url, params, timeout=8, priority=priority)
+            if resp is None:
+                return None
             resp.raise_for_status()
 
             results = resp.json().get("results", [])
@@ -205,11 +264,13 @@ class PolygonService:
             return None
 
 
-    def get_last_trade(self, symbol: str):
+    def get_last_trade(self, symbol: str, priority: int = PRIORITY_ORDER):
         url = f"{self.base_url}/v2/last/trade/{symbol.upper()}"
         params = {"apiKey": self.api_key}
         try:
-            resp = requests.get(url, params=params, timeout=5)
+            resp = self._rest_get(url, params, timeout=5, priority=priority)
+            if resp is None:
+                return None
             resp.raise_for_status()
             data = resp.json()
             return data.get("results", {}).get("p")
@@ -219,15 +280,17 @@ class PolygonService:
 
 
     
-    def get_snapshot(self, symbol: str):
+    def get_snapshot(self, symbol: str, priority: int = PRIORITY_ORDER):
         """
         Real-time L1 snapshot for a single stock – Polygon v2 Pro endpoint.
         """
-        url = f"https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers/{symbol.upper()}"
+        url = f"{self.base_url}/v2/snapshot/locale/us/markets/stocks/tickers/{symbol.upper()}"
         params = {"apiKey": self.api_key}
 
         try:
-            r = requests.get(url, params=params, timeout=5)
+            r = self._rest_get(url, params, timeout=5, priority=priority)
+            if r is None:
+                return None
             r.raise_for_status()                       # <-- fail fast on 4xx/5xx
             payload = r.json()
 
@@ -241,20 +304,9 @@ class PolygonService:
                 )
                 return None
 
-            last_trade = ticker_node.get("lastTrade", {})
-            last_quote = ticker_node.get("lastQuote", {})
-            day_bar    = ticker_node.get("day", {})
-            prev_day   = ticker_node.get("prevDay", {})
-
-            return {
-                "last":      last_trade.get("p"),  # Polygon uses 'p' for price
-                "bid":       last_quote.get("p"),  # bid price
-                "ask":       last_quote.get("P"),  # ask price
-                "today_high": day_bar.get("h"),
-                "today_low":  day_bar.get("l"),
-                "prev_high":  prev_day.get("h"),
-                "prev_low":   prev_day.get("l"),
-            }
+            snap = self._parse_snapshot_node(ticker_node)
+            tick_recorder.record_snapshot(symbol.upper(), snap["last_ts"], snap["last"], snap["last_size"])
+            return snap
 
         except requests.HTTPError as e:
             logging.error("[Polygon] HTTP error for %s: %s  body=%s",
@@ -264,8 +316,56 @@ class PolygonService:
 
         return None
 
+    def get_snapshots(self, symbols, priority: int = PRIORITY_ORDER) -> Dict[str, Dict]:
+        """
+        Batched L1 snapshot for several stocks in one request.
+        Returns {SYMBOL: snapshot-dict} (same shape as get_snapshot).
+        """
+        syms = sorted({s.upper() for s in symbols})
+        if not syms:
+            return {}
+
+        url = f"{self.base_url}/v2/snapshot/locale/us/markets/stocks/tickers"
+        params = {"apiKey": self.api_key, "tickers": ",".join(syms)}
 
-    def _get_premarket_aggregates(self, symbol: str) -> Optional[Dict]:
+        try:
+            r = self._rest_get(url, params, timeout=5, priority=priority)
+            if r is None:
+                return {}
+            r.raise_for_status()
+            out = {}
+            for node in r.json().get("tickers") or []:
+                sym = node.get("ticker")
+                if sym:
+                    snap = self._parse_snapshot_node(node)
+                    tick_recorder.record_snapshot(sym, snap["last_ts"], snap["last"], snap["last_size"])
+                    out[sym] = snap
+            return out
+        except Exception as e:
+            logging.error("[Polygon] get_snapshots failed for %s: %s", syms, e)
+            return {}
+
+    @staticmethod
+    def _parse_snapshot_node(ticker_node: Dict) -> Dict:
+        last_trade = ticker_node.get("lastTrade") or {}
+        last_quote = ticker_node.get("lastQuote") or {}
+        day_bar    = ticker_node.get("day") or {}
+        prev_day   = ticker_node.get("prevDay") or {}
+
+        return {
+            "last":      last_trade.get("p"),  # Polygon uses 'p' for price
+            "last_ts":   last_trade.get("t"),  # SIP timestamp (ns)
+            "last_size": last_trade.get("s"),
+            "bid":       last_quote.get("p"),  # bid price
+            "ask":       last_quote.get("P"),  # ask price
+            "today_high": day_bar.get("h"),
+            "today_low":  day_bar.get("l"),
+            "prev_high":  prev_day.get("h"),
+            "prev_low":   prev_day.get("l"),
+        }
+
+
+    def _get_premarket_aggregates(self, symbol: str, priority: int = PRIORITY_ORDER) -> Optional[Dict]:
         """
         Private helper to get the true premarket H/L.
         Uses EASTERN and MARKET_OPEN from nasdaq_info.py.
@@ -300,7 +400,9 @@ class PolygonService:
         params = {"apiKey": self.api_key, "sort": "asc", "adjusted": "true"}
 
         try:
-            resp = requests.get(url, params=params, timeout=10)
+            resp = self._rest_get(url, params, timeout=10, priority=priority)
+            if resp is None:
+                return None
             resp.raise_for_status()
             data = resp.json()
 
@@ -325,6 +427,22 @@ class PolygonService:
             logging.error(f"[Polygon] _get_premarket_aggregates failed for {symbol}: {e}")
             return None
 
+    def get_aggregates(self, symbol: str, start_ms: int, end_ms: int, timespan: str = "minute",
+                       priority: int = PRIORITY_ORDER, timeout: float = 5) -> List[Dict]:
+        """Raw aggregate bars (o/h/l/c/t) for [start_ms, end_ms], oldest first."""
+        url = f"{self.base_url}/v2/aggs/ticker/{symbol.upper()}/range/1/{timespan}/{start_ms}/{end_ms}"
+        params = {"apiKey": self.api_key, "sort": "asc", "adjusted": "true", "limit": 50000}
+
+        try:
+            resp = self._rest_get(url, params, timeout=timeout, priority=priority)
+            if resp is None:
+                return []
+            resp.raise_for_status()
+            return resp.json().get("results") or []
+        except Exception as e:
+            logging.error(f"[Polygon] get_aggregates failed for {symbol}: {e}")
+            return []
+
     # --- Public-Facing Data Methods ---
 
     def get_premarket_high(self, symbol: str) -> Optional[float]:
@@ -337,16 +455,20 @@ class PolygonService:
         data = self._get_premarket_aggregates(symbol)
         return data.get('low') if data else None
 
-    def get_intraday_high(self, symbol: str) -> Optional[float]:
+    def get_intraday_high(self, symbol: str, priority: int = PRIORITY_ORDER) -> Optional[float]:
         """Gets the current day's high from the snapshot."""
-        data = self.get_snapshot(symbol)
+        data = self.get_snapshot(symbol, priority=priority)
         return data.get('today_high') if data else None
 
-    def get_intraday_low(self, symbol: str) -> Optional[float]:
+    def get_intraday_low(self, symbol: str, priority: int = PRIORITY_ORDER) -> Optional[float]:
         """Gets the current day's low from the snapshot."""
-        data = self.get_snapshot(symbol)
+        data = self.get_snapshot(symbol, priority=priority)
         return data.get('today_low') if data else None
 
+    def last_price(self, symbol: str) -> Optional[float]:
+        """Most recent WS trade for a subscribed symbol, or None. Never hits REST."""
+        return self._last_prices.get(symbol.upper())
+
     # ---------------- WS METHODS ----------------
     def subscribe(self, symbol: str, callback):
         """Register a callback and send WS subscription if it's the first for this symbol."""
@@ -397,6 +519,9 @@ class PolygonService:
             elif sym in self._active_ws_symbols:
                  logging.debug(f"[Polygon] Callback removed for {sym}. WS subscription remains active.")
 
+        if sym not in remaining_symbols:
+            self.feed.forget(sym)
+
 
     def _start_ws(self):
         """Background thread ile WS başlat."""
@@ -417,6 +542,7 @@ class PolygonService:
 
         self.ws_thread = threading.Thread(target=run, daemon=True)
         self.ws_thread.start()
+        self.feed.start()
 
     def _on_open(self, ws):
         auth_msg = {"action": "auth", "params": self.api_key}
@@ -425,7 +551,8 @@ class PolygonService:
 
         # After re-authentication, resubscribe to all symbols
         with self._ws_lock:
-            for sym in self._active_ws_symbols:
+            symbols = list(self._active_ws_symbols)
+            for sym in symbols:
                 msg = {"action": "subscribe", "params": f"T.{sym}"}
                 try:
                     ws.send(json.dumps(msg))
@@ -433,12 +560,65 @@ class PolygonService:
                 except Exception as e:
                     logging.error(f"[Polygon] WS re-subscribe error for {sym}: {e}")
 
+        # Replay what was missed while disconnected, before live ticks are read
+        disconnected_at, self._ws_disconnected_at = self._ws_disconnected_at, None
+        if disconnected_at and symbols:
+            self._gap_fill(symbols, disconnected_at, time.time())
+
+    # ---------------- GAP FILL ----------------
+    def _gap_fill(self, symbols: List[str], since: float, until: float):
+        """
+        Fetch aggregates for the disconnected window and push each bar's
+        high/low through callback_manager, so triggers and stops that were
+        crossed during the gap still fire.
+        Bounded by GAP_FILL_BUDGET_SEC: symbols not fetched in time are skipped.
+        """
+        since = max(since, until - self.GAP_FILL_MAX_WINDOW_SEC)
+        gap = until - since
+        timespan = "second" if gap <= self.GAP_FILL_SECOND_BARS_SEC else "minute"
+        start_ms, end_ms = int(since * 1000), int(until * 1000)
+        logging.info(f"[Polygon] Gap-fill {len(symbols)} symbols over {gap:.1f}s ({timespan} bars)")
+
+        pool = ThreadPoolExecutor(max_workers=min(8, len(symbols)), thread_name_prefix="GapFill")
+        futures = {
+            pool.submit(self.get_aggregates, sym, start_ms, end_ms, timespan,
+                        PRIORITY_TRIGGER, self.GAP_FILL_BUDGET_SEC): sym
+            for sym in symbols
+        }
+        done, not_done = wait_futures(futures, timeout=self.GAP_FILL_BUDGET_SEC)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        if not_done:
+            logging.warning(
+                f"[Polygon] Gap-fill budget exceeded, skipped: {sorted(futures[f] for f in not_done)}"
+            )
+
+        for fut in done:
+            sym = futures[fut]
+            try:
+                bars = fut.result()
+            except Exception as e:
+                logging.error(f"[Polygon] Gap-fill failed for {sym}: {e}")
+                continue
+            for bar in bars:
+                # Walk the bar in its likely path: down-bars hit the high first
+                if bar.get("c", 0) >= bar.get("o", 0):
+                    path = (bar.get("l"), bar.get("h"))
+                else:
+                    path = (bar.get("h"), bar.get("l"))
+                for price in path:
+                    if price is not None:
+                        callback_manager.trigger(sym, price)
+            if bars:
+                logging.info(f"[Polygon] Gap-fill replayed {len(bars)} bars for {sym}")
+
     def _on_message(self, ws, message):
         """
 File `nasdaq_info.py` provided by the user.
 
         Receives message and triggers ALL registered callbacks via the manager.
         """
+        received_at = time.time()
         try:
             data = json.loads(message)
             for event in data:
@@ -446,8 +626,20 @@ File `nasdaq_info.py` provided by the user.
                     sym = event.get("sym")
                     price = event.get("p")
                     if sym and price is not None:
+                        self._last_prices[sym] = price
+                        self.feed.note_tick(sym)
+                        exch_ms = event.get("t")  # SIP timestamp, epoch ms
+                        dispatched_at = time.time()
+                        vendor_ms, decode_ms = feed_lag.record_receive(
+                            sym, exch_ms / 1000 if exch_ms else None, received_at, dispatched_at
+                        )
+                        tick_recorder.record(
+                            sym, exch_ms * 1_000_000 if exch_ms else 0, price,
+                            event.get("s", 0), int(received_at * 1e9)
+                        )
                         # 🎯 The FIX: Trigger all callbacks for this symbol via the manager
-                        callback_manager.trigger(sym, price)
+                        callback_manager.trigger(sym, price, dispatched_at=dispatched_at,
+                                                 vendor_ms=vendor_ms, decode_ms=decode_ms)
         except Exception as e:
             logging.error(f"[Polygon] WS message error: {e} | {message}")
 
@@ -456,6 +648,9 @@ File `nasdaq_info.py` provided by the user.
 
     def _on_close(self, ws, close_status_code, close_msg):
         logging.warning(f"[Polygon] WS closed: {close_status_code} {close_msg}")
+        if self._ws_disconnected_at is None:
+            self._ws_disconnected_at = time.time()
+        self.feed.mark_disconnected(f"ws closed ({close_status_code})")
 
 
 if __name__ == "__main__":
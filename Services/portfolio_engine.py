@@ -0,0 +1,212 @@
+# Services/portfolio_engine.py
+"""
+Columnar mirror of the OptionsManager positions.
+
+Each position owns one row in a set of NumPy columns. P&L, return on
+premium, exposure and the TP/SL threshold checks for the whole book are a
+handful of array operations per refresh cycle instead of a Python loop
+over OptionPosition objects. Missing market data is NaN.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Services import option_pricing
+from Services.option_pricing import RISK_FREE_RATE
+
+CONTRACT_MULTIPLIER = 100
+
+# float columns, NaN = unknown
+_FLOAT_COLS = ("qty", "avg_price", "strike", "expiry_ts", "underlying", "mid", "iv",
+               "delta", "gamma", "theta", "vega", "unrealized_pnl", "pct", "exposure")
+# bool columns
+_BOOL_COLS = ("active", "stale", "is_call", "tp_triggered", "sl_triggered")
+_GREEKS = ("delta", "gamma", "theta", "vega")
+
+
+class PortfolioBook:
+    """
+    uuid → row index over growable column arrays. Rows of closed positions
+    are recycled. Not thread-safe: OptionsManager drives it under its lock.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._rows: Dict[str, int] = {}
+        self._uuids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self.capacity = 0
+        self.cols: Dict[str, np.ndarray] = {}
+        self._grow(max(1, capacity))
+
+    # ------------------------------------------------------------------
+    # ROWS
+    # ------------------------------------------------------------------
+    def _grow(self, capacity: int):
+        old = self.capacity
+        for name in _FLOAT_COLS:
+            col = np.full(capacity, np.nan)
+            if old:
+                col[:old] = self.cols[name]
+            self.cols[name] = col
+        for name in _BOOL_COLS:
+            col = np.zeros(capacity, dtype=bool)
+            if old:
+                col[:old] = self.cols[name]
+            self.cols[name] = col
+        self._uuids.extend([None] * (capacity - old))
+        self._free.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, uuid):
+        return uuid in self._rows
+
+    def row(self, uuid: str) -> Optional[int]:
+        return self._rows.get(uuid)
+
+    def uuid_at(self, row: int) -> Optional[str]:
+        return self._uuids[row]
+
+    def upsert(self, uuid: str, qty: float, avg_price: float) -> int:
+        """Add (or update the size of) a position; returns its row."""
+        row = self._rows.get(uuid)
+        if row is None:
+            if not self._free:
+                self._grow(self.capacity * 2)
+            row = self._free.pop()
+            self._rows[uuid] = row
+            self._uuids[row] = uuid
+            for name in _FLOAT_COLS:
+                self.cols[name][row] = np.nan
+            for name in _BOOL_COLS:
+                self.cols[name][row] = False
+            self.cols["active"][row] = True
+            self.cols["stale"][row] = True
+        self.cols["qty"][row] = qty
+        self.cols["avg_price"][row] = avg_price
+        return row
+
+    def deactivate(self, uuid: str):
+        """Position closed – keep its last values, exclude it from evaluation."""
+        row = self._rows.get(uuid)
+        if row is not None:
+            self.cols["active"][row] = False
+
+    def remove(self, uuid: str):
+        row = self._rows.pop(uuid, None)
+        if row is None:
+            return
+        self._uuids[row] = None
+        self.cols["active"][row] = False
+        self._free.append(row)
+
+    def set_contract(self, row: int, strike: float, right: str, expiry: str):
+        """Static contract terms used by the local pricing model."""
+        self.cols["strike"][row] = strike
+        self.cols["is_call"][row] = str(right).upper().startswith("C")
+        try:
+            self.cols["expiry_ts"][row] = option_pricing.expiry_timestamp(str(expiry))
+        except ValueError:
+            self.cols["expiry_ts"][row] = np.nan
+
+    # ------------------------------------------------------------------
+    # MARKET DATA
+    # ------------------------------------------------------------------
+    def set_market(self, row: int, mid: Optional[float], stale: bool, greeks: Optional[Dict] = None,
+                   underlying: Optional[float] = None):
+        cols = self.cols
+        cols["stale"][row] = stale
+        if stale:
+            return
+        cols["mid"][row] = mid if mid else np.nan
+        if underlying:
+            cols["underlying"][row] = underlying
+        if greeks:
+            for name in _GREEKS:
+                value = greeks.get(name)
+                if value is not None:
+                    cols[name][row] = value
+
+    def price_greeks(self, now: float, rate: float = RISK_FREE_RATE) -> int:
+        """
+        Implied vol from mid + first-order greeks for every live row with an
+        underlying price, in one vectorized pass. Model values replace feed
+        greeks wherever they are finite. Returns the number of rows priced.
+        """
+        c = self.cols
+        rows = np.flatnonzero(c["active"] & ~c["stale"] & (c["mid"] > 0) & (c["underlying"] > 0)
+                              & (c["strike"] > 0) & np.isfinite(c["expiry_ts"]))
+        if not rows.size:
+            return 0
+
+        spot, strike, mid, is_call = c["underlying"][rows], c["strike"][rows], c["mid"][rows], c["is_call"][rows]
+        t = option_pricing.year_fraction(c["expiry_ts"][rows], now)
+        iv = option_pricing.implied_vol(mid, spot, strike, t, rate, is_call)
+        g = option_pricing.greeks(spot, strike, t, rate, iv, is_call)
+
+        solved = np.isfinite(iv)
+        c["iv"][rows[solved]] = iv[solved]
+        for name in _GREEKS:
+            c[name][rows[solved]] = g[name][solved]
+        return int(solved.sum())
+
+    # ------------------------------------------------------------------
+    # EVALUATION
+    # ------------------------------------------------------------------
+    def evaluate(self, tp_medium: float, tp_aggressive: float, sl_force: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Recompute P&L / return / exposure for every active row with a live
+        mid, then return the rows (indices) crossing each threshold:
+            {"sl": ..., "tp_aggressive": ..., "tp_medium": ...}
+        SL and aggressive-TP rows are latched (reported once per position).
+        """
+        c = self.cols
+        n = self.capacity
+        live = c["active"] & ~c["stale"] & (c["mid"] > 0)     # NaN compares False
+
+        pnl = (c["mid"] - c["avg_price"]) * c["qty"] * CONTRACT_MULTIPLIER
+        np.copyto(c["unrealized_pnl"], pnl, where=live)
+        exposure = np.where(c["delta"] != 0, c["delta"] * c["qty"] * CONTRACT_MULTIPLIER, np.nan)
+        np.copyto(c["exposure"], exposure, where=live)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = (c["mid"] - c["avg_price"]) / c["avg_price"]
+        checked = live & np.isfinite(pct)
+        np.copyto(c["pct"], pct, where=checked)
+
+        if sl_force is not None:
+            sl = checked & ~c["sl_triggered"] & (pct <= -abs(sl_force))
+            c["sl_triggered"] |= sl
+        else:
+            sl = np.zeros(n, dtype=bool)
+
+        tp_aggr = checked & ~c["tp_triggered"] & (pct >= tp_aggressive)
+        tp_med = checked & ~c["tp_triggered"] & ~tp_aggr & (pct >= tp_medium)
+        c["tp_triggered"] |= tp_aggr
+
+        return {
+            "sl": np.flatnonzero(sl),
+            "tp_aggressive": np.flatnonzero(tp_aggr),
+            "tp_medium": np.flatnonzero(tp_med),
+        }
+
+    def values(self, row: int) -> Dict[str, Optional[float]]:
+        """One row's computed outputs, NaN → None."""
+        out = {}
+        for name in ("unrealized_pnl", "pct", "exposure", "iv") + _GREEKS:
+            v = self.cols[name][row]
+            out[name] = None if np.isnan(v) else float(v)
+        return out
+
+    def totals(self) -> Dict[str, float]:
+        c = self.cols
+        active = c["active"]
+        return {
+            "positions": int(active.sum()),
+            "unrealized_pnl": float(np.nansum(c["unrealized_pnl"][active])),
+            "exposure": float(np.nansum(c["exposure"][active])),
+        }
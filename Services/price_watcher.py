@@ -1,20 +1,24 @@
 # Services/price_watcher.py
 import threading
-import time
 from Services.runtime_manager import runtime_man
+from Services.rate_limiter import PRIORITY_UI
+from Services.clock import Clock, system_clock
 
 class PriceWatcher:
-    def __init__(self, symbol: str, update_fn, polygon_service, poll_interval: float = 1.0):
+    def __init__(self, symbol: str, update_fn, polygon_service, poll_interval: float = 1.0,
+                 clock: Clock = system_clock):
         """
         :param symbol: İzlenecek sembol (örn: 'TSLA')
         :param update_fn: UI update callback, fiyat float parametre alır
         :param polygon_service: PolygonService instance
         :param poll_interval: kaç saniyede bir kontrol edilecek (default 1.0)
+        :param clock: zaman kaynağı (simülasyonda VirtualClock)
         """
         self.symbol = symbol
         self.update_fn = update_fn
         self.polygon = polygon_service
         self.poll_interval = poll_interval
+        self.clock = clock
         self.running = True
         self.current_price = None
         self._lock = threading.Lock()
@@ -27,7 +31,7 @@ class PriceWatcher:
         """Fiyatı sürekli izle ve callback ile bildir."""
         while self.running:
             try:
-                snap = self.polygon.get_snapshot(self.symbol)
+                snap = self.polygon.get_snapshot(self.symbol, priority=PRIORITY_UI)
                 if snap and "last" in snap:
                     price = snap["last"]
                     with self._lock:
@@ -35,7 +39,7 @@ class PriceWatcher:
                     self.update_fn(price)  # UI’yi besle
             except Exception as e:
                 print(f"[PriceWatcher] Error: {e}")
-            time.sleep(self.poll_interval)
+            self.clock.sleep(self.poll_interval)
             self.running = runtime_man.is_run()
 
     def get_price(self):
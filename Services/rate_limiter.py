@@ -0,0 +1,188 @@
+# Services/rate_limiter.py
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+# ==========================================================
+# Priority classes (lower value = more important)
+# ==========================================================
+PRIORITY_TRIGGER   = 0x00   # trigger / stop-loss watchers
+PRIORITY_ORDER     = 0x01   # order preparation (premium, underlying, H/L)
+PRIORITY_POSITIONS = 0x02   # position monitor refresh
+PRIORITY_UI        = 0x03   # UI price labels / watchers
+
+_PRIORITY_LABELS = {
+    PRIORITY_TRIGGER:   "TRIGGER",
+    PRIORITY_ORDER:     "ORDER",
+    PRIORITY_POSITIONS: "POSITIONS",
+    PRIORITY_UI:        "UI",
+}
+
+
+class ClassBudget:
+    """
+    Per-priority budget.
+    reserve  → fraction of the bucket that must stay available for higher classes
+    max_wait → seconds a request may queue before it is shed (None = never shed)
+    """
+    def __init__(self, reserve: float, max_wait: Optional[float]):
+        self.reserve = reserve
+        self.max_wait = max_wait
+
+
+class ClassStats:
+    """Queue-wait metrics for one priority class."""
+    def __init__(self, window: int = 512):
+        self.requested = 0
+        self.granted = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, waited: float, granted: bool):
+        self.requested += 1
+        if granted:
+            self.granted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self._recent.append(waited)
+        else:
+            self.shed += 1
+
+    def to_dict(self) -> Dict:
+        recent = sorted(self._recent)
+
+        def pct(p: float):
+            if not recent:
+                return None
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000
+
+        return {
+            "requested": self.requested,
+            "granted": self.granted,
+            "shed": self.shed,
+            "avg_wait_ms": (self.total_wait / self.granted * 1000) if self.granted else None,
+            "p50_wait_ms": pct(0.50),
+            "p95_wait_ms": pct(0.95),
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class RestScheduler:
+    """
+    Token-bucket scheduler shared by all REST calls of one vendor.
+
+    • Tokens refill at `rate` per second up to `burst`.
+    • A class may only spend a token while the bucket stays above its reserve,
+      so low-priority traffic is starved first when the bucket runs dry.
+    • A class never overtakes a waiting higher-priority class.
+    • Requests that wait longer than their class max_wait are shed (acquire → False).
+    """
+
+    DEFAULT_BUDGETS = {
+        PRIORITY_TRIGGER:   ClassBudget(reserve=0.00, max_wait=None),
+        PRIORITY_ORDER:     ClassBudget(reserve=0.10, max_wait=5.0),
+        PRIORITY_POSITIONS: ClassBudget(reserve=0.25, max_wait=1.0),
+        PRIORITY_UI:        ClassBudget(reserve=0.50, max_wait=0.25),
+    }
+
+    PENALTY_SEC = 1.0   # cool-down applied on a 429 response
+
+    def __init__(self, rate: float, burst: int, budgets: Optional[Dict[int, ClassBudget]] = None):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.budgets = dict(budgets or self.DEFAULT_BUDGETS)
+
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting: Dict[int, int] = {p: 0 for p in self.budgets}
+        self._stats: Dict[int, ClassStats] = {p: ClassStats() for p in self.budgets}
+        self._throttled = 0
+
+    # ------------------------------------------------------------------
+    # INTERNALS (call with self._cond held)
+    # ------------------------------------------------------------------
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def _floor(self, priority: int) -> float:
+        return self.budgets[priority].reserve * self.burst
+
+    def _higher_waiting(self, priority: int) -> bool:
+        return any(n for p, n in self._waiting.items() if p < priority)
+
+    # ------------------------------------------------------------------
+    # PUBLIC API
+    # ------------------------------------------------------------------
+    def acquire(self, priority: int = PRIORITY_ORDER) -> bool:
+        """
+        Block until a token is granted for `priority`.
+        Returns False if the request was shed because it exceeded its class max_wait.
+        """
+        if priority not in self.budgets:
+            priority = max(self.budgets)
+
+        budget = self.budgets[priority]
+        floor = self._floor(priority)
+        start = time.monotonic()
+        deadline = start + budget.max_wait if budget.max_wait is not None else None
+
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if self._tokens >= 1 + floor and not self._higher_waiting(priority):
+                        self._tokens -= 1
+                        self._stats[priority].record(now - start, granted=True)
+                        return True
+
+                    if deadline is not None and now >= deadline:
+                        self._stats[priority].record(now - start, granted=False)
+                        return False
+
+                    # Sleep until enough tokens could have refilled (or we get notified)
+                    needed = max(0.005, (1 + floor - self._tokens) / self.rate)
+                    if deadline is not None:
+                        needed = min(needed, deadline - now)
+                    self._cond.wait(needed)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def penalize(self):
+        """Drain the bucket after the vendor answered 429 (Too Many Requests)."""
+        with self._cond:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - self.rate * self.PENALTY_SEC
+            self._throttled += 1
+        logging.warning(
+            f"[RestScheduler] 429 received – bucket drained for {self.PENALTY_SEC:.1f}s "
+            f"(total throttles={self._throttled})"
+        )
+
+    def stats(self) -> Dict:
+        """Per-class queue-wait metrics, keyed by class label."""
+        with self._cond:
+            out = {
+                _PRIORITY_LABELS.get(p, str(p)): s.to_dict()
+                for p, s in self._stats.items()
+            }
+            out["tokens"] = round(self._tokens, 2)
+            out["throttled_429"] = self._throttled
+            return out
+
+
+def priority_label(priority: int) -> str:
+    return _PRIORITY_LABELS.get(priority, f"UNKNOWN({priority})")
@@ -0,0 +1,288 @@
+# Services/risk_book.py
+"""
+Aggregated risk per underlying, kept up to date from fill and order-status
+deltas instead of being recomputed from the per-uuid positions.
+
+    contracts        open option contracts (long)
+    premium          premium at risk – cost basis of the open contracts, $
+    net_delta        share-equivalent delta (contracts × delta × 100)
+    pending_*        contracts / premium reserved by working BUY orders
+
+TWSService reserves before placeOrder (O(1) cap check), applies every
+execDetails once by execId and releases what is left of a reservation when
+the order reaches a terminal orderStatus. OptionsManager feeds per-contract
+deltas as its pricing pass produces them.
+
+Caps come from the environment (0 / unset = no cap) and can be overridden
+per symbol with set_limits().
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+CONTRACT_MULTIPLIER = 100
+
+DEFAULT_MAX_CONTRACTS = int(os.getenv("RISK_MAX_CONTRACTS_PER_SYMBOL", "0"))
+DEFAULT_MAX_PREMIUM = float(os.getenv("RISK_MAX_PREMIUM_PER_SYMBOL", "0"))
+
+MAX_EXEC_IDS = 10000            # execIds remembered for duplicate suppression
+
+# orderStatus values after which a reservation can no longer fill
+TERMINAL_STATUSES = {"filled", "cancelled", "apicancelled", "inactive"}
+
+
+class RiskLimits:
+    """Per-symbol caps; None = unlimited."""
+    __slots__ = ("max_contracts", "max_premium")
+
+    def __init__(self, max_contracts: Optional[int] = None, max_premium: Optional[float] = None):
+        self.max_contracts = max_contracts
+        self.max_premium = max_premium
+
+    def to_dict(self) -> Dict:
+        return {"max_contracts": self.max_contracts, "max_premium": self.max_premium}
+
+
+DEFAULT_LIMITS = RiskLimits(DEFAULT_MAX_CONTRACTS or None, DEFAULT_MAX_PREMIUM or None)
+
+
+class SymbolRisk:
+    """Running totals for one underlying."""
+    __slots__ = ("symbol", "contracts", "premium", "net_delta", "pending_contracts", "pending_premium")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.contracts = 0
+        self.premium = 0.0
+        self.net_delta = 0.0
+        self.pending_contracts = 0
+        self.pending_premium = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "contracts": self.contracts,
+            "premium_at_risk": round(self.premium, 2),
+            "net_delta": round(self.net_delta, 2),
+            "pending_contracts": self.pending_contracts,
+            "pending_premium": round(self.pending_premium, 2),
+        }
+
+
+class _PositionRisk:
+    """One position's contribution to its SymbolRisk (needed to apply deltas)."""
+    __slots__ = ("symbol", "contracts", "avg_price", "delta")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.contracts = 0
+        self.avg_price = 0.0
+        self.delta: Optional[float] = None      # per contract, None until priced
+
+
+class _Reservation:
+    __slots__ = ("symbol", "contracts", "price")
+
+    def __init__(self, symbol: str, contracts: int, price: float):
+        self.symbol = symbol
+        self.contracts = contracts
+        self.price = price
+
+    @property
+    def premium(self) -> float:
+        return self.contracts * self.price * CONTRACT_MULTIPLIER
+
+
+class RiskBook:
+    """
+    symbol → SymbolRisk, updated incrementally under one lock. Positions are
+    keyed by the BUY order's custom uuid, the same key TWSService uses in
+    _positions_by_order_id (SELL fills are mapped back to it).
+    """
+
+    def __init__(self, default_limits: RiskLimits = DEFAULT_LIMITS):
+        self._lock = threading.Lock()
+        self._symbols: Dict[str, SymbolRisk] = {}
+        self._positions: Dict[str, _PositionRisk] = {}
+        self._reservations: Dict[str, _Reservation] = {}
+        self._limits: Dict[str, RiskLimits] = {}
+        self._default_limits = default_limits
+        self._exec_ids: "OrderedDict[str, None]" = OrderedDict()
+
+    def _symbol(self, symbol: str) -> SymbolRisk:
+        risk = self._symbols.get(symbol)
+        if risk is None:
+            risk = self._symbols[symbol] = SymbolRisk(symbol)
+        return risk
+
+    # ------------------------------------------------------------------
+    # LIMITS
+    # ------------------------------------------------------------------
+    def set_limits(self, symbol: str, max_contracts: Optional[int] = None, max_premium: Optional[float] = None):
+        with self._lock:
+            self._limits[symbol.upper()] = RiskLimits(max_contracts, max_premium)
+
+    def limits(self, symbol: str) -> RiskLimits:
+        return self._limits.get(symbol.upper(), self._default_limits)
+
+    # ------------------------------------------------------------------
+    # PRE-TRADE
+    # ------------------------------------------------------------------
+    def _breach(self, risk: SymbolRisk, contracts: int, premium: float) -> Optional[str]:
+        lim = self._limits.get(risk.symbol, self._default_limits)
+        if lim.max_contracts is not None:
+            total = risk.contracts + risk.pending_contracts + contracts
+            if total > lim.max_contracts:
+                return f"contracts {total} > cap {lim.max_contracts}"
+        if lim.max_premium is not None:
+            total = risk.premium + risk.pending_premium + premium
+            if total > lim.max_premium:
+                return f"premium {total:,.2f} > cap {lim.max_premium:,.2f}"
+        return None
+
+    def check(self, symbol: str, contracts: int, price: float) -> Optional[str]:
+        """Reason the extra exposure would breach the symbol caps, or None."""
+        symbol = symbol.upper()
+        with self._lock:
+            return self._breach(self._symbol(symbol), contracts, contracts * price * CONTRACT_MULTIPLIER)
+
+    def reserve(self, order_id: str, symbol: str, contracts: int, price: float) -> Optional[str]:
+        """
+        Check and reserve in one step so two orders racing on the same symbol
+        can't both pass. Returns the breach reason (nothing reserved) or None.
+        """
+        symbol = symbol.upper()
+        res = _Reservation(symbol, int(contracts), float(price or 0.0))
+        with self._lock:
+            risk = self._symbol(symbol)
+            reason = self._breach(risk, res.contracts, res.premium)
+            if reason:
+                return reason
+            self._release_locked(order_id)
+            self._reservations[order_id] = res
+            risk.pending_contracts += res.contracts
+            risk.pending_premium += res.premium
+        return None
+
+    def release(self, order_id: str):
+        """Drop whatever is left of an order's reservation (cancel / reject / terminal status)."""
+        with self._lock:
+            self._release_locked(order_id)
+
+    def _release_locked(self, order_id: str):
+        res = self._reservations.pop(order_id, None)
+        if res is None:
+            return
+        risk = self._symbols[res.symbol]
+        risk.pending_contracts -= res.contracts
+        risk.pending_premium = max(0.0, risk.pending_premium - res.premium)
+
+    # ------------------------------------------------------------------
+    # FILLS / STATUS
+    # ------------------------------------------------------------------
+    def apply_fill(self, exec_id: Optional[str], position_id: str, symbol: str,
+                   side: str, shares: int, price: float) -> bool:
+        """
+        Apply one execution (side "BOT"/"SLD"). Executions already seen
+        (IB replays them after reconnects) are ignored. Returns True if applied.
+        """
+        shares = int(shares)
+        if shares <= 0:
+            return False
+        symbol = symbol.upper()
+        with self._lock:
+            if exec_id:
+                if exec_id in self._exec_ids:
+                    return False
+                self._exec_ids[exec_id] = None
+                if len(self._exec_ids) > MAX_EXEC_IDS:
+                    self._exec_ids.popitem(last=False)
+
+            pos = self._positions.get(position_id)
+            if pos is None:
+                pos = self._positions[position_id] = _PositionRisk(symbol)
+            risk = self._symbol(pos.symbol)
+
+            if side == "BOT":
+                cost = shares * price * CONTRACT_MULTIPLIER
+                pos.avg_price = (pos.avg_price * pos.contracts + price * shares) / (pos.contracts + shares)
+                pos.contracts += shares
+                risk.contracts += shares
+                risk.premium += cost
+                res = self._reservations.get(position_id)
+                if res is not None:
+                    used = min(shares, res.contracts)
+                    res.contracts -= used
+                    risk.pending_contracts -= used
+                    risk.pending_premium = max(0.0, risk.pending_premium - used * res.price * CONTRACT_MULTIPLIER)
+                    if res.contracts <= 0:
+                        del self._reservations[position_id]
+                signed = shares
+            elif side == "SLD":
+                closed = min(shares, pos.contracts)
+                pos.contracts -= closed
+                risk.contracts -= closed
+                risk.premium = max(0.0, risk.premium - closed * pos.avg_price * CONTRACT_MULTIPLIER)
+                signed = -closed
+            else:
+                return False
+
+            if pos.delta is not None:
+                risk.net_delta += signed * pos.delta * CONTRACT_MULTIPLIER
+            if pos.contracts <= 0:
+                self._drop_position_locked(position_id, pos, risk)
+        return True
+
+    def on_order_status(self, order_id: str, status: str):
+        """Terminal statuses free the unfilled part of the order's reservation."""
+        if status.lower() in TERMINAL_STATUSES:
+            self.release(order_id)
+
+    def _drop_position_locked(self, position_id: str, pos: _PositionRisk, risk: SymbolRisk):
+        del self._positions[position_id]
+        if not risk.contracts:
+            # flat – clear float residue left by the incremental updates
+            risk.net_delta = 0.0
+            risk.premium = 0.0
+
+    # ------------------------------------------------------------------
+    # GREEKS
+    # ------------------------------------------------------------------
+    def set_delta(self, position_id: str, delta: Optional[float]):
+        """Per-contract delta of a position; moves its symbol's net delta by the difference."""
+        if delta is None:
+            return
+        with self._lock:
+            pos = self._positions.get(position_id)
+            if pos is None:
+                return
+            old = pos.delta or 0.0
+            pos.delta = delta
+            self._symbols[pos.symbol].net_delta += (delta - old) * pos.contracts * CONTRACT_MULTIPLIER
+
+    # ------------------------------------------------------------------
+    # READ
+    # ------------------------------------------------------------------
+    def exposure(self, symbol: str) -> Dict:
+        with self._lock:
+            risk = self._symbols.get(symbol.upper())
+            return risk.to_dict() if risk else SymbolRisk(symbol.upper()).to_dict()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {s: r.to_dict() for s, r in self._symbols.items()
+                    if r.contracts or r.pending_contracts}
+
+    def totals(self) -> Dict:
+        with self._lock:
+            return {
+                "symbols": sum(1 for r in self._symbols.values() if r.contracts),
+                "contracts": sum(r.contracts for r in self._symbols.values()),
+                "premium_at_risk": round(sum(r.premium for r in self._symbols.values()), 2),
+                "net_delta": round(sum(r.net_delta for r in self._symbols.values()), 2),
+            }
+
+
+risk_book = RiskBook()
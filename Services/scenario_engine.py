@@ -0,0 +1,112 @@
+# Services/scenario_engine.py
+"""
+Portfolio P&L over a grid of shocks: underlying move × IV shift × days of
+decay, repriced with Black-Scholes for every position in one broadcast.
+
+    result = scenario_pnl(options_manager.snapshot().book)
+    result.pnl[m, v, d]   # $ P&L vs. the current model value
+
+Inputs are the PortfolioBook columns OptionsManager publishes with each
+PositionSnapshot; rows without a solved IV or underlying are skipped.
+"""
+import time
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from Services import option_pricing
+from Services.option_pricing import RISK_FREE_RATE
+from Services.portfolio_engine import CONTRACT_MULTIPLIER
+
+DEFAULT_MOVES = tuple(np.round(np.arange(-0.10, 0.10001, 0.005), 4))    # ±10% in 0.5% steps
+DEFAULT_IV_SHIFTS = (-0.10, -0.05, -0.02, 0.0, 0.02, 0.05, 0.10)           # absolute vol points
+DEFAULT_DAYS = (0, 1, 2, 3, 5, 7, 10)
+
+MIN_VOL = 0.01
+CHUNK_ELEMENTS = 1 << 16    # repricing block size – keeps temporaries cache-resident
+
+# PortfolioBook columns a scenario run needs
+BOOK_COLUMNS = ("qty", "strike", "expiry_ts", "underlying", "iv", "is_call")
+
+
+class ScenarioGrid(NamedTuple):
+    moves: Sequence[float] = DEFAULT_MOVES          # fractional underlying move
+    iv_shifts: Sequence[float] = DEFAULT_IV_SHIFTS  # added to each position's IV
+    days: Sequence[float] = DEFAULT_DAYS            # calendar days of decay
+
+    @property
+    def shape(self):
+        return len(self.moves), len(self.iv_shifts), len(self.days)
+
+    @property
+    def size(self) -> int:
+        m, v, d = self.shape
+        return m * v * d
+
+
+class ScenarioResult(NamedTuple):
+    grid: ScenarioGrid
+    pnl: np.ndarray            # (moves, iv_shifts, days) portfolio $ P&L
+    positions: int             # rows priced
+    skipped: int               # rows without IV / underlying
+    elapsed_ms: float
+
+    def worst(self) -> Dict:
+        return self._at(np.unravel_index(np.argmin(self.pnl), self.pnl.shape)) if self.pnl.size else {}
+
+    def best(self) -> Dict:
+        return self._at(np.unravel_index(np.argmax(self.pnl), self.pnl.shape)) if self.pnl.size else {}
+
+    def _at(self, idx) -> Dict:
+        m, v, d = idx
+        return {"move": self.grid.moves[m], "iv_shift": self.grid.iv_shifts[v],
+                "days": self.grid.days[d], "pnl": float(self.pnl[idx])}
+
+
+def book_columns(book) -> Dict[str, np.ndarray]:
+    """Copy of the scenario inputs for the active rows of a PortfolioBook."""
+    active = book.cols["active"]
+    return {name: book.cols[name][active].copy() for name in BOOK_COLUMNS}
+
+
+def scenario_pnl(columns: Mapping[str, np.ndarray], grid: ScenarioGrid = ScenarioGrid(),
+                 now: Optional[float] = None, rate: float = RISK_FREE_RATE) -> ScenarioResult:
+    """Full (moves × iv_shifts × days) P&L surface in one vectorized repricing."""
+    start = time.perf_counter()
+    now = time.time() if now is None else now
+
+    n = len(columns["qty"]) if columns else 0
+    if n:
+        spot0, iv, strike, qty = (np.asarray(columns[k], dtype=float) for k in ("underlying", "iv", "strike", "qty"))
+        usable = (spot0 > 0) & (iv > 0) & (strike > 0) & np.isfinite(columns["expiry_ts"]) & (qty != 0)
+    else:
+        usable = np.zeros(0, dtype=bool)
+
+    if not usable.any():
+        return ScenarioResult(grid, np.zeros(grid.shape), 0, n, (time.perf_counter() - start) * 1000)
+
+    spot0, iv, strike, qty = spot0[usable], iv[usable], strike[usable], qty[usable]
+    is_call = np.asarray(columns["is_call"], dtype=bool)[usable]
+    t0 = option_pricing.year_fraction(np.asarray(columns["expiry_ts"], dtype=float)[usable], now)
+    weight = qty * CONTRACT_MULTIPLIER
+
+    moves = np.asarray(grid.moves, dtype=float)
+    shifts = np.asarray(grid.iv_shifts, dtype=float)
+    days = np.asarray(grid.days, dtype=float)
+
+    # (M,1,1,P) × (1,V,1,P) × (1,1,D,P) → (M,V,D,P), a few moves at a time
+    vol = np.maximum(iv + shifts[None, :, None], MIN_VOL)[:, :, None, :].repeat(len(days), axis=2)
+    t = np.maximum(t0 - days[:, None] / 365.0, option_pricing.MIN_T)[None, None, :, :].repeat(len(shifts), axis=1)
+    per_move = vol.size
+    step = max(1, CHUNK_ELEMENTS // per_move)
+
+    base_value = option_pricing.bs_price(spot0, strike, t0, rate, iv, is_call) @ weight
+    pnl = np.empty(grid.shape)
+    for lo in range(0, len(moves), step):
+        chunk = moves[lo:lo + step]
+        spot = spot0 * (1.0 + chunk)[:, None, None, None]
+        pnl[lo:lo + len(chunk)] = option_pricing.bs_price(spot, strike, t, rate, vol, is_call) @ weight
+    pnl -= base_value
+
+    return ScenarioResult(grid, pnl, int(usable.sum()), n - int(usable.sum()),
+                          (time.perf_counter() - start) * 1000)
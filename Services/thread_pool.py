@@ -85,6 +85,18 @@ class CustomThreadPool:
             # Put the function and its arguments onto the queue
             self._task_queue.put((func, args, kwargs))
 
+    def join(self):
+        """Block until every task submitted so far has finished running."""
+        self._task_queue.join()
+
+    def pending(self) -> int:
+        """Tasks submitted but not yet finished (queued + running)."""
+        return self._task_queue.unfinished_tasks
+
+    def qsize(self) -> int:
+        """Tasks still waiting for a worker."""
+        return self._task_queue.qsize()
+
     def shutdown(self, wait: bool = True):
         """Signal all worker threads to stop and optionally wait for completion."""
         with self._shutdown_lock:
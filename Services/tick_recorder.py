@@ -0,0 +1,201 @@
+# Services/tick_recorder.py
+import atexit
+import datetime
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from Services.nasdaq_info import EASTERN
+
+# ==========================================================
+# FILE FORMAT
+#   <dir>/<YYYYMMDD>.ticks    16-byte header + fixed 32-byte records
+#   <dir>/<YYYYMMDD>.symbols  one symbol per line, line number = symbol id
+# ==========================================================
+TICK_MAGIC = b"ARCTICK1"
+TICK_VERSION = 1
+HEADER = struct.Struct("<8sHHI")        # magic, version, record size, reserved
+RECORD = struct.Struct("<IqqdI")        # symbol id, exchange ts ns, receive ts ns, price, size
+
+TICK_SUFFIX = ".ticks"
+SYMBOL_SUFFIX = ".symbols"
+
+
+def day_key(ts_ns: int) -> str:
+    """Trading-day file key (US/Eastern date) for an epoch-ns timestamp."""
+    return datetime.datetime.fromtimestamp(ts_ns / 1e9, EASTERN).strftime("%Y%m%d")
+
+
+def day_bounds(ts_ns: int):
+    """(day key, start ns, end ns) of the US/Eastern day containing ts_ns."""
+    local = datetime.datetime.fromtimestamp(ts_ns / 1e9, EASTERN)
+    start = EASTERN.localize(datetime.datetime(local.year, local.month, local.day))
+    end = EASTERN.localize(datetime.datetime.combine(start.date() + datetime.timedelta(days=1), datetime.time()))
+    return local.strftime("%Y%m%d"), int(start.timestamp() * 1e9), int(end.timestamp() * 1e9)
+
+
+def load_symbols(path: str) -> List[str]:
+    """Symbol table of a .ticks file (index = symbol id)."""
+    sidecar = path[:-len(TICK_SUFFIX)] + SYMBOL_SUFFIX if path.endswith(TICK_SUFFIX) else path
+    if not os.path.exists(sidecar):
+        return []
+    with open(sidecar, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class _DayFile:
+    """Open handles + symbol table for one trading day."""
+
+    def __init__(self, directory: str, day: str):
+        self.day = day
+        self.path = os.path.join(directory, day + TICK_SUFFIX)
+        self.sym_path = os.path.join(directory, day + SYMBOL_SUFFIX)
+
+        self.symbols: Dict[str, int] = {s: i for i, s in enumerate(load_symbols(self.sym_path))}
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size
+        self.fh = open(self.path, "ab")
+        if new_file:
+            self.fh.write(HEADER.pack(TICK_MAGIC, TICK_VERSION, RECORD.size, 0))
+        self.sym_fh = open(self.sym_path, "a", encoding="utf-8")
+
+    def symbol_id(self, sym: str) -> int:
+        sid = self.symbols.get(sym)
+        if sid is None:
+            sid = len(self.symbols)
+            self.symbols[sym] = sid
+            self.sym_fh.write(sym + "\n")
+        return sid
+
+    def close(self):
+        for fh in (self.sym_fh, self.fh):
+            try:
+                fh.flush()
+                fh.close()
+            except Exception:
+                pass
+
+
+class TickRecorder:
+    """
+    Append-only binary tick recorder.
+
+    record() only appends a tuple to a deque (thread-safe, lock-free);
+    a background thread pops what is queued, resolves symbol ids, packs fixed
+    32-byte records and writes them to the day file. Symbol sidecars are
+    flushed before the records that reference them.
+    """
+
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, directory: str = "ticks", enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self._buf: deque = deque()
+        self._days: Dict[str, _DayFile] = {}
+        self._last_snapshot_ts: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+
+    # ------------------------------------------------------------------
+    # HOT PATH
+    # ------------------------------------------------------------------
+    def record(self, symbol: str, exchange_ts_ns: int, price: float, size: int = 0,
+               receive_ts_ns: Optional[int] = None):
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self.start()
+        self._buf.append((symbol, exchange_ts_ns or 0, receive_ts_ns or time.time_ns(), price, size or 0))
+
+    def record_snapshot(self, symbol: str, exchange_ts_ns: Optional[int], price: Optional[float], size: int = 0):
+        """Poll path: skip repeats of the same last trade."""
+        if not self.enabled or price is None:
+            return
+        if exchange_ts_ns and self._last_snapshot_ts.get(symbol) == exchange_ts_ns:
+            return
+        self._last_snapshot_ts[symbol] = exchange_ts_ns
+        self.record(symbol, exchange_ts_ns, price, size)
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="TickRecorder", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        logging.info(f"[TickRecorder] Recording ticks to {os.path.abspath(self.directory)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self.flush()
+        for day in list(self._days.values()):
+            day.close()
+        self._days.clear()
+
+    def _run(self):
+        while not self._stop.wait(self.FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"[TickRecorder] Flush failed: {e}")
+
+    # ------------------------------------------------------------------
+    # FLUSH
+    # ------------------------------------------------------------------
+    def _day(self, day: str) -> _DayFile:
+        f = self._days.get(day)
+        if f is None:
+            # Day rolled over – close yesterday's handles
+            for old in list(self._days.values()):
+                old.close()
+            self._days.clear()
+            f = _DayFile(self.directory, day)
+            self._days[day] = f
+        return f
+
+    def flush(self):
+        buf = self._buf
+        if not buf:
+            return
+        # popleft, not a list swap: a producer can never append to a batch already taken
+        popleft = buf.popleft
+        batch = [popleft() for _ in range(len(buf))]
+
+        current, chunk = None, bytearray()
+        lo = hi = 0
+        pack = RECORD.pack
+        for sym, exch_ts, recv_ts, price, size in batch:
+            if not lo <= recv_ts < hi:
+                day, lo, hi = day_bounds(recv_ts)
+                if current is None or day != current.day:
+                    self._write(current, chunk)
+                    current, chunk = self._day(day), bytearray()
+            chunk += pack(current.symbol_id(sym), exch_ts, recv_ts, float(price), int(size))
+        self._write(current, chunk)
+        self.written += len(batch)
+
+    @staticmethod
+    def _write(day: Optional[_DayFile], chunk: bytearray):
+        if day is None or not chunk:
+            return
+        day.sym_fh.flush()
+        day.fh.write(chunk)
+        day.fh.flush()
+
+
+tick_recorder = TickRecorder(
+    directory=os.getenv("TICK_RECORD_DIR", "ticks"),
+    enabled=os.getenv("TICK_RECORDING", "1") not in ("0", "false", "False"),
+)
@@ -5,15 +5,23 @@ from ibapi.contract import Contract
 from ibapi.order import Order as IBOrder
 
 import logging
+import os
 import random
 from typing import List, Dict, Optional
 from Helpers.Order import Order
+from Helpers.log_pipeline import AUDIT
 import traceback
 from Services.nasdaq_info import is_market_closed_or_pre_market
 from Services.persistent_conid_storage import storage
+from Services.risk_book import risk_book
+from Services.order_journal import order_journal
 import time, threading
 ORDER_LOCK = threading.Lock()   # <-- only one order can pass at a time
 
+# Overridable so the app can run against Sim/tws_standin.py
+DEFAULT_TWS_HOST = os.getenv("TWS_HOST", "127.0.0.1")
+DEFAULT_TWS_PORT = int(os.getenv("TWS_PORT", "7497"))
+
 class TWSService(EWrapper, EClient):
     """
     TWS Service that integrates with Helpers.Order system
@@ -41,10 +49,22 @@ class TWSService(EWrapper, EClient):
         # Track custom orders from Helpers.Order
         self.option_chains = {}  # Add this line
         self._pending_orders = {}  # custom_order_id -> Helpers.Order object
-        self._last_print = 0
+        self._last_conn_state: Optional[bool] = None   # conn_status() logs on change only
         self._positions_by_order_id: dict[str, dict] = {}
         self._ib_to_order_id: dict[int, str] = {}
         self._ib_to_custom_id: dict[int, str] = {}   # <-- NEW: map IB orderId -> custom UUID
+        self._closing = False    # set by disconnect_gracefully – suppresses auto-reconnect
+        self._req_lock = threading.Lock()
+
+        # Per-reqId callback routing (replaces monkeypatching self.tickPrice etc.)
+        self._tick_handlers: Dict[int, callable] = {}             # reqId → fn(tickType, price)
+        self._contract_handlers: Dict[int, tuple] = {}            # reqId → (on_details, on_end)
+
+        # Streaming option quotes, shared by conId
+        self._quote_lock = threading.Lock()
+        self._quotes: Dict[int, dict] = {}          # conId → {"bid", "ask", "last", "mid", greeks, "underlying", "ts", "rx"}
+        self._quote_subs: Dict[int, dict] = {}      # conId → {"req_id", "contract", "refs"}
+        self._quote_reqs: Dict[int, int] = {}       # streaming reqId → conId
         logging.info("[TWSService] __init__ finished – empty caches, counters reset")
 
     def conn_status(self) -> bool:
@@ -52,16 +72,15 @@ class TWSService(EWrapper, EClient):
         Returns True if currently connected to TWS and next_valid_order_id has been set.
         This method checks both the IB API connection and the internal event flag.
         """
-        logging.info(f"[TWSService] conn_status() called – checking connection health")
         is_alive = self.isConnected() and self.connection_ready.is_set() and self.next_valid_order_id is not None
-        if not is_alive:
-            logging.warning("[TWSService] conn_status: Not connected to TWS")
-        else:
-            now = time.time()
-            if now - self._last_print >= 60:
+        # polled in a loop (main.py conn monitor) – only state changes are worth a line
+        if is_alive != self._last_conn_state:
+            self._last_conn_state = is_alive
+            if is_alive:
                 logging.info("[TWSService] conn_status: Connected and healthy")
-                self._last_print = now
-        logging.info(f"[TWSService] conn_status() returning {is_alive}")
+            else:
+                logging.warning("[TWSService] conn_status: Not connected to TWS")
+        logging.debug("[TWSService] conn_status() returning %s", is_alive)
         return is_alive
 
     def disconnect(self) -> None:
@@ -75,7 +94,7 @@ class TWSService(EWrapper, EClient):
             f"  {s}" for s in traceback.format_stack(limit=3)[:-1][-2:]
         )
         logging.warning(
-            f"[TWSService] disconnect() invoked — socket will close.\n{caller}"
+            "[TWSService] disconnect() invoked — socket will close.\n%s", caller
         )
 
         # *** NOW run the real IB code ***
@@ -86,13 +105,13 @@ class TWSService(EWrapper, EClient):
         self.connection_ready.clear()
         logging.info("[TWSService] disconnect() complete – state cleared")
 
-    def reconnect(self, host: str = "127.0.0.1", port: int = 7497, timeout: int = 10) -> bool:
+    def reconnect(self, host: str = DEFAULT_TWS_HOST, port: int = DEFAULT_TWS_PORT, timeout: int = 10) -> bool:
         """
         Attempts to reconnect to TWS/IB Gateway.
         Safely disconnects first if a stale session exists.
         Returns True if the reconnection is successful.
         """
-        logging.info(f"[TWSService] reconnect() start – target {host}:{port}")
+        logging.info("[TWSService] reconnect() start – target %s:%s", host, port)
         try:
             if self.isConnected():
                 logging.info("[TWSService] reconnect(): Closing existing connection before retry...")
@@ -100,9 +119,9 @@ class TWSService(EWrapper, EClient):
                     self.disconnect_gracefully()
                     time.sleep(1)
                 except Exception as e:
-                    logging.warning(f"[TWSService] reconnect(): Error while disconnecting: {e}")
+                    logging.warning("[TWSService] reconnect(): Error while disconnecting: %s", e)
 
-            logging.info(f"[TWSService] Attempting reconnection to {host}:{port} (Client ID: {self.client_id})")
+            logging.info("[TWSService] Attempting reconnection to %s:%s (Client ID: %s)", host, port, self.client_id)
             result = self.connect_and_start(host=host, port=port, timeout=timeout)
             
             if result:
@@ -113,20 +132,20 @@ class TWSService(EWrapper, EClient):
                 return False
 
         except Exception as e:
-            logging.error(f"[TWSService] reconnect(): Exception during reconnection: {e}")
+            logging.error("[TWSService] reconnect(): Exception during reconnection: %s", e)
             return False
 
     def nextValidId(self, orderId: int):
-        logging.info(f"[TWSService] nextValidId callback entry – orderId={orderId}")
+        logging.info("[TWSService] nextValidId callback entry – orderId=%s", orderId)
         super().nextValidId(orderId)
         self.next_valid_order_id = orderId
-        logging.info(f"NextValidId: {orderId} (Client ID: {self.client_id})")
+        logging.info("NextValidId: %s (Client ID: %s)", orderId, self.client_id)
         self.connection_ready.set()
         logging.info("[TWSService] connection_ready event set")
 
     # ---------------- Symbol Search ----------------
     def symbolSamples(self, reqId, contractDescriptions):
-        logging.info(f"[TWSService] symbolSamples fired – reqId={reqId}")
+        logging.info("[TWSService] symbolSamples fired – reqId=%s", reqId)
         results = []
         for desc in contractDescriptions:
             c = desc.contract
@@ -138,24 +157,24 @@ class TWSService(EWrapper, EClient):
                 "primaryExchange": c.primaryExchange,
                 "description": desc.derivativeSecTypes
             })
-            logging.info(f"[TWSService] symbolSamples appended – {c.symbol} {c.secType}")
+            logging.info("[TWSService] symbolSamples appended – %s %s", c.symbol, c.secType)
         self.symbol_samples[reqId] = results
-        logging.info(f"[TWSService] symbolSamples finished – stored {len(results)} rows")
+        logging.info("[TWSService] symbolSamples finished – stored %s rows", len(results))
 
     def search_symbol(self, name: str, reqId: int = None):
-        logging.info(f"[TWSService] search_symbol() called – name={name}")
+        logging.info("[TWSService] search_symbol() called – name=%s", name)
         if reqId is None:
             reqId = self._get_next_req_id()
-            logging.info(f"[TWSService] search_symbol() auto-selected reqId={reqId}")
+            logging.info("[TWSService] search_symbol() auto-selected reqId=%s", reqId)
         self.reqMatchingSymbols(reqId, name)
         time.sleep(2)
         out = self.symbol_samples.get(reqId, [])
-        logging.info(f"[TWSService] search_symbol() returning {len(out)} matches")
+        logging.info("[TWSService] search_symbol() returning %s matches", len(out))
         return out
 
     def error(self, reqId, errorCode, errorString, *args):
         """Error callback - handles both regular and protobuf errors"""
-        logging.info(f"[TWSService] error() fired – reqId={reqId} code={errorCode} msg={errorString}")
+        logging.info("[TWSService] error() fired – reqId=%s code=%s msg=%s", reqId, errorCode, errorString)
         actual_error_code = errorCode
         if isinstance(errorCode, int) and errorCode > 10000:
             if "errorCode:" in str(errorString):
@@ -168,41 +187,43 @@ class TWSService(EWrapper, EClient):
         
         # Handle specific error codes
         if actual_error_code in [2104, 2106, 2158]:
-            logging.info(f"TWS Info. Code: {actual_error_code}, Msg: {errorString}")
+            logging.info("TWS Info. Code: %s, Msg: %s", actual_error_code, errorString)
         elif actual_error_code == 502:
             logging.error("Connection failed - check TWS/IB Gateway")
             self.connection_ready.clear()
         elif actual_error_code == 504:
-            logging.error(f"Not connected to TWS: {errorString}")
+            logging.error("Not connected to TWS: %s", errorString)
             self.connection_ready.clear()
         elif actual_error_code == 200:
-            logging.warning(f"No security definition for reqId {reqId}")
+            logging.warning("No security definition for reqId %s", reqId)
             if reqId == self._maturities_req_id:
                 self._maturities_event.set()
             elif reqId == self._contract_details_req_id:
                 self._contract_details_event.set()
+            elif reqId in self._contract_handlers:
+                self._contract_handlers[reqId][1](reqId)
         elif actual_error_code == 321:
-            logging.error(f"Contract validation error for reqId {reqId}: {errorString}")
+            logging.error("Contract validation error for reqId %s: %s", reqId, errorString)
             if reqId == self._maturities_req_id:
                 self._maturities_event.set()
         else:
-            logging.error(f"API Error. reqId: {reqId}, Code: {actual_error_code}, Msg: {errorString}")
+            logging.error("API Error. reqId: %s, Code: %s, Msg: %s", reqId, actual_error_code, errorString)
 
     def orderStatus(
     self, orderId, status, filled, remaining, avgFillPrice,
     permId, parentId, lastFillPrice, clientId, whyHeld, mktCapPrice
 ):
-        logging.info(f"[TWSService] orderStatus entry – orderId={orderId} status={status} filled={filled}")
+        logging.info("[TWSService] orderStatus entry – orderId=%s status=%s filled=%s", orderId, status, filled)
         custom_uuid = self._ib_to_custom_id.get(orderId)
         if not custom_uuid:
-            logging.info(f"[TWSService] orderStatus – no custom_uuid mapping for IB orderId={orderId}")
+            logging.info("[TWSService] orderStatus – no custom_uuid mapping for IB orderId=%s", orderId)
             return
 
         status_str = status.lower()
         pos = self._positions_by_order_id.get(custom_uuid)
 
         if not pos:
-            logging.info(f"[TWSService] orderStatus – no position cached for custom_uuid={custom_uuid}")
+            logging.info("[TWSService] orderStatus – no position cached for custom_uuid=%s", custom_uuid)
             return
 
         # ✅ ONLY SOURCE OF TRUTH FOR QTY
@@ -214,10 +235,12 @@ class TWSService(EWrapper, EClient):
 
         pos["status"] = status_str
         self._positions_by_order_id[custom_uuid] = pos
+        risk_book.on_order_status(custom_uuid, status_str)
+        order_journal.position(custom_uuid, pos)
 
         logging.info(
-            f"[TWSService] orderStatus update {custom_uuid}: "
-            f"status={status_str} qty={pos['qty']} avg={pos.get('avg_price')}"
+            "[TWSService] orderStatus update %s: status=%s qty=%s avg=%s",
+            custom_uuid, status_str, pos['qty'], pos.get('avg_price'), extra=AUDIT
         )
         
         # ✅ FIX: When order is Filled, set fill event and mark as finalized
@@ -227,30 +250,30 @@ class TWSService(EWrapper, EClient):
                 # Set fill event so order_wait_service can proceed
                 if hasattr(order, "_fill_event"):
                     order._fill_event.set()
-                    logging.info(f"[TWSService] Set fill event for order {custom_uuid}")
+                    logging.info("[TWSService] Set fill event for order %s", custom_uuid, extra=AUDIT)
                 
                 # Mark order as finalized
                 from Helpers.Order import OrderState
                 if order.state != OrderState.FINALIZED:
                     result = f"IB Order ID: {orderId}, Filled: {filled}, Avg Price: {avgFillPrice}"
                     order.mark_finalized(result)
-                    logging.info(f"[TWSService] Marked order {custom_uuid} as FINALIZED")
+                    logging.info("[TWSService] Marked order %s as FINALIZED", custom_uuid, extra=AUDIT)
                     
                     # ✅ Also add to finalized_orders immediately so TP buttons work right away
                     from Services.order_manager import order_manager
                     order_manager.add_finalized_order(custom_uuid, order)
-                    logging.info(f"[TWSService] Added order {custom_uuid} to finalized_orders")
+                    logging.info("[TWSService] Added order %s to finalized_orders", custom_uuid)
             else:
-                logging.warning(f"[TWSService] Order {custom_uuid} not found in _pending_orders when filled")
+                logging.warning("[TWSService] Order %s not found in _pending_orders when filled", custom_uuid)
 
     def openOrder(self, orderId, contract, order: IBOrder, orderState):
-        logging.info(f"Order opened - ID: {orderId}, Symbol: {contract.symbol}")
+        logging.info("Order opened - ID: %s, Symbol: %s", orderId, contract.symbol)
 
     def execDetails(self, reqId, contract, execution):
-        logging.info(f"[TWSService] execDetails – reqId={reqId} orderId={execution.orderId} side={execution.side}")
+        logging.info("[TWSService] execDetails – reqId=%s orderId=%s side=%s", reqId, execution.orderId, execution.side)
         order_id = self._ib_to_order_id.get(execution.orderId)
         if not order_id:
-            logging.info(f"[TWSService] execDetails – no mapping for IB orderId={execution.orderId}")
+            logging.info("[TWSService] execDetails – no mapping for IB orderId=%s", execution.orderId)
             return
         
         pos = self._positions_by_order_id.get(order_id)
@@ -260,7 +283,7 @@ class TWSService(EWrapper, EClient):
             if target_uuid:
                 pos = self._positions_by_order_id.get(target_uuid)
         if not pos:
-            logging.info(f"[TWSService] execDetails – no position for order_id={order_id}")
+            logging.info("[TWSService] execDetails – no position for order_id=%s", order_id)
             return
 
 
@@ -282,8 +305,10 @@ class TWSService(EWrapper, EClient):
         pos["qty"] = new_qty
         pos["avg_price"] = new_avg
         self._positions_by_order_id[order_id] = pos
+        risk_book.apply_fill(getattr(execution, "execId", None), order_id, pos["symbol"], side, shares, price)
+        order_journal.position(order_id, pos)
 
-        logging.info(f"[TWSService] execDetails update {order_id}: side={side} qty={new_qty}, avg={new_avg}")
+        logging.info("[TWSService] execDetails update %s: side=%s qty=%s, avg=%s", order_id, side, new_qty, new_avg, extra=AUDIT)
 
     def securityDefinitionOptionParameter(
     self, reqId: int, exchange: str,
@@ -291,7 +316,7 @@ class TWSService(EWrapper, EClient):
     multiplier: str, expirations: List[str],
     strikes: List[float]
 ):
-        logging.info(f"[TWSService] securityDefinitionOptionParameter – reqId={reqId} exchange={exchange}")
+        logging.info("[TWSService] securityDefinitionOptionParameter – reqId=%s exchange=%s", reqId, exchange)
         try:
             if reqId not in self._maturities_data or self._maturities_data[reqId] is None:
                 self._maturities_data[reqId] = {
@@ -302,22 +327,22 @@ class TWSService(EWrapper, EClient):
                     "expirations": set(),
                     "strikes": set(),
                 }
-                logging.info(f"[TWSService] securityDefinitionOptionParameter – initialized fresh dict for reqId={reqId}")
+                logging.info("[TWSService] securityDefinitionOptionParameter – initialized fresh dict for reqId=%s", reqId)
             data = self._maturities_data[reqId]
             before_e, before_s = len(data["expirations"]), len(data["strikes"])
             data["expirations"].update(expirations or [])
             data["strikes"].update(strikes or [])
             logging.info(
-                f"[TWSService] Option chain fragment merged for {exchange}: "
-                f"{len(data['expirations'])} expirations (+{len(data['expirations']) - before_e}), "
-                f"{len(data['strikes'])} strikes (+{len(data['strikes']) - before_s})"
+                "[TWSService] Option chain fragment merged for %s: %s expirations (+%s), %s strikes (+%s)",
+                exchange, len(data['expirations']), len(data['expirations']) - before_e,
+                len(data['strikes']), len(data['strikes']) - before_s
             )
         except Exception as e:
-            logging.exception(f"[TWSService] securityDefinitionOptionParameter crash, reqId={reqId}")
+            logging.exception("[TWSService] securityDefinitionOptionParameter crash, reqId=%s", reqId)
 
     def securityDefinitionOptionParameterEnd(self, reqId: int):
         """Finalize merged option chain"""
-        logging.info(f"[TWSService] securityDefinitionOptionParameterEnd – reqId={reqId}")
+        logging.info("[TWSService] securityDefinitionOptionParameterEnd – reqId=%s", reqId)
         if reqId in self._maturities_data:
             data = self._maturities_data[reqId]
             expirations = sorted(data["expirations"])
@@ -325,21 +350,60 @@ class TWSService(EWrapper, EClient):
             self._maturities_data[reqId]["expirations"] = expirations
             self._maturities_data[reqId]["strikes"] = strikes
             logging.info(
-                f"[TWSService] Option chain complete: {len(expirations)} expirations, {len(strikes)} strikes"
+                "[TWSService] Option chain complete: %s expirations, %s strikes",
+                len(expirations), len(strikes)
             )
         self._maturities_event.set()
-        logging.info(f"[TWSService] securityDefinitionOptionParameterEnd – event set for reqId={reqId}")
+        logging.info("[TWSService] securityDefinitionOptionParameterEnd – event set for reqId=%s", reqId)
 
     def contractDetails(self, reqId: int, contractDetails):
-        logging.info(f"[TWSService] contractDetails – reqId={reqId}")
+        logging.info("[TWSService] contractDetails – reqId=%s", reqId)
+        handlers = self._contract_handlers.get(reqId)
+        if handlers:
+            handlers[0](reqId, contractDetails)
+            return
         self._contract_details[reqId] = contractDetails
         self._contract_details_event.set()
-        logging.info(f"[TWSService] contractDetails – event set for reqId={reqId}")
+        logging.info("[TWSService] contractDetails – event set for reqId=%s", reqId)
 
     def contractDetailsEnd(self, reqId: int):
-        logging.info(f"[TWSService] contractDetailsEnd – reqId={reqId}")
+        logging.info("[TWSService] contractDetailsEnd – reqId=%s", reqId)
+        handlers = self._contract_handlers.get(reqId)
+        if handlers:
+            handlers[1](reqId)
+            return
         self._contract_details_event.set()
 
+    # ---------------- Market Data Dispatch ----------------
+    def tickPrice(self, reqId, tickType, price, attrib):
+        handler = self._tick_handlers.get(reqId)
+        if handler is not None:
+            handler(tickType, price)
+
+    def tickOptionComputation(self, reqId, tickType, *args):
+        # ibapi ≥ 10.x inserts tickAttrib after tickType
+        if len(args) == 9:
+            args = args[1:]
+        implied_vol, delta, _opt_price, _pv_div, gamma, vega, theta, und_price = args
+        if tickType != 13:          # MODEL_OPTION – the only set TWS keeps current
+            return
+        conid = self._quote_conid_for_req(reqId)
+        if conid is None:
+            return
+        with self._quote_lock:
+            quote = self._quotes.get(conid)
+            if quote is None:
+                return
+            # "not computed" is -1 for IV / prices and -2 for the greeks (unset
+            # fields arrive as DBL_MAX); a real delta of -1.0 is a deep ITM put
+            if implied_vol is not None and 0 < implied_vol < 1e6:
+                quote["iv"] = implied_vol
+            for key, value in (("delta", delta), ("gamma", gamma), ("vega", vega), ("theta", theta)):
+                if value is not None and value != -2 and -1e6 < value < 1e6:
+                    quote[key] = value
+            if und_price is not None and 0 < und_price < 1e9:
+                quote["underlying"] = und_price
+
     def connectionClosed(self):
         logging.warning("Connection to TWS closed")
         self.connection_ready.clear()
@@ -352,20 +416,24 @@ class TWSService(EWrapper, EClient):
         except Exception as exc:
             logging.exception("IB reader thread died with exception")
         finally:
-            logging.warning("IB reader thread ended -> auto-reconnect")
             self.connected = False
             self.connection_ready.clear()
-            # optional: schedule reconnect here or raise a flag
-            self.connect_and_start()
+            if self._closing:
+                logging.info("IB reader thread ended after disconnect")
+            else:
+                logging.warning("IB reader thread ended -> auto-reconnect")
+                # optional: schedule reconnect here or raise a flag
+                self.connect_and_start()
 
-    def connect_and_start(self, host='127.0.0.1', port=7497, timeout=10):
+    def connect_and_start(self, host=DEFAULT_TWS_HOST, port=DEFAULT_TWS_PORT, timeout=10):
         """Connect to TWS/IB Gateway"""
-        logging.info(f"[TWSService] connect_and_start – {host}:{port} timeout={timeout}")
+        logging.info("[TWSService] connect_and_start – %s:%s timeout=%s", host, port, timeout)
         if self.connected:
             logging.info("[TWSService] connect_and_start – already connected, skipping")
             return True
+        self._closing = False
         try:
-            logging.info(f"Connecting to TWS on {host}:{port} with Client ID: {self.client_id}")
+            logging.info("Connecting to TWS on %s:%s with Client ID: %s", host, port, self.client_id)
             self.connect(host, port, self.client_id)
             self.connected = True
             api_thread = threading.Thread(
@@ -379,30 +447,32 @@ class TWSService(EWrapper, EClient):
             
             if self.connection_ready.wait(timeout=timeout):
                 logging.info("Successfully connected to TWS")
+                self._resubscribe_quotes()
                 return True
             else:
                 logging.error("Connection timeout")
                 return False
                 
         except Exception as e:
-            logging.error(f"Failed to connect to TWS: {str(e)}")
+            logging.error("Failed to connect to TWS: %s", str(e))
             return False
 
     def is_connected(self):
         flag = self.connection_ready.is_set() and self.next_valid_order_id is not None
-        logging.info(f"[TWSService] is_connected() returning {flag}")
+        logging.debug("[TWSService] is_connected() returning %s", flag)
         return flag
 
     def _get_next_req_id(self):
-        req_id = self._request_counter
-        self._request_counter += 1
-        logging.info(f"[TWSService] _get_next_req_id() -> {req_id}")
+        with self._req_lock:
+            req_id = self._request_counter
+            self._request_counter += 1
+        logging.info("[TWSService] _get_next_req_id() -> %s", req_id)
         return req_id
 
     def get_maturities(self, symbol: str, exchange: str = "SMART", currency: str = "USD", 
                       timeout: int = 10) -> Optional[Dict]:
         """Get option expirations and strikes for a symbol"""
-        logging.info(f"[TWSService] get_maturities() – symbol={symbol} exchange={exchange}")
+        logging.info("[TWSService] get_maturities() – symbol=%s exchange=%s", symbol, exchange)
         if not self.is_connected():
             logging.error("Not connected to TWS")
             return None
@@ -412,7 +482,7 @@ class TWSService(EWrapper, EClient):
         underlying_conid = self.resolve_conid(underlying_contract)
         
         if not underlying_conid:
-            logging.error(f"Failed to resolve conId for {symbol}")
+            logging.error("Failed to resolve conId for %s", symbol)
             return None
 
         req_id = self._get_next_req_id()
@@ -421,7 +491,7 @@ class TWSService(EWrapper, EClient):
         self._maturities_event.clear()
 
         try:
-            logging.info(f"Requesting option chain for {symbol}")
+            logging.info("Requesting option chain for %s", symbol)
             self.reqSecDefOptParams(
                 reqId=req_id, 
                 underlyingSymbol=symbol,
@@ -433,26 +503,26 @@ class TWSService(EWrapper, EClient):
             if self._maturities_event.wait(timeout=timeout):
                 data = self._maturities_data.get(req_id)
                 if data:
-                    logging.info(f"Retrieved {len(data['expirations'])} expirations for {symbol}")
+                    logging.info("Retrieved %s expirations for %s", len(data['expirations']), symbol)
                     return data
                 else:
-                    logging.warning(f"No option chain data for {symbol}")
+                    logging.warning("No option chain data for %s", symbol)
                     return None
             else:
-                logging.error(f"Timeout getting option chain for {symbol}")
+                logging.error("Timeout getting option chain for %s", symbol)
                 return None
 
         except Exception as e:
-            logging.error(f"Error getting maturities for {symbol}: {str(e)}")
+            logging.error("Error getting maturities for %s: %s", symbol, str(e))
             return None
         finally:
             if req_id in self._maturities_data:
                 del self._maturities_data[req_id]
-                logging.info(f"[TWSService] get_maturities() – cleaned up reqId={req_id}")
+                logging.info("[TWSService] get_maturities() – cleaned up reqId=%s", req_id)
 
     def resolve_conid(self, contract: Contract, timeout: int = 10) -> Optional[int]:
         """Resolve contract to conId"""
-        logging.info(f"[TWSService] resolve_conid() – contract={contract.symbol} secType={getattr(contract, 'secType', '?')}")
+        logging.info("[TWSService] resolve_conid() – contract=%s secType=%s", contract.symbol, getattr(contract, 'secType', '?'))
         
         # ✅ FIX: Only use cached conId for STOCK contracts
         # OPTION contracts have different conIds - must resolve fresh
@@ -460,7 +530,7 @@ class TWSService(EWrapper, EClient):
         if contract.secType == "STK":
             conid = storage.get_conid(contract.symbol) 
             if conid != None:
-                logging.info(f"[TWSService] using stored STOCK conid at resolve_conid({contract.symbol})")
+                logging.info("[TWSService] using stored STOCK conid at resolve_conid(%s)", contract.symbol)
                 return int(conid)
         
         # For OPTION contracts or if no cache, resolve fresh
@@ -471,10 +541,10 @@ class TWSService(EWrapper, EClient):
         event = threading.Event()
         self._contract_details[req_id] = {"event": event, "details": None}
 
-        logging.info(f"[ResolveConId] Starting for {contract.symbol} "
-                 f"{getattr(contract, 'lastTradeDateOrContractMonth', '?')} "
-                 f"{getattr(contract, 'strike', '?')}{getattr(contract, 'right', '?')} "
-                 f"(req_id={req_id}, timeout={timeout}s)")
+        logging.info(
+            "[ResolveConId] Starting for %s %s %s%s (req_id=%s, timeout=%ss)",
+            contract.symbol, getattr(contract, 'lastTradeDateOrContractMonth', '?'),
+            getattr(contract, 'strike', '?'), getattr(contract, 'right', '?'), req_id, timeout)
 
 
         def on_contract_details(reqId, contractDetails):
@@ -486,49 +556,49 @@ class TWSService(EWrapper, EClient):
             if reqId == req_id:
                 event.set()
 
-        # temporarily hook callbacks
-        orig_cd = self.contractDetails
-        orig_cde = self.contractDetailsEnd
-        self.contractDetails = on_contract_details
-        self.contractDetailsEnd = on_contract_details_end
+        # route this reqId's callbacks here (concurrent resolves no longer clobber each other)
+        self._contract_handlers[req_id] = (on_contract_details, on_contract_details_end)
 
         try:
-            logging.info(f"[ResolveConId] Requesting contract details from IBKR for {contract.symbol}") 
+            logging.info("[ResolveConId] Requesting contract details from IBKR for %s", contract.symbol)
             start_time = time.time()
 
             self.reqContractDetails(req_id, contract)
             if event.wait(timeout):
                 elapsed = time.time() - start_time
-                logging.info(f"[ResolveConId] Callback received for {contract.symbol} after {elapsed:.2f}s")
+                logging.info("[ResolveConId] Callback received for %s after %.2fs", contract.symbol, elapsed)
                 data = self._contract_details[req_id]["details"]
                 if data:
                     conid = data.contract.conId
-                    logging.info(f"[ResolveConId] ✅ Resolved conId={conid} "
-                                 f"for {contract.symbol} in {elapsed:.2f}s")
+                    logging.info(
+                        "[ResolveConId] ✅ Resolved conId=%s for %s in %.2fs",
+                        conid, contract.symbol, elapsed)
                     return conid
                 else:
-                    logging.info(f"[ResolveConId] ⚠️ Empty data for {contract.symbol}, "
-                                 f"IBKR returned no contract details (elapsed={elapsed:.2f}s)")
+                    logging.info(
+                        "[ResolveConId] ⚠️ Empty data for %s, IBKR returned no contract details "
+                        "(elapsed=%.2fs)",
+                        contract.symbol, elapsed)
                     return None
             else:
-                logging.info(f"[ResolveConId] ⏱ Timeout waiting {timeout}s for {contract.symbol} "
-                             f"(req_id={req_id})")
+                logging.info(
+                    "[ResolveConId] ⏱ Timeout waiting %ss for %s (req_id=%s)",
+                    timeout, contract.symbol, req_id)
                 return None
 
         except Exception as e:
-            logging.info(f"[ResolveConId] ❌ Exception resolving {contract.symbol}: {str(e)}")
+            logging.info("[ResolveConId] ❌ Exception resolving %s: %s", contract.symbol, str(e))
             return None
         finally:
-            self.contractDetails = orig_cd
-            self.contractDetailsEnd = orig_cde
+            self._contract_handlers.pop(req_id, None)
             del self._contract_details[req_id]
-            logging.info(f"[ResolveConId] Cleanup done for reqId={req_id}")
+            logging.info("[ResolveConId] Cleanup done for reqId=%s", req_id)
 
 
     def create_option_contract(self, symbol: str, last_trade_date: str, strike: float, right: str, 
                              exchange: str = "SMART", currency: str = "USD") -> Contract:
         """Create IB option contract - converts CALL/PUT to C/P"""
-        logging.info(f"[TWSService] create_option_contract – {symbol} {last_trade_date} {strike}{right}")
+        logging.info("[TWSService] create_option_contract – %s %s %s%s", symbol, last_trade_date, strike, right)
         ib_right = "C" if right.upper() in ["C", "CALL"] else "P"
         
         contract = Contract()
@@ -544,7 +614,7 @@ class TWSService(EWrapper, EClient):
         return contract
 
     def create_stock_contract(self, symbol: str, exchange: str = "SMART", currency: str = "USD") -> Contract:
-        logging.info(f"[TWSService] create_stock_contract – {symbol} {exchange}")
+        logging.info("[TWSService] create_stock_contract – %s %s", symbol, exchange)
         contract = Contract()
         contract.symbol = symbol.upper()
         contract.secType = "STK"
@@ -558,14 +628,14 @@ class TWSService(EWrapper, EClient):
         Build a basic option chain for a given symbol and expiry.
         Returns a list of dicts with strike/right.
         """
-        logging.info(f"[TWSService] get_option_chain – {symbol} {expiry}")
+        logging.info("[TWSService] get_option_chain – %s %s", symbol, expiry)
         try:
             maturities = self.get_maturities(symbol, exchange, currency, timeout)
             if not maturities:
                 return []
 
             if expiry not in maturities['expirations']:
-                logging.error(f"TWSService: expiry {expiry} not in available expirations for {symbol}")
+                logging.error("TWSService: expiry %s not in available expirations for %s", expiry, symbol)
                 return []
 
             strikes = maturities.get('strikes', [])
@@ -573,34 +643,32 @@ class TWSService(EWrapper, EClient):
             for strike in strikes:
                 chain.append({"expiry": expiry, "strike": strike, "right": "C"})
                 chain.append({"expiry": expiry, "strike": strike, "right": "P"})
-            logging.info(f"[TWSService] get_option_chain – built {len(chain)} legs")
+            logging.info("[TWSService] get_option_chain – built %s legs", len(chain))
             return chain
         except Exception as e:
-            logging.error(f"TWSService: Failed to build option chain for {symbol}: {e}")
+            logging.error("TWSService: Failed to build option chain for %s: %s", symbol, e)
             return []
 
     def get_option_snapshot(self, symbol: str, expiry: str, strike: float, right: str, timeout: int = 3):
-        logging.info(f"[TWSService] get_option_snapshot – {symbol} {expiry} {strike}{right}")
+        logging.info("[TWSService] get_option_snapshot – %s %s %s%s", symbol, expiry, strike, right)
         if not self.is_connected():
             logging.error("TWSService.get_option_snapshot(): not connected")
             return None
 
         ts_req = time.time() * 1000
         logging.info(
-            "[PREMIUM_REQUEST] "
-            f"ts={ts_req:.0f} symbol={symbol} expiry={expiry} strike={strike} right={right} "
-            f"timeout={timeout}"
+            "[PREMIUM_REQUEST] ts=%.0f symbol=%s expiry=%s strike=%s right=%s timeout=%s",
+            ts_req, symbol, expiry, strike, right, timeout
         )
 
         contract = self.create_option_contract(symbol, expiry, strike, right)
         conid = self.resolve_conid(contract)
         logging.info(
-            "[PREMIUM_CONTRACT] "
-            f"ts={time.time()*1000:.0f} symbol={symbol} conId={conid}"
+            "[PREMIUM_CONTRACT] ts=%.0f symbol=%s conId=%s", time.time() * 1000, symbol, conid
         )
 
         if not conid:
-            logging.error(f"TWSService: Failed to resolve conId for {symbol} {expiry} {strike}{right}")
+            logging.error("TWSService: Failed to resolve conId for %s %s %s%s", symbol, expiry, strike, right)
             return None
         contract.conId = conid
 
@@ -608,8 +676,8 @@ class TWSService(EWrapper, EClient):
         result = {"bid": None, "ask": None, "last": None, "mid": None}
         event = threading.Event()
 
-        def tickPrice(reqId, tickType, price, attrib):
-            if reqId != req_id or price <= 0:
+        def on_tick(tickType, price):
+            if price <= 0:
                 return
             if tickType == 1:
                 result["bid"] = price
@@ -621,24 +689,22 @@ class TWSService(EWrapper, EClient):
                 result["mid"] = (result["bid"] + result["ask"]) / 2
                 event.set()
 
-        original_tick = self.tickPrice
-        self.tickPrice = tickPrice
+        self._tick_handlers[req_id] = on_tick
 
         try:
             self.reqMktData(req_id, contract, "", True, False, [])
             logging.info(
-            "[PREMIUM_SUBSCRIBE] "
-            f"ts={time.time()*1000:.0f} req_id={req_id} symbol={symbol} conId={conid}"
+            "[PREMIUM_SUBSCRIBE] ts=%.0f req_id=%s symbol=%s conId=%s",
+            time.time() * 1000, req_id, symbol, conid
         )
 
             event.wait(timeout)
             bid, ask = result["bid"], result["ask"]
             result["mid"] = (bid + ask) / 2 if bid and ask else bid or ask
             logging.info(
-                "[PREMIUM] "
-                f"ts={time.time()*1000:.0f} symbol={symbol} contract={expiry} {strike}{right} "
-                f"source=SNAPSHOT bid={result['bid']} ask={result['ask']} "
-                f"mid={result['mid']} marketDataType=RTH"
+                "[PREMIUM] ts=%.0f symbol=%s contract=%s %s%s source=SNAPSHOT bid=%s ask=%s mid=%s "
+                "marketDataType=RTH",
+                time.time() * 1000, symbol, expiry, strike, right, result['bid'], result['ask'], result['mid']
             )
             return result
         finally:
@@ -646,14 +712,120 @@ class TWSService(EWrapper, EClient):
                 self.cancelMktData(req_id)
             except Exception:
                 pass
-            self.tickPrice = original_tick
+            self._tick_handlers.pop(req_id, None)
+
+    # ---------------- Streaming Option Quotes ----------------
+    def subscribe_option_quotes(self, symbol: str, expiry: str, strike: float, right: str,
+                                conid: Optional[int] = None) -> Optional[int]:
+        """
+        Start (or share) a streaming reqMktData subscription for one option.
+        Returns the conId whose quote get_quote() serves, or None on failure.
+        Every successful call must be paired with unsubscribe_option_quotes(conId).
+        """
+        contract = self.create_option_contract(symbol, expiry, strike, right)
+        key = (symbol.upper(), expiry, float(strike), right.upper())
+        conid = conid or self._pre_conid_cache.get(key) or self.resolve_conid(contract)
+        if not conid:
+            logging.error("[TWSService] subscribe_option_quotes: no conId for %s %s %s%s", symbol, expiry, strike, right)
+            return None
+        self._pre_conid_cache[key] = conid
+        contract.conId = conid
+
+        with self._quote_lock:
+            sub = self._quote_subs.get(conid)
+            if sub is not None:
+                sub["refs"] += 1
+                return conid
+            sub = self._quote_subs[conid] = {"req_id": None, "contract": contract, "refs": 1}
+            self._quotes[conid] = {"bid": None, "ask": None, "last": None, "mid": None, "ts": 0.0, "rx": None}
+
+        if self.is_connected():
+            self._start_quote_stream(conid, sub)
+        logging.info("[TWSService] Streaming quotes for %s %s %s%s (conId=%s)", symbol, expiry, strike, right, conid)
+        return conid
+
+    def unsubscribe_option_quotes(self, conid: int):
+        """Drop one reference; the stream is cancelled when the last one goes."""
+        with self._quote_lock:
+            sub = self._quote_subs.get(conid)
+            if sub is None:
+                return
+            sub["refs"] -= 1
+            if sub["refs"] > 0:
+                return
+            del self._quote_subs[conid]
+            self._quotes.pop(conid, None)
+            req_id = sub["req_id"]
+            self._quote_reqs.pop(req_id, None)
+        if req_id is not None:
+            self._tick_handlers.pop(req_id, None)
+            try:
+                self.cancelMktData(req_id)
+            except Exception:
+                pass
+        logging.info("[TWSService] Stopped streaming quotes for conId=%s", conid)
+
+    def get_quote(self, conid: int) -> Optional[dict]:
+        """
+        Latest streamed quote (copy) for a subscribed conId. "ts" is the last update
+        (epoch secs, for display); "age" is seconds since it, measured on the monotonic
+        receive time, so staleness checks don't depend on the caller's clock.
+        """
+        with self._quote_lock:
+            quote = self._quotes.get(conid)
+            if not quote:
+                return None
+            quote = dict(quote)
+        rx = quote.pop("rx")
+        quote["age"] = time.monotonic() - rx if rx is not None else float("inf")
+        return quote
+
+    def _start_quote_stream(self, conid: int, sub: dict):
+        req_id = self._get_next_req_id()
+
+        def on_tick(tickType, price):
+            if price <= 0 or tickType not in (1, 2, 4):
+                return
+            with self._quote_lock:
+                quote = self._quotes.get(conid)
+                if quote is None:
+                    return
+                quote[{1: "bid", 2: "ask", 4: "last"}[tickType]] = price
+                bid, ask = quote["bid"], quote["ask"]
+                quote["mid"] = (bid + ask) / 2 if bid and ask else quote["last"]
+                quote["ts"] = time.time()
+                quote["rx"] = time.monotonic()
+
+        with self._quote_lock:
+            if self._quote_subs.get(conid) is not sub:
+                return                           # unsubscribed meanwhile
+            self._quote_reqs.pop(sub["req_id"], None)
+            sub["req_id"] = req_id
+            self._quote_reqs[req_id] = conid
+        self._tick_handlers[req_id] = on_tick
+        self.reqMktData(req_id, sub["contract"], "", False, False, [])
+
+    def _quote_conid_for_req(self, req_id: int) -> Optional[int]:
+        return self._quote_reqs.get(req_id)
+
+    def _resubscribe_quotes(self):
+        """Streams die with the socket – re-issue them after a (re)connect."""
+        with self._quote_lock:
+            subs = list(self._quote_subs.items())
+        for conid, sub in subs:
+            old = sub["req_id"]
+            if old is not None:
+                self._tick_handlers.pop(old, None)
+            self._start_quote_stream(conid, sub)
+        if subs:
+            logging.info("[TWSService] Re-subscribed %s option quote streams", len(subs))
 
     def pre_conid(self, custom_order: Order) -> bool:
         """
         Pre-resolve conId BEFORE order placement.
         Useful for pre-market where we want everything ready.
         """
-        logging.info(f"[TWSSwervice] doing pre-conid for order: {custom_order}")
+        logging.info("[TWSSwervice] doing pre-conid for order: %s", custom_order)
         try:
             key = (
                 custom_order.symbol.upper(),
@@ -666,7 +838,7 @@ class TWSService(EWrapper, EClient):
             if key in self._pre_conid_cache:
                 conid = self._pre_conid_cache[key]
                 custom_order._pre_conid = conid
-                logging.info(f"[TWSService] pre_conid CACHE HIT {key} → {conid}")
+                logging.info("[TWSService] pre_conid CACHE HIT %s → %s", key, conid)
                 return True
 
             # 2. Build contract
@@ -680,18 +852,18 @@ class TWSService(EWrapper, EClient):
             # 3. Resolve it
             conid = self.resolve_conid(contract)
             if not conid:
-                logging.error(f"[TWSService] pre_conid FAILED {key}")
+                logging.error("[TWSService] pre_conid FAILED %s", key)
                 return False
 
             # 4. Save to cache
             self._pre_conid_cache[key] = conid
             custom_order._pre_conid = conid
 
-            logging.info(f"[TWSService] pre_conid READY {key} → {conid}")
+            logging.info("[TWSService] pre_conid READY %s → %s", key, conid)
             return True
 
         except Exception as e:
-            logging.error(f"[TWSService] pre_conid ERROR {e}")
+            logging.error("[TWSService] pre_conid ERROR %s", e)
 
 
             return False
@@ -710,20 +882,20 @@ class TWSService(EWrapper, EClient):
         """
         Place an order using your custom Order object from Helpers.Order.
         """
-        logging.info(f"[TWSService] place_custom_order – order_id={custom_order.order_id}")
+        logging.info("[TWSService] place_custom_order – order_id=%s", custom_order.order_id, extra=AUDIT)
         if not self.is_connected():
-            logging.error(f"Cannot place order: Not connected to TWS")
+            logging.error("Cannot place order: Not connected to TWS")
             return False
 
         try:
             # Convert your custom order to IB contract
 
             logging.info(
-                "[ORDER_INTENT] "
-                f"ts={time.time()*1000:.0f} order_id={custom_order.order_id} "
-                f"symbol={custom_order.symbol} expiry={custom_order.expiry} "
-                f"strike={custom_order.strike} right={custom_order.right} action=BUY "
-                f"pos_usd={getattr(custom_order, '_position_size', None)}"
+                "[ORDER_INTENT] ts=%.0f order_id=%s symbol=%s expiry=%s strike=%s right=%s "
+                "action=BUY pos_usd=%s",
+                time.time() * 1000, custom_order.order_id, custom_order.symbol,
+                custom_order.expiry, custom_order.strike, custom_order.right,
+                getattr(custom_order, '_position_size', None)
             )
 
             ib_right = "C" if custom_order.right.upper() in ["C", "CALL"] else "P"
@@ -750,7 +922,7 @@ class TWSService(EWrapper, EClient):
             else:
                 conid = self.resolve_conid(contract)
             if not conid:
-                logging.error(f"Could not resolve contract for {custom_order.symbol} {custom_order.expiry} {custom_order.strike}{ib_right}")
+                logging.error("Could not resolve contract for %s %s %s%s", custom_order.symbol, custom_order.expiry, custom_order.strike, ib_right)
                 custom_order.mark_failed("Contract resolution failed")
                 return False
 
@@ -772,11 +944,10 @@ class TWSService(EWrapper, EClient):
                 qty = custom_order.qty if getattr(custom_order, "qty", None) else 1
 
             logging.info(
-            "[SIZE_INTENT] "
-            f"ts={time.time()*1000:.0f} order_id={custom_order.order_id} "
-            f"symbol={custom_order.symbol} pos_usd={custom_order._position_size} "
-            f"premium_used={base_price} calculated_qty={qty} "
-            f"rounding=floor risk_cap=none"
+            "[SIZE_INTENT] ts=%.0f order_id=%s symbol=%s pos_usd=%s premium_used=%s "
+            "calculated_qty=%s rounding=floor risk_cap=none",
+            time.time() * 1000, custom_order.order_id, custom_order.symbol,
+            custom_order._position_size, base_price, qty
             )
 
 
@@ -784,19 +955,29 @@ class TWSService(EWrapper, EClient):
             notional = qty * base_price * 100
             if notional > custom_order._position_size *1.5:
                  logging.error(
-                    "[ORDER_BUILD] "
-                    f"ts={time.time()*1000:.0f} order_id={custom_order.order_id} "
-                    f"requested_qty={qty} final_qty=0 mutation=YES "
-                    f"mutation_reason=RISK_CAP_MAX_QTY"
+                    "[ORDER_BUILD] ts=%.0f order_id=%s requested_qty=%s final_qty=0 mutation=YES "
+                    "mutation_reason=RISK_CAP_MAX_QTY",
+                    time.time() * 1000, custom_order.order_id, qty
                 )
 
                  return False
+
+            # Per-underlying caps – O(1) against the aggregated risk book
+            breach = risk_book.reserve(custom_order.order_id, custom_order.symbol, qty, base_price)
+            if breach:
+                logging.error(
+                    "[ORDER_BUILD] ts=%.0f order_id=%s requested_qty=%s final_qty=0 mutation=YES "
+                    "mutation_reason=RISK_CAP_SYMBOL (%s)",
+                    time.time() * 1000, custom_order.order_id, qty, breach
+                )
+                custom_order.mark_failed(f"Risk cap for {custom_order.symbol}: {breach}")
+                return False
             custom_order.qty = qty
 
             # Debug info
             logging.info(
-                f"[TWSService] Calculated qty={qty} for {custom_order.symbol} "
-                f"premium={base_price}, position_size={getattr(custom_order, '_position_size', None)}"
+                "[TWSService] Calculated qty=%s for %s premium=%s, position_size=%s",
+                qty, custom_order.symbol, base_price, getattr(custom_order, '_position_size', None)
             )
 
             # --- Build IB order ---
@@ -824,12 +1005,14 @@ class TWSService(EWrapper, EClient):
                 "strike": custom_order.strike,
                 "right": custom_order.right,
             }
+            order_journal.ib_mapping(ib_order_id, custom_order.order_id, custom=True)
+            order_journal.position(custom_order.order_id, self._positions_by_order_id[custom_order.order_id])
             logging.info(
-                            "[ORDER_BUILD] "
-                            f"ts={time.time()*1000:.0f} order_id={custom_order.order_id} "
-                            f"requested_qty={qty} final_qty={custom_order.qty} "
-                            f"mutation={'YES' if qty != custom_order.qty else 'NO'} "
-                            f"mutation_reason={'NONE' if qty == custom_order.qty else 'UNKNOWN'}"
+                            "[ORDER_BUILD] ts=%.0f order_id=%s requested_qty=%s final_qty=%s "
+                            "mutation=%s mutation_reason=%s",
+                            time.time() * 1000, custom_order.order_id, qty, custom_order.qty,
+                            'YES' if qty != custom_order.qty else 'NO',
+                            'NONE' if qty == custom_order.qty else 'UNKNOWN'
                         )
             self._pending_orders[custom_order.order_id] = custom_order
             
@@ -837,49 +1020,51 @@ class TWSService(EWrapper, EClient):
             self.placeOrder(ib_order_id, contract, ib_order)
             custom_order._placed_ts = time.time() * 1000
             logging.info(
-            "[ORDER_SENT] "
-            f"ts={custom_order._placed_ts:.0f} order_id={custom_order.order_id} "
-            f"ib_order_id={ib_order_id} qty={custom_order.qty}"
+            "[ORDER_SENT] ts=%.0f order_id=%s ib_order_id=%s qty=%s",
+            custom_order._placed_ts, custom_order.order_id, ib_order_id, custom_order.qty
         )
 
 
-            logging.info(f"[TWSService] Sent order {custom_order.symbol} IBID={ib_order_id} "
-                        f"at {custom_order._placed_ts:.0f} ms")
-            logging.info(f"Placed custom order: {custom_order.order_id} -> IB ID: {ib_order_id}")
+            logging.info(
+                "[TWSService] Sent order %s IBID=%s at %.0f ms",
+                custom_order.symbol, ib_order_id, custom_order._placed_ts, extra=AUDIT)
+            logging.info("Placed custom order: %s -> IB ID: %s", custom_order.order_id, ib_order_id, extra=AUDIT)
 
             # Increment order ID for next use
             self.next_valid_order_id += 1
             return True
 
         except Exception as e:
-            logging.error(f"Failed to place custom order {custom_order.order_id}: {str(e)}")
+            logging.error("Failed to place custom order %s: %s", custom_order.order_id, str(e))
+            risk_book.release(custom_order.order_id)
             custom_order.mark_failed(reason=str(e))
             return False
 
     def cancel_custom_order(self, custom_order_id: str) -> bool:
         """Cancel a custom order"""
-        logging.info(f"[TWSService] cancel_custom_order – {custom_order_id}")
+        logging.info("[TWSService] cancel_custom_order – %s", custom_order_id, extra=AUDIT)
         if custom_order_id in self._pending_orders:
             order = self._pending_orders[custom_order_id]
             if hasattr(order, '_ib_order_id'):
                 self.cancelOrder(order._ib_order_id)
                 order.mark_cancelled()
-                logging.info(f"Cancelled order {custom_order_id}")
+                logging.info("Cancelled order %s", custom_order_id)
                 return True
-        logging.info(f"[TWSService] cancel_custom_order – no action taken for {custom_order_id}")
+        logging.info("[TWSService] cancel_custom_order – no action taken for %s", custom_order_id, extra=AUDIT)
         return False
 
     def get_order_status(self, custom_order_id: str) -> Optional[Dict]:
         """
         Get the status of a custom order.
         """
-        logging.info(f"[TWSService] get_order_status – {custom_order_id}")
+        logging.info("[TWSService] get_order_status – %s", custom_order_id)
         if custom_order_id in self._pending_orders:
             order = self._pending_orders[custom_order_id]
             return order.to_dict()
         return None
     def disconnect_gracefully(self):
         logging.info("Disconnecting from TWS...")
+        self._closing = True
         self.connection_ready.clear()
         self.disconnect()
     
@@ -889,7 +1074,7 @@ class TWSService(EWrapper, EClient):
         - Uses the correct closing quantity if a position ID is provided (from the StopLoss Watcher).
         - Otherwise, dynamically recalculates quantity from live premium if position_size is set.
         """
-        logging.info(f"[TWSService] sell_custom_order – {custom_order.order_id}")
+        logging.info("[TWSService] sell_custom_order – %s", custom_order.order_id, extra=AUDIT)
         if not self.is_connected():
             logging.error("Cannot place SELL order: Not connected to TWS")
             return False
@@ -935,36 +1120,37 @@ class TWSService(EWrapper, EClient):
             if buy_order_uuid and buy_order_uuid in self._positions_by_order_id:
                 # Link the new SELL IB ID to the original BUY custom UUID
                 self._ib_to_order_id[order_id] = buy_order_uuid
-                logging.info(f"[TWSService] Linked SELL IBID {order_id} to BUY Position UUID {buy_order_uuid}")
+                logging.info("[TWSService] Linked SELL IBID %s to BUY Position UUID %s", order_id, buy_order_uuid)
             else:
                 # Fallback: link to its own ID if position is not found
-                logging.warning(f"[TWSService] No BUY position found for {buy_order_uuid}. Linking SELL to itself.")
+                logging.warning("[TWSService] No BUY position found for %s. Linking SELL to itself.", buy_order_uuid)
                 self._ib_to_order_id[order_id] = custom_order.order_id
+            order_journal.ib_mapping(order_id, self._ib_to_order_id[order_id], custom=False)
 
 
             self.placeOrder(order_id, contract, ib_order)
             custom_order._placed_ts = time.time() * 1000
             logging.info(
-                f"[TWSService] SELL placed: {custom_order.symbol} {custom_order.expiry} "
-                f"{custom_order.strike}{ib_right} x{custom_order.qty} @ {custom_order.entry_price} "
-                f"→ ID {order_id}"
+                "[TWSService] SELL placed: %s %s %s%s x%s @ %s → ID %s",
+                custom_order.symbol, custom_order.expiry, custom_order.strike, ib_right,
+                custom_order.qty, custom_order.entry_price, order_id, extra=AUDIT
             )
 
             self.next_valid_order_id += 1
             return True
 
         except Exception as e:
-            logging.error(f"[TWSService] Failed to sell order {custom_order.order_id}: {e}")
+            logging.error("[TWSService] Failed to sell order %s: %s", custom_order.order_id, e)
             custom_order.mark_failed(reason=str(e))
             return False
 
 
     def get_position_by_order_id(self, order_id: str):
-        logging.info(f"[TWSService] get_position_by_order_id – {order_id}")
+        logging.info("[TWSService] get_position_by_order_id – %s", order_id)
         return self._positions_by_order_id.get(order_id)
 
     def has_position(self, order_id_or_symbol: str) -> bool:
-        logging.info(f"[TWSService] has_position – query={order_id_or_symbol}")
+        logging.info("[TWSService] has_position – query=%s", order_id_or_symbol)
         # check by UUID first
         pos = self._positions_by_order_id.get(order_id_or_symbol)
         if pos and pos["qty"] > 0:
@@ -980,12 +1166,12 @@ class TWSService(EWrapper, EClient):
 
     def sell_position_by_order_id(self, order_id: str, contract : Contract, qty: int | None = None,
                               limit_price: float | None = None, account: str = "", ex_order: Optional[Order] = None) -> bool:
-        logging.info(f"[TWSService] sell_position_by_order_id – order_id={order_id} qty={qty}")
+        logging.info("[TWSService] sell_position_by_order_id – order_id=%s qty=%s", order_id, qty, extra=AUDIT)
         pos = self._positions_by_order_id.get(order_id)
         if not pos or pos["qty"] <= 0:
-            logging.warning(f"[TWSService] sell_position_by_order_id: no live position for {order_id}")
-            logging.warning(f"The Position {pos}")
-            logging.warning(f"the dict {self._positions_by_order_id}")
+            logging.warning("[TWSService] sell_position_by_order_id: no live position for %s", order_id)
+            logging.warning("The Position %s", pos)
+            logging.warning("the dict %s", self._positions_by_order_id)
             return False
 
         sell_qty = qty or pos["qty"]
@@ -1007,7 +1193,7 @@ class TWSService(EWrapper, EClient):
 
         ok = self.sell_custom_order(ex_order, contract, account=account)
         if ok:
-            logging.info(f"[TWSService] SELL order submitted for {order_id}, waiting for fill confirmation.")
+            logging.info("[TWSService] SELL order submitted for %s, waiting for fill confirmation.", order_id, extra=AUDIT)
             # 🔧 Do NOT modify qty here; handled in orderStatus/execDetails
 
         return ok
@@ -1019,7 +1205,7 @@ class TWSService(EWrapper, EClient):
         Uses ONLY IBKR TWS - no Polygon fallbacks.
         Returns None if TWS is unavailable or market is closed/pre-market.
         """
-        logging.info(f"[TWSService] get_option_premium – {symbol} {expiry} {strike}{right}")
+        logging.info("[TWSService] get_option_premium – %s %s %s%s", symbol, expiry, strike, right)
         
         # --- Only use IBKR TWS ---
         if not self.is_connected():
@@ -1030,7 +1216,7 @@ class TWSService(EWrapper, EClient):
         contract = self.create_option_contract(symbol, expiry, strike, right)
         conid = self.resolve_conid(contract)
         if not conid:
-            logging.error(f"[TWSService] Failed to resolve conId for {symbol} {expiry} {strike}{right}")
+            logging.error("[TWSService] Failed to resolve conId for %s %s %s%s", symbol, expiry, strike, right)
             return None
 
         contract.conId = conid
@@ -1038,8 +1224,8 @@ class TWSService(EWrapper, EClient):
         tick_snapshot = {"bid": None, "ask": None}
         event = threading.Event()
 
-        def tickPrice(reqId, tickType, price, attrib):
-            if reqId != req_id or price <= 0:
+        def on_tick(tickType, price):
+            if price <= 0:
                 return
             if tickType == 1:
                 tick_snapshot["bid"] = price
@@ -1048,8 +1234,7 @@ class TWSService(EWrapper, EClient):
             if tick_snapshot["bid"] is not None and tick_snapshot["ask"] is not None:
                 event.set()
 
-        original_tick = self.tickPrice
-        self.tickPrice = tickPrice
+        self._tick_handlers[req_id] = on_tick
 
         try:
             self.reqMktData(req_id, contract, "", True, False, [])
@@ -1058,18 +1243,18 @@ class TWSService(EWrapper, EClient):
             ask = tick_snapshot["ask"]
             mid = (bid + ask) / 2 if (bid and ask) else bid or ask
             if mid:
-                logging.info(f"[TWSService] Premium snapshot for {symbol} {expiry} {strike}{right}: bid={bid}, ask={ask}, mid={mid}")
+                logging.info("[TWSService] Premium snapshot for %s %s %s%s: bid=%s, ask=%s, mid=%s", symbol, expiry, strike, right, bid, ask, mid)
                 return mid
 
             # --- No fallback - return None if TWS fails ---
-            logging.warning(f"[TWSService] No IBKR premium for {symbol} {expiry} {strike}{right}")
+            logging.warning("[TWSService] No IBKR premium for %s %s %s%s", symbol, expiry, strike, right)
             return None
         finally:
             try:
                 self.cancelMktData(req_id)
             except Exception:
                 pass
-            self.tickPrice = original_tick
+            self._tick_handlers.pop(req_id, None)
 
 service = TWSService()
 logging.info("[TWSService] module-level service instance created")
@@ -1,6 +1,7 @@
 import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from Helpers.Order import Order
 
 # ==========================================================
@@ -45,8 +46,10 @@ class ThreadInfo:
         self.start_time = datetime.utcnow()
         self.last_price: Optional[float] = None
         self.info: Dict = {}
+        self.revision = 0                     # registry version of the last change
+        self._registry: Optional["WatcherInfo"] = None
         self._lock = threading.Lock()
-    
+
     def cancel(self):
         self.order.mark_cancelled()
 
@@ -61,6 +64,9 @@ class ThreadInfo:
             if info:
                 self.info.update(info)
             self.info["last_update"] = datetime.utcnow().isoformat()
+        registry = self._registry
+        if registry is not None:
+            registry._touch(self)
 
     def status_str(self) -> str:
         """
@@ -85,6 +91,7 @@ class ThreadInfo:
                 "start_time": self.start_time.isoformat(),
                 "last_price": self.last_price,
                 "info": dict(self.info),
+                "revision": self.revision,
             }
 
 
@@ -92,23 +99,63 @@ class WatcherInfo:
     """
     Global registry of all watcher threads (trigger + stop-loss).
     Single instance, meant to be imported everywhere.
+
+    Every add / status update / removal bumps a registry version, so UIs can
+    poll changes_since(version) and touch only the rows that changed.
     """
+    MAX_TOMBSTONES = 1000
+
     def __init__(self):
         self._watchers: Dict[str, ThreadInfo] = {}
         self._lock = threading.Lock()
+        self._version = 0
+        self._changed: "OrderedDict[str, int]" = OrderedDict()     # order_id → revision, oldest first
+        self._tombstones: "OrderedDict[str, int]" = OrderedDict()  # removed order_id → revision
+        self._horizon = 0       # versions at or below this may have lost tombstones
+
+    # ------------------------------------------------------------------
+    # CHANGE TRACKING (called with self._lock held)
+    # ------------------------------------------------------------------
+    def _bump(self, order_id: str) -> int:
+        self._version += 1
+        self._changed[order_id] = self._version
+        self._changed.move_to_end(order_id)
+        return self._version
+
+    def _touch(self, thread_info: ThreadInfo):
+        with self._lock:
+            if self._watchers.get(thread_info.order_id) is thread_info:
+                thread_info.revision = self._bump(thread_info.order_id)
 
+    # ------------------------------------------------------------------
+    # REGISTRY
+    # ------------------------------------------------------------------
     def remove(self, order_id):
         with self._lock:
-            self._watchers.pop(order_id)
+            tinfo = self._watchers.pop(order_id)
+            tinfo._registry = None
+            self._version += 1
+            self._changed.pop(order_id, None)
+            self._tombstones[order_id] = self._version
+            self._tombstones.move_to_end(order_id)
+            while len(self._tombstones) > self.MAX_TOMBSTONES:
+                _, rev = self._tombstones.popitem(last=False)
+                self._horizon = rev
 
     def add_watcher(self, thread_info: ThreadInfo):
         with self._lock:
+            old = self._watchers.get(thread_info.order_id)
+            if old is not None:
+                old._registry = None
             self._watchers[thread_info.order_id] = thread_info
+            thread_info._registry = self
+            self._tombstones.pop(thread_info.order_id, None)
+            thread_info.revision = self._bump(thread_info.order_id)
 
     def update_watcher(self, order_id: str, status: int, last_price: Optional[float] = None, info: Optional[Dict] = None):
-        with self._lock:
-            if order_id in self._watchers:
-                self._watchers[order_id].update_status(status, last_price, info)
+        tinfo = self.get_watcher(order_id)
+        if tinfo is not None:
+            tinfo.update_status(status, last_price, info)
 
     def get_watcher(self, order_id: str) -> Optional[ThreadInfo]:
         with self._lock:
@@ -117,11 +164,50 @@ class WatcherInfo:
     def list_all(self):
         with self._lock:
             return [w.to_dict() for w in self._watchers.values()]
-        
+
     def cancel(self, order_id: str):
         watcher = self.get_watcher(order_id)
         watcher.cancel()
 
+    # ------------------------------------------------------------------
+    # CHANGE FEED
+    # ------------------------------------------------------------------
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def changes_since(self, version: int = 0) -> Dict:
+        """
+        Watchers changed after `version`:
+            {"version": current, "changed": [to_dict()...], "removed": [order_id...], "full": bool}
+        When `version` is 0 or older than the tombstone horizon, "full" is True
+        and "changed" holds every watcher – drop any row not in it.
+        """
+        with self._lock:
+            current = self._version
+            full = version <= 0 or version < self._horizon
+            if full:
+                changed: List[ThreadInfo] = list(self._watchers.values())
+                removed: List[str] = []
+            else:
+                changed, removed = [], []
+                for order_id, rev in reversed(self._changed.items()):
+                    if rev <= version:
+                        break
+                    changed.append(self._watchers[order_id])
+                for order_id, rev in reversed(self._tombstones.items()):
+                    if rev <= version:
+                        break
+                    removed.append(order_id)
+        # Render outside the registry lock
+        return {
+            "version": current,
+            "changed": [w.to_dict() for w in changed],
+            "removed": removed,
+            "full": full,
+        }
+
 
 # ✅ Global singleton instance (the library)
 watcher_info = WatcherInfo()
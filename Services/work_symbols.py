@@ -31,6 +31,15 @@ class WorkSymbols:
             logging.error("[WorkSymbols] TWS not connected – cannot refresh underlying conids")
             return
 
+        resolved: Dict[str, str] = {}
+        try:
+            self._resolve_into(tws, resolved)
+        finally:
+            # one transaction for the whole refresh (partial progress kept on errors)
+            self.storage.store_many(resolved)
+            logging.info("[WorkSymbols] Stored %d underlying conids", len(resolved))
+
+    def _resolve_into(self, tws, resolved: Dict[str, str]) -> None:
         for symbol in list(self.symbols.keys()):
             try:
                 logging.info(f"[WorkSymbols] Resolving underlying conid for {symbol}")
@@ -47,10 +56,10 @@ class WorkSymbols:
                 conid = tws.resolve_conid(underlying_contract)
 
                 if conid:
-                    self.storage.store_conid(symbol, str(conid))
+                    resolved[symbol] = str(conid)
                     self.symbols[symbol] = True
                     logging.info(
-                        f"[WorkSymbols] ✅ Underlying conid stored for {symbol}: {conid}"
+                        f"[WorkSymbols] ✅ Underlying conid resolved for {symbol}: {conid}"
                     )
                 else:
                     self.symbols[symbol] = False
@@ -90,8 +99,9 @@ class WorkSymbols:
         """
         Re-check DB for all tracked symbols and update internal state.
         """
-        for symbol in list(self.symbols.keys()):
-            self.symbols[symbol] = self.storage.get_conid(symbol) is not None
+        conids = self.storage.get_many(list(self.symbols.keys()))
+        for symbol, conid in conids.items():
+            self.symbols[symbol] = conid is not None
 
     def get_ready_symbols(self) -> Dict[str, bool]:
         """
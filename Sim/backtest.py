@@ -0,0 +1,408 @@
+# Sim/backtest.py
+"""
+Vectorized backtest of breakout-trigger tickets over historical minute bars.
+
+A ticket is modelled the way the live path runs it:
+  * entry   – first bar whose high crosses the trigger (low for puts),
+              Order.is_triggered semantics, filled at the trigger
+  * stop    – _finalize_order level: trigger - sl (call) / trigger + sl (put)
+  * take    – OrderManager.take_profit sells tp_pct of the ORIGINAL quantity
+              once the underlying has moved tp_move in our favour
+  * rest    – whatever is left exits on the stop or at the session close
+
+The parameter grid (trigger offset × SL offset × TP move × TP pct) is
+evaluated with NumPy in one pass per block of sessions; files are spread
+across a process pool. P&L is measured on the underlying, in % of the trigger.
+
+Input files (one or many, any mix):
+  *.csv    header with t|timestamp, open|o, high|h, low|l, close|c
+           (t in epoch s or ms)
+  *.json   Polygon /v2/aggs response ({"results": [{t,o,h,l,c}, ...]})
+  *.ticks  recorded tick files (Services/tick_recorder.py), rolled to 1-min bars
+
+    python -m Sim.backtest bars/*.csv --right C \\
+        --trigger-pct 0.1,0.25,0.5 --sl-pct 0.25,0.5,1 --tp-move-pct 0.5,1 --tp-pct 10,20,50
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from Services.nasdaq_info import EASTERN
+
+# view.py TP buttons
+DEFAULT_TP_PCT = (10, 20, 50)
+
+RTH_OPEN_MIN = 9 * 60 + 30
+RTH_CLOSE_MIN = 16 * 60
+
+# Per-parameter-set accumulators (summed over sessions)
+FIELDS = ("sessions", "fills", "stops", "tps", "eod", "wins", "pnl_pct", "pnl_sq")
+
+TICK_DTYPE = np.dtype([("sid", "<u4"), ("exch", "<i8"), ("recv", "<i8"), ("price", "<f8"), ("size", "<u4")])
+
+
+# ==========================================================
+# BAR LOADING
+# ==========================================================
+def _csv_bars(path: str) -> Dict[str, np.ndarray]:
+    with open(path, newline="", encoding="utf-8") as f:
+        header = [h.strip().lower() for h in next(csv.reader(f))]
+
+    def col(*names):
+        for n in names:
+            if n in header:
+                return header.index(n)
+        raise ValueError(f"{path}: missing column {names[0]}")
+
+    idx = [col("t", "timestamp", "time"), col("open", "o"), col("high", "h"), col("low", "l"), col("close", "c")]
+    data = np.loadtxt(path, delimiter=",", skiprows=1, usecols=idx, dtype=np.float64, ndmin=2)
+    sym = os.path.basename(path).split(".")[0].split("_")[0].upper()
+    return {sym: data.reshape(-1, 5)}
+
+
+def _json_bars(path: str) -> Dict[str, np.ndarray]:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    results = payload.get("results") or []
+    data = np.array([[r["t"], r["o"], r["h"], r["l"], r["c"]] for r in results], dtype=np.float64).reshape(-1, 5)
+    sym = (payload.get("ticker") or os.path.basename(path).split(".")[0].split("_")[0]).upper()
+    return {sym: data}
+
+
+def _tick_bars(path: str) -> Dict[str, np.ndarray]:
+    from Services.tick_recorder import HEADER, RECORD, TICK_MAGIC, load_symbols
+
+    symbols = load_symbols(path)
+    with open(path, "rb") as f:
+        magic, _version, rec_size, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != TICK_MAGIC or rec_size != RECORD.size or TICK_DTYPE.itemsize != RECORD.size:
+        raise ValueError(f"{path}: not a tick file")
+
+    ticks = np.memmap(path, dtype=TICK_DTYPE, mode="r", offset=HEADER.size)
+    ts = np.where(ticks["exch"] > 0, ticks["exch"], ticks["recv"])
+    out = {}
+    for sid in np.unique(ticks["sid"]):
+        mask = ticks["sid"] == sid
+        order = np.argsort(ts[mask], kind="stable")
+        t = ts[mask][order]
+        px = np.asarray(ticks["price"][mask][order])
+        minute = t // 60_000_000_000
+        starts = np.flatnonzero(np.r_[True, minute[1:] != minute[:-1]])
+        ends = np.r_[starts[1:], len(px)] - 1
+        out[symbols[sid] if sid < len(symbols) else str(sid)] = np.column_stack([
+            minute[starts] * 60_000.0,
+            px[starts],
+            np.maximum.reduceat(px, starts),
+            np.minimum.reduceat(px, starts),
+            px[ends],
+        ])
+    return out
+
+
+def load_bars(path: str) -> Dict[str, np.ndarray]:
+    """{symbol: (N, 5) array of [t ms, open, high, low, close]} sorted by time."""
+    if path.endswith(".ticks"):
+        bars = _tick_bars(path)
+    elif path.endswith(".json"):
+        bars = _json_bars(path)
+    else:
+        bars = _csv_bars(path)
+
+    for sym, data in bars.items():
+        if len(data) and data[:, 0].max() < 1e11:      # epoch seconds → ms
+            data[:, 0] *= 1000.0
+        bars[sym] = data[np.argsort(data[:, 0], kind="stable")]
+    return bars
+
+
+def _eastern_minutes(t_ms: np.ndarray) -> np.ndarray:
+    """Minutes since the Unix epoch in US/Eastern wall time (DST per UTC day)."""
+    utc_day = (t_ms // 86_400_000).astype(np.int64)
+    days, inverse = np.unique(utc_day, return_inverse=True)
+    offsets = np.array([
+        datetime.datetime.fromtimestamp(int(d) * 86400 + 43200, datetime.timezone.utc)
+        .astimezone(EASTERN).utcoffset().total_seconds() / 60
+        for d in days
+    ])
+    return t_ms / 60_000.0 + offsets[inverse]
+
+
+def sessions(bars: np.ndarray, rth_only: bool = True) -> Iterator[np.ndarray]:
+    """Split a bar array into US/Eastern trading days (optionally RTH only)."""
+    if not len(bars):
+        return
+    local_min = _eastern_minutes(bars[:, 0])
+    day = (local_min // 1440).astype(np.int64)
+    if rth_only:
+        tod = local_min - day * 1440
+        keep = (tod >= RTH_OPEN_MIN) & (tod < RTH_CLOSE_MIN)
+        bars, day = bars[keep], day[keep]
+    if not len(bars):
+        return
+    cuts = np.flatnonzero(day[1:] != day[:-1]) + 1
+    for chunk in np.split(bars, cuts):
+        if len(chunk) >= 2:
+            yield chunk
+
+
+# ==========================================================
+# VECTORIZED SESSION EVALUATION
+# ==========================================================
+class Grid:
+    """Parameter axes, all as fractions (0.005 = 0.5%)."""
+
+    def __init__(self, trigger_pct, sl_pct, tp_move_pct, tp_pct, right: str = "C"):
+        self.right = right.upper()[0]
+        self.trigger = np.asarray(trigger_pct, dtype=np.float64) / 100
+        self.sl = np.asarray(sl_pct, dtype=np.float64) / 100
+        self.tp_move = np.asarray(tp_move_pct, dtype=np.float64) / 100
+        self.tp = np.asarray(tp_pct, dtype=np.float64) / 100
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int]:
+        return len(self.trigger), len(self.sl), len(self.tp_move), len(self.tp)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def rows(self) -> Iterator[Tuple[Tuple[int, ...], Tuple[float, ...]]]:
+        for idx in np.ndindex(*self.shape):
+            yield idx, (self.trigger[idx[0]] * 100, self.sl[idx[1]] * 100,
+                        self.tp_move[idx[2]] * 100, self.tp[idx[3]] * 100)
+
+
+def _first_hit(hit: np.ndarray, n: int) -> np.ndarray:
+    """Index of the first True along the last axis, n where none."""
+    return np.where(hit.any(axis=-1), hit.argmax(axis=-1), n)
+
+
+def stack_sessions(days: List[np.ndarray]) -> np.ndarray:
+    """(D, N, 5) block of sessions, right-padded with NaN (NaN never crosses a level)."""
+    width = max(len(d) for d in days)
+    block = np.full((len(days), width, 5), np.nan)
+    for i, d in enumerate(days):
+        block[i, :len(d)] = d
+    return block
+
+
+def evaluate_sessions(block: np.ndarray, grid: Grid) -> Dict[str, np.ndarray]:
+    """
+    A (D, N, 5) block of trading days against the whole grid, in one pass.
+    Returns accumulators shaped grid.shape, summed over the D sessions.
+    Each session's open is the reference the trigger offset is measured from.
+
+    Axes below: D sessions, T trigger, S stop, M TP move, Q TP pct, N bars.
+    """
+    o, h, l, c = block[..., 1], block[..., 2], block[..., 3], block[..., 4]
+    D, n = o.shape
+    d = 1.0 if grid.right == "C" else -1.0
+    length = (~np.isnan(c)).sum(axis=1)
+    close = c[np.arange(D), length - 1]                                    # (D,)
+    bar = np.arange(n)
+
+    # --- entry: Order.is_triggered (high > trigger / low < trigger)
+    trig = o[:, :1] * (1.0 + d * grid.trigger[None, :])                    # (D, T)
+    if d > 0:
+        entry = _first_hit(h[:, None, :] > trig[..., None], n)             # (D, T)
+    else:
+        entry = _first_hit(l[:, None, :] < trig[..., None], n)
+    filled = entry < n
+
+    # Exits are only looked for on bars after the fill bar (intrabar order unknown)
+    after = (bar[None, None, :] > entry[..., None])[:, :, None, :]        # (D, T, 1, N)
+
+    # --- stop loss (D, T, S): _finalize_order level trigger ∓ sl, sl = sl_pct of trigger
+    sl_level = trig[..., None] * (1.0 - d * grid.sl)                       # (D, T, S)
+    if d > 0:
+        sl_cross = l[:, None, None, :] <= sl_level[..., None]
+    else:
+        sl_cross = h[:, None, None, :] >= sl_level[..., None]
+    sl_idx = _first_hit(sl_cross & after, n)
+    # Gapping through the stop fills at that bar's open
+    gap_open = np.take_along_axis(o, np.minimum(sl_idx, n - 1).reshape(D, -1), axis=1).reshape(sl_idx.shape)
+    sl_px = np.minimum(gap_open, sl_level) if d > 0 else np.maximum(gap_open, sl_level)
+
+    # --- take profit (D, T, M): underlying moved tp_move from the trigger
+    tp_level = trig[..., None] * (1.0 + d * grid.tp_move)                  # (D, T, M)
+    if d > 0:
+        tp_cross = h[:, None, None, :] >= tp_level[..., None]
+    else:
+        tp_cross = l[:, None, None, :] <= tp_level[..., None]
+    tp_idx = _first_hit(tp_cross & after, n)
+
+    # --- combine to (D, T, S, M, Q); a bar touching both counts as the stop
+    sl_b = sl_idx[:, :, :, None, None]
+    tp_b = tp_idx[:, :, None, :, None]
+    stopped = sl_b < n
+    tp_hit = (tp_b < n) & (tp_b < sl_b)
+    frac = np.where(tp_hit, grid.tp, 0.0)
+
+    entry_px = trig[:, :, None, None, None]
+    rest_px = np.where(stopped, sl_px[:, :, :, None, None], close[:, None, None, None, None])
+    tp_px = tp_level[:, :, None, :, None]
+    pnl = d * (frac * (tp_px - entry_px) + (1.0 - frac) * (rest_px - entry_px)) / entry_px * 100.0
+
+    full = (D,) + grid.shape
+    fill = np.broadcast_to(filled[:, :, None, None, None], full)
+    stopped = np.broadcast_to(stopped, full)
+    pnl = np.where(fill, pnl, 0.0)
+    return {
+        "sessions": np.full(grid.shape, float(D)),
+        "fills": fill.sum(axis=0, dtype=np.float64),
+        "stops": (fill & stopped).sum(axis=0, dtype=np.float64),
+        "tps": (fill & tp_hit).sum(axis=0, dtype=np.float64),
+        "eod": (fill & ~stopped).sum(axis=0, dtype=np.float64),
+        "wins": (fill & (pnl > 0)).sum(axis=0, dtype=np.float64),
+        "pnl_pct": pnl.sum(axis=0),
+        "pnl_sq": (pnl * pnl).sum(axis=0),
+    }
+
+
+def evaluate_session(bars: np.ndarray, grid: Grid) -> Dict[str, np.ndarray]:
+    """Single trading day ((N, 5) bars) against the grid."""
+    return evaluate_sessions(bars[None, ...], grid)
+
+
+def run_file(path: str, grid: Grid, rth_only: bool = True, symbols: Optional[List[str]] = None,
+             batch: int = 64):
+    """Worker: every session in one file, `batch` days per NumPy pass. Returns (accumulators, bars, sessions)."""
+    acc = {k: np.zeros(grid.shape) for k in FIELDS}
+    days: List[np.ndarray] = []
+    n_bars = n_sessions = 0
+
+    def drain():
+        for k, v in evaluate_sessions(stack_sessions(days), grid).items():
+            acc[k] += v
+        days.clear()
+
+    for sym, bars in load_bars(path).items():
+        if symbols and sym not in symbols:
+            continue
+        for day in sessions(bars, rth_only):
+            days.append(day)
+            n_bars += len(day)
+            n_sessions += 1
+            if len(days) >= batch:
+                drain()
+    if days:
+        drain()
+    return acc, n_bars, n_sessions
+
+
+# ==========================================================
+# DRIVER
+# ==========================================================
+def backtest(paths: List[str], grid: Grid, workers: Optional[int] = None,
+             rth_only: bool = True, symbols: Optional[List[str]] = None) -> Dict:
+    acc = {k: np.zeros(grid.shape) for k in FIELDS}
+    n_bars = n_sessions = 0
+    start = time.perf_counter()
+
+    if workers == 1 or len(paths) == 1:
+        results = (run_file(p, grid, rth_only, symbols) for p in paths)
+        for part, b, s in results:
+            for k in FIELDS:
+                acc[k] += part[k]
+            n_bars += b
+            n_sessions += s
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_file, p, grid, rth_only, symbols) for p in paths]
+            for fut in futures:
+                part, b, s = fut.result()
+                for k in FIELDS:
+                    acc[k] += part[k]
+                n_bars += b
+                n_sessions += s
+
+    elapsed = time.perf_counter() - start
+    return {
+        "acc": acc,
+        "bars": n_bars,
+        "sessions": n_sessions,
+        "param_sets": grid.size,
+        "elapsed_sec": elapsed,
+        "bars_per_sec": n_bars / elapsed if elapsed else None,
+        "bar_evals_per_sec": n_bars * grid.size / elapsed if elapsed else None,
+    }
+
+
+def table(result: Dict, grid: Grid, top: Optional[int] = None) -> List[Dict]:
+    """One row per parameter set, best mean P&L first."""
+    acc = result["acc"]
+    rows = []
+    for idx, (trig, sl, tp_move, tp) in grid.rows():
+        fills = acc["fills"][idx]
+        mean = acc["pnl_pct"][idx] / fills if fills else 0.0
+        var = acc["pnl_sq"][idx] / fills - mean * mean if fills else 0.0
+        rows.append({
+            "trigger%": trig, "sl%": sl, "tp_move%": tp_move, "tp%": tp,
+            "sessions": int(acc["sessions"][idx]),
+            "fills": int(fills),
+            "fill_rate": fills / acc["sessions"][idx] if acc["sessions"][idx] else 0.0,
+            "stops": int(acc["stops"][idx]),
+            "tps": int(acc["tps"][idx]),
+            "eod": int(acc["eod"][idx]),
+            "win_rate": acc["wins"][idx] / fills if fills else 0.0,
+            "mean_pnl%": mean,
+            "std_pnl%": float(np.sqrt(max(var, 0.0))),
+            "total_pnl%": acc["pnl_pct"][idx],
+        })
+    rows.sort(key=lambda r: r["mean_pnl%"], reverse=True)
+    return rows[:top] if top else rows
+
+
+def _floats(spec: str) -> List[float]:
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized backtest of trigger/stop-loss tickets")
+    parser.add_argument("paths", nargs="+", help="bar files (.csv/.json) or tick files (.ticks)")
+    parser.add_argument("--right", default="C", choices=("C", "P"))
+    parser.add_argument("--trigger-pct", default="0.1,0.25,0.5,1", help="trigger offset from session open, %%")
+    parser.add_argument("--sl-pct", default="0.25,0.5,1", help="stop offset from trigger, %% of trigger")
+    parser.add_argument("--tp-move-pct", default="0.5,1,2", help="underlying move that fires TP, %%")
+    parser.add_argument("--tp-pct", default=",".join(str(p) for p in DEFAULT_TP_PCT),
+                        help="share of original qty sold at TP, %%")
+    parser.add_argument("--symbols", help="comma-separated filter")
+    parser.add_argument("--all-hours", action="store_true", help="include pre/post-market bars")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", help="write the full table here")
+    args = parser.parse_args()
+
+    grid = Grid(_floats(args.trigger_pct), _floats(args.sl_pct), _floats(args.tp_move_pct),
+                _floats(args.tp_pct), args.right)
+    symbols = [s.upper() for s in args.symbols.split(",")] if args.symbols else None
+    result = backtest(args.paths, grid, args.workers, not args.all_hours, symbols)
+    rows = table(result, grid)
+
+    cols = ("trigger%", "sl%", "tp_move%", "tp%", "fills", "fill_rate", "stops", "tps", "eod",
+            "win_rate", "mean_pnl%", "std_pnl%", "total_pnl%")
+    print(" ".join(f"{c:>10}" for c in cols))
+    for r in rows[:args.top]:
+        print(" ".join(f"{r[c]:>10.3f}" if isinstance(r[c], float) else f"{r[c]:>10}" for c in cols))
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else list(cols))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    print(f"\n{result['sessions']} sessions, {result['bars']} bars, {result['param_sets']} parameter sets "
+          f"in {result['elapsed_sec']:.3f}s")
+    if result["bars_per_sec"]:
+        print(f"{result['bars_per_sec']:,.0f} bars/s, {result['bar_evals_per_sec']:,.0f} bar×param evals/s")
+
+
+if __name__ == "__main__":
+    main()
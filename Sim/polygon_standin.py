@@ -0,0 +1,594 @@
+# Sim/polygon_standin.py
+"""
+Local Polygon stand-in for offline load testing.
+
+Serves the REST endpoints PolygonService uses and the socket.polygon.io
+trade stream (RFC 6455, stdlib only) from a synthetic random walk or a
+recorded JSON-lines tick file, at a configurable rate.
+
+Point the app at it with:
+    POLYGON_API_KEY=standin
+    POLYGON_BASE_URL=http://127.0.0.1:8801
+    POLYGON_WS_URL=ws://127.0.0.1:8802/stocks
+
+Run standalone:
+    python -m Sim.polygon_standin --symbols TSLA,SPY --rate 2000
+"""
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+# ==========================================================
+# MARKET STATE
+# ==========================================================
+class SymbolState:
+    """Last trade, day bar and per-second bars for one symbol."""
+    BAR_HISTORY = 6 * 3600   # seconds of 1s bars kept for /v2/aggs
+
+    def __init__(self, symbol: str, price: float):
+        self.symbol = symbol
+        self.last = price
+        self.size = 0
+        self.ts_ms = int(time.time() * 1000)
+        self.open = self.high = self.low = price
+        self.volume = 0
+        self.prev_high = price * 1.01
+        self.prev_low = price * 0.99
+        self.bars = deque(maxlen=self.BAR_HISTORY)   # [sec, o, h, l, c, v]
+
+    def apply(self, price: float, size: int, ts_ms: int):
+        self.last, self.size, self.ts_ms = price, size, ts_ms
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.volume += size
+
+        sec = ts_ms // 1000
+        if self.bars and self.bars[-1][0] == sec:
+            bar = self.bars[-1]
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += size
+        else:
+            self.bars.append([sec, price, price, price, price, size])
+
+    def aggregates(self, start_ms: int, end_ms: int, span_sec: int) -> List[Dict]:
+        out, cur = [], None
+        for sec, o, h, l, c, v in list(self.bars):
+            if not start_ms <= sec * 1000 <= end_ms:
+                continue
+            bucket = sec - sec % span_sec
+            if cur is None or cur["t"] != bucket * 1000:
+                cur = {"t": bucket * 1000, "o": o, "h": h, "l": l, "c": c, "v": v}
+                out.append(cur)
+            else:
+                cur["h"] = max(cur["h"], h)
+                cur["l"] = min(cur["l"], l)
+                cur["c"] = c
+                cur["v"] += v
+        return out
+
+    def ticker_node(self) -> Dict:
+        spread = max(0.01, round(self.last * 0.0002, 2))
+        return {
+            "ticker": self.symbol,
+            "lastTrade": {"p": self.last, "s": self.size, "t": self.ts_ms * 1_000_000},
+            "lastQuote": {"p": round(self.last - spread, 2), "P": round(self.last + spread, 2)},
+            "day": {"o": self.open, "h": self.high, "l": self.low, "c": self.last, "v": self.volume},
+            "prevDay": {"h": self.prev_high, "l": self.prev_low},
+        }
+
+
+class TickSource:
+    """
+    Produces trades either from a seeded random walk or by cycling through a
+    recorded JSON-lines file ({"sym": ..., "p": ..., "s": ...} per line).
+    """
+
+    def __init__(self, symbols: Iterable[str], seed: int = 7, path: Optional[str] = None,
+                 start_price: float = 100.0, volatility: float = 0.0005):
+        self._rng = random.Random(seed)
+        self._volatility = volatility
+        self._recorded: List[Dict] = []
+        self._pos = 0
+        self.lock = threading.Lock()
+
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                self._recorded = [json.loads(line) for line in f if line.strip()]
+            symbols = sorted({t["sym"] for t in self._recorded})
+
+        self.state: Dict[str, SymbolState] = {}
+        for sym in symbols:
+            first = next((t["p"] for t in self._recorded if t["sym"] == sym), None)
+            self.state[sym] = SymbolState(sym, first or start_price * (0.5 + self._rng.random()))
+        self._symbols = list(self.state)
+
+    def next_batch(self, n: int) -> List[Dict]:
+        now_ms = int(time.time() * 1000)
+        out = []
+        with self.lock:
+            for _ in range(n):
+                if self._recorded:
+                    rec = self._recorded[self._pos]
+                    self._pos = (self._pos + 1) % len(self._recorded)
+                    sym, price, size = rec["sym"], float(rec["p"]), int(rec.get("s", 100))
+                else:
+                    sym = self._rng.choice(self._symbols)
+                    st = self.state[sym]
+                    price = round(max(0.01, st.last * (1 + self._rng.gauss(0, self._volatility))), 2)
+                    size = self._rng.choice((1, 10, 50, 100, 100, 200, 500))
+                self.state[sym].apply(price, size, now_ms)
+                out.append({"ev": "T", "sym": sym, "p": price, "s": size, "t": now_ms, "x": 4})
+        return out
+
+    def get(self, symbol: str) -> Optional[SymbolState]:
+        return self.state.get(symbol.upper())
+
+
+# ==========================================================
+# REST
+# ==========================================================
+def _option_results(state: SymbolState, query: Dict[str, List[str]]) -> List[Dict]:
+    """Synthetic option chain: intrinsic value + flat time value around spot."""
+    spot = state.last
+    today = datetime.date.today()
+    friday = today + datetime.timedelta(days=(4 - today.weekday()) % 7)
+
+    expiries = query.get("expiration_date") or [friday.isoformat()]
+    types = query.get("contract_type") or ["call", "put"]
+    if "strike_price" in query:
+        strikes = [float(query["strike_price"][0])]
+    else:
+        base = round(spot)
+        strikes = [float(base + k) for k in range(-10, 11)]
+
+    results = []
+    for exp in expiries:
+        for ctype in types:
+            for strike in strikes:
+                intrinsic = max(0.0, spot - strike) if ctype == "call" else max(0.0, strike - spot)
+                mid = round(intrinsic + max(0.05, spot * 0.004), 2)
+                occ = f"O:{state.symbol}{exp[2:4]}{exp[5:7]}{exp[8:10]}{ctype[0].upper()}{int(strike * 1000):08d}"
+                results.append({
+                    "details": {
+                        "ticker": occ, "expiration_date": exp,
+                        "strike_price": strike, "contract_type": ctype,
+                    },
+                    "last_quote": {"bid": round(mid - 0.02, 2), "ask": round(mid + 0.02, 2)},
+                    "last_trade": {"price": mid},
+                    "updated": time.time_ns(),
+                })
+    limit = int(query.get("limit", ["250"])[0])
+    return results[:limit]
+
+
+class _RestHandler(BaseHTTPRequestHandler):
+    server_version = "PolygonStandIn/1.0"
+    standin = None   # set on the subclass built per server
+
+    def log_message(self, fmt, *args):
+        logging.debug("[PolygonStandIn] " + fmt, *args)
+
+    def _send(self, code: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        standin = self.standin
+        standin.rest_requests += 1
+        if standin.rest_latency:
+            time.sleep(standin.rest_latency)
+        if not standin.allow_rest():
+            self._send(429, {"status": "ERROR", "error": "Too many requests"})
+            return
+
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        source = standin.source
+
+        try:
+            # /v2/snapshot/locale/us/markets/stocks/tickers[/SYM]
+            if parts[:7] == ["v2", "snapshot", "locale", "us", "markets", "stocks", "tickers"]:
+                if len(parts) == 8:
+                    st = source.get(parts[7])
+                    if not st:
+                        return self._send(404, {"status": "NOT_FOUND"})
+                    return self._send(200, {"status": "OK", "ticker": st.ticker_node()})
+                wanted = (query.get("tickers") or [""])[0].split(",")
+                nodes = [source.get(s).ticker_node() for s in wanted if s and source.get(s)]
+                return self._send(200, {"status": "OK", "count": len(nodes), "tickers": nodes})
+
+            # /v2/last/trade/SYM
+            if parts[:3] == ["v2", "last", "trade"] and len(parts) == 4:
+                st = source.get(parts[3])
+                if not st:
+                    return self._send(404, {"status": "NOT_FOUND"})
+                return self._send(200, {"status": "OK", "results": {
+                    "T": st.symbol, "p": st.last, "s": st.size, "t": st.ts_ms * 1_000_000,
+                }})
+
+            # /v2/aggs/ticker/SYM/range/1/{second|minute}/from/to
+            if parts[:2] == ["v2", "aggs"] and len(parts) == 9:
+                st = source.get(parts[3])
+                if not st:
+                    return self._send(404, {"status": "NOT_FOUND"})
+                span = int(parts[5]) * (60 if parts[6] == "minute" else 1)
+                results = st.aggregates(int(parts[7]), int(parts[8]), span)
+                return self._send(200, {
+                    "status": "OK", "ticker": st.symbol,
+                    "resultsCount": len(results), "results": results,
+                })
+
+            # /v3/snapshot/options/UNDERLYING
+            if parts[:3] == ["v3", "snapshot", "options"] and len(parts) == 4:
+                st = source.get(parts[3])
+                if not st:
+                    return self._send(404, {"status": "NOT_FOUND"})
+                return self._send(200, {"status": "OK", "results": _option_results(st, query)})
+
+            self._send(404, {"status": "NOT_FOUND", "path": url.path})
+        except Exception as e:
+            logging.error(f"[PolygonStandIn] REST error on {self.path}: {e}")
+            self._send(500, {"status": "ERROR", "error": str(e)})
+
+
+# ==========================================================
+# WEBSOCKET
+# ==========================================================
+def _ws_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    head = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        head += bytes([n])
+    elif n < 1 << 16:
+        head += bytes([126]) + struct.pack(">H", n)
+    else:
+        head += bytes([127]) + struct.pack(">Q", n)
+    return head + payload
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("socket closed")
+        buf += chunk
+    return buf
+
+
+def _ws_read(sock: socket.socket):
+    """Read one client frame → (opcode, payload)."""
+    b1, b2 = _recv_exact(sock, 2)
+    opcode = b1 & 0x0F
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack(">H", _recv_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack(">Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if b2 & 0x80 else None
+    payload = _recv_exact(sock, n) if n else b""
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+class _WsClient:
+    def __init__(self, sock: socket.socket, addr):
+        self.sock = sock
+        self.addr = addr
+        self.authed = False
+        self.all_symbols = False
+        self.symbols = set()
+        self.send_lock = threading.Lock()
+        self.alive = True
+
+    def send_json(self, payload) -> bool:
+        data = _ws_frame(json.dumps(payload).encode())
+        try:
+            with self.send_lock:
+                self.sock.sendall(data)
+            return True
+        except OSError:
+            self.alive = False
+            return False
+
+    def wants(self, sym: str) -> bool:
+        return self.authed and (self.all_symbols or sym in self.symbols)
+
+
+# ==========================================================
+# STAND-IN
+# ==========================================================
+class PolygonStandIn:
+    """
+    REST + WS stand-in.
+    rate        → trades per second across all symbols (0 = as fast as possible)
+    batch       → trades per WS message
+    rest_latency→ artificial REST delay in seconds
+    rest_limit  → REST requests/second before answering 429 (0 = unlimited)
+    """
+
+    def __init__(self, source: TickSource, host: str = "127.0.0.1", rest_port: int = 8801,
+                 ws_port: int = 8802, rate: float = 100.0, batch: int = 1,
+                 rest_latency: float = 0.0, rest_limit: int = 0):
+        self.source = source
+        self.host = host
+        self.rest_port = rest_port
+        self.ws_port = ws_port
+        self.rate = rate
+        self.batch = max(1, batch)
+        self.rest_latency = rest_latency
+        self.rest_limit = rest_limit
+
+        self.rest_requests = 0
+        self.ticks_sent = 0
+        self._rest_window = deque()
+        self._rest_lock = threading.Lock()
+
+        self._clients: List[_WsClient] = []
+        self._clients_lock = threading.Lock()
+        self._running = False
+        self._http = None
+        self._ws_sock = None
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.rest_port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.ws_port}/stocks"
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+    def start(self):
+        self._running = True
+
+        handler = type("RestHandler", (_RestHandler,), {"standin": self})
+        self._http = ThreadingHTTPServer((self.host, self.rest_port), handler)
+        self._http.daemon_threads = True
+        self.rest_port = self._http.server_address[1]
+
+        self._ws_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._ws_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._ws_sock.bind((self.host, self.ws_port))
+        self._ws_sock.listen(16)
+        self.ws_port = self._ws_sock.getsockname()[1]
+
+        for target, name in ((self._http.serve_forever, "StandInREST"),
+                             (self._accept_loop, "StandInWSAccept"),
+                             (self._stream_loop, "StandInStream")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+        logging.info(f"[PolygonStandIn] REST {self.base_url}  WS {self.ws_url}  rate={self.rate}/s")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._http:
+            self._http.shutdown()
+            self._http.server_close()
+        if self._ws_sock:
+            try:
+                self._ws_sock.close()
+            except OSError:
+                pass
+        with self._clients_lock:
+            for c in self._clients:
+                try:
+                    c.sock.close()
+                except OSError:
+                    pass
+            self._clients.clear()
+
+    def drop_clients(self):
+        """Close every WS connection (simulates a vendor disconnect)."""
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for c in clients:
+            c.alive = False
+            try:
+                c.sock.shutdown(socket.SHUT_RDWR)
+                c.sock.close()
+            except OSError:
+                pass
+
+    def allow_rest(self) -> bool:
+        if not self.rest_limit:
+            return True
+        now = time.monotonic()
+        with self._rest_lock:
+            while self._rest_window and now - self._rest_window[0] > 1.0:
+                self._rest_window.popleft()
+            if len(self._rest_window) >= self.rest_limit:
+                return False
+            self._rest_window.append(now)
+            return True
+
+    # ------------------------------------------------------------------
+    # WS
+    # ------------------------------------------------------------------
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, addr = self._ws_sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(sock, addr), daemon=True).start()
+
+    def _handshake(self, sock: socket.socket) -> bool:
+        raw = b""
+        while b"\r\n\r\n" not in raw:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return False
+            raw += chunk
+        headers = {}
+        for line in raw.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        key = headers.get("sec-websocket-key")
+        if not key:
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return True
+
+    def _serve_client(self, sock: socket.socket, addr):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            if not self._handshake(sock):
+                sock.close()
+                return
+        except OSError:
+            return
+
+        client = _WsClient(sock, addr)
+        with self._clients_lock:
+            self._clients.append(client)
+        client.send_json([{"ev": "status", "status": "connected", "message": "Connected Successfully"}])
+
+        try:
+            while self._running and client.alive:
+                opcode, payload = _ws_read(sock)
+                if opcode == 0x8:      # close
+                    with client.send_lock:
+                        sock.sendall(_ws_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:      # ping
+                    with client.send_lock:
+                        sock.sendall(_ws_frame(payload, 0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+                self._handle_action(client, json.loads(payload.decode()))
+        except (OSError, ConnectionError, ValueError):
+            pass
+        finally:
+            client.alive = False
+            with self._clients_lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _handle_action(self, client: _WsClient, msg: Dict):
+        action = msg.get("action")
+        params = msg.get("params", "")
+        if action == "auth":
+            client.authed = True
+            client.send_json([{"ev": "status", "status": "auth_success", "message": "authenticated"}])
+            return
+
+        channels = [p.strip() for p in params.split(",") if p.strip()]
+        for ch in channels:
+            _, _, sym = ch.partition(".")
+            if action == "subscribe":
+                if sym == "*":
+                    client.all_symbols = True
+                else:
+                    client.symbols.add(sym.upper())
+            elif action == "unsubscribe":
+                if sym == "*":
+                    client.all_symbols = False
+                else:
+                    client.symbols.discard(sym.upper())
+        client.send_json([{"ev": "status", "status": "success", "message": f"{action}d to: {params}"}])
+
+    def _stream_loop(self):
+        interval = self.batch / self.rate if self.rate else 0.0
+        next_at = time.perf_counter()
+        while self._running:
+            trades = self.source.next_batch(self.batch)
+            with self._clients_lock:
+                clients = list(self._clients)
+            for client in clients:
+                events = [t for t in trades if client.wants(t["sym"])]
+                if events and client.send_json(events):
+                    self.ticks_sent += len(events)
+
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_at = time.perf_counter()   # fell behind – don't burst to catch up
+            elif not clients:
+                time.sleep(0.01)
+
+    def stats(self) -> Dict:
+        with self._clients_lock:
+            n_clients = len(self._clients)
+        return {"ws_clients": n_clients, "ticks_sent": self.ticks_sent, "rest_requests": self.rest_requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Polygon stand-in (REST + WS)")
+    parser.add_argument("--symbols", default="TSLA,SPY,QQQ,AAPL,NVDA")
+    parser.add_argument("--file", help="recorded JSON-lines ticks to replay instead of a random walk")
+    parser.add_argument("--rate", type=float, default=100.0, help="trades/second (0 = unthrottled)")
+    parser.add_argument("--batch", type=int, default=1, help="trades per WS message")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--rest-port", type=int, default=8801)
+    parser.add_argument("--ws-port", type=int, default=8802)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="artificial REST latency")
+    parser.add_argument("--rest-limit", type=int, default=0, help="REST req/s before 429 (0 = off)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    source = TickSource(args.symbols.split(","), seed=args.seed, path=args.file)
+    standin = PolygonStandIn(
+        source, host=args.host, rest_port=args.rest_port, ws_port=args.ws_port,
+        rate=args.rate, batch=args.batch,
+        rest_latency=args.latency_ms / 1000, rest_limit=args.rest_limit,
+    ).start()
+
+    print(f"POLYGON_API_KEY=standin")
+    print(f"POLYGON_BASE_URL={standin.base_url}")
+    print(f"POLYGON_WS_URL={standin.ws_url}")
+    try:
+        while True:
+            time.sleep(5)
+            logging.info(f"[PolygonStandIn] {standin.stats()}")
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# Sim/replay.py
+"""
+Memory-mapped tick replay through the real trigger pipeline.
+
+Reads a day file written by Services/tick_recorder.py and feeds each trade
+into callback_manager.trigger, so OrderWaitService entry and stop-loss
+watchers run unchanged. The process-wide wait_service gets a replay price
+feed in place of Polygon and a simulated fill model in place of TWS.
+
+    python -m Sim.replay ticks/20251021.ticks --speed 0 \\
+        --order TSLA,C,251.50,0.50 --order SPY,P,580.00,0.40
+
+--speed 1 replays in real time, N is N× faster, 0 runs as fast as possible.
+"""
+import argparse
+import itertools
+import logging
+import mmap
+import os
+import threading
+import time
+import types
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from Services.tick_recorder import HEADER, RECORD, TICK_MAGIC, load_symbols
+from Sim.tws_standin import _Timeline, con_id_for
+
+
+# ==========================================================
+# TICK FILE
+# ==========================================================
+class TickFile:
+    """Read-only memory map over a .ticks day file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.symbols = load_symbols(path)
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, rec_size, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != TICK_MAGIC or rec_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: not a tick file (magic={magic!r}, record={rec_size})")
+        self.version = version
+        self.count = (len(self._mm) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def records(self) -> Iterator[Tuple[int, int, int, float, int]]:
+        """(symbol id, exchange ts ns, receive ts ns, price, size) in file order."""
+        end = HEADER.size + self.count * RECORD.size
+        return RECORD.iter_unpack(memoryview(self._mm)[HEADER.size:end])
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            self._fh.close()
+
+
+# ==========================================================
+# REPLAY FEED (stands in for PolygonService)
+# ==========================================================
+class ReplayPolygon:
+    """Price source for OrderWaitService: last replayed price per symbol."""
+
+    def __init__(self, dispatcher):
+        self._dispatcher = dispatcher
+        self.last: Dict[str, float] = {}
+
+    def subscribe(self, symbol: str, callback):
+        self._dispatcher.add_callback(symbol.upper(), callback)
+
+    def unsubscribe(self, symbol: str, callback):
+        self._dispatcher.remove_callback(symbol.upper(), callback)
+
+    def get_last_trade(self, symbol: str, priority: int = None):
+        return self.last.get(symbol.upper())
+
+    def get_snapshot(self, symbol: str, priority: int = None):
+        price = self.last.get(symbol.upper())
+        if price is None:
+            return None
+        return {"last": price, "bid": price, "ask": price}
+
+
+# ==========================================================
+# SIMULATED FILL MODEL (stands in for TWSService)
+# ==========================================================
+class SimFillTWS:
+    """
+    Fills every entry at its limit (or a synthetic premium) after fill_latency
+    and every exit immediately. Counts fired triggers.
+    """
+
+    def __init__(self, feed: ReplayPolygon, fill_latency: float = 0.001):
+        self.feed = feed
+        self.fill_latency = fill_latency
+        self._timeline = _Timeline()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._positions: Dict[str, Dict] = {}
+        self.entries: List[Dict] = []
+        self.exits: List[Dict] = []
+
+    def stop(self):
+        self._timeline.stop()
+
+    # --- contract helpers -------------------------------------------------
+    def create_option_contract(self, symbol, last_trade_date, strike, right, exchange="SMART", currency="USD"):
+        return types.SimpleNamespace(symbol=symbol, lastTradeDateOrContractMonth=last_trade_date,
+                                     strike=strike, right=right, secType="OPT", conId=0)
+
+    def resolve_conid(self, contract, timeout: int = 10):
+        return con_id_for(contract.symbol, contract.secType, contract.lastTradeDateOrContractMonth,
+                          contract.strike, contract.right)
+
+    def get_option_premium(self, symbol, expiry, strike, right, timeout: int = 3):
+        spot = self.feed.last.get(symbol.upper())
+        if spot is None:
+            return None
+        intrinsic = max(0.0, spot - strike) if right.upper().startswith("C") else max(0.0, strike - spot)
+        return round(intrinsic + max(0.05, spot * 0.004), 2)
+
+    def is_connected(self):
+        return True
+
+    # --- orders -----------------------------------------------------------
+    def place_custom_order(self, order, account="") -> bool:
+        order._ib_order_id = next(self._ids)
+        price = order.entry_price or self.get_option_premium(order.symbol, order.expiry, order.strike, order.right)
+        with self._lock:
+            self.entries.append({
+                "order_id": order.order_id, "symbol": order.symbol,
+                "underlying": self.feed.last.get(order.symbol.upper()), "time": time.perf_counter(),
+            })
+        self._timeline.at(self.fill_latency, self._fill, order, price, 0)
+        return True
+
+    def _fill(self, order, price, attempt):
+        from Helpers.Order import OrderState
+        # Real fills arrive after the caller marks the order ACTIVE
+        if order.state != OrderState.ACTIVE and attempt < 100:
+            self._timeline.at(0.001, self._fill, order, price, attempt + 1)
+            return
+        with self._lock:
+            self._positions[order.order_id] = {"qty": int(order.qty or 1), "avg_price": float(price or 0.0),
+                                               "symbol": order.symbol}
+        order.mark_finalized(f"SIM fill {order.qty} @ {price}")
+        order._fill_event.set()
+
+    def sell_position_by_order_id(self, order_id, contract=None, qty=None, limit_price=None, ex_order=None, **kw):
+        with self._lock:
+            pos = self._positions.get(order_id)
+            if not pos or pos["qty"] <= 0:
+                return False
+            sold = qty or pos["qty"]
+            pos["qty"] = max(0, pos["qty"] - sold)
+            self.exits.append({
+                "order_id": order_id, "symbol": pos["symbol"], "qty": sold,
+                "underlying": self.feed.last.get(pos["symbol"].upper()), "time": time.perf_counter(),
+            })
+        return True
+
+    def get_position_by_order_id(self, order_id):
+        with self._lock:
+            pos = self._positions.get(order_id)
+            return dict(pos) if pos else None
+
+    def has_position(self, order_id_or_symbol):
+        pos = self.get_position_by_order_id(order_id_or_symbol)
+        return bool(pos and pos["qty"] > 0)
+
+    def get_order_status(self, order_id):
+        return self.get_position_by_order_id(order_id)
+
+    def cancel_custom_order(self, order_id):
+        return True
+
+
+# ==========================================================
+# ENGINE
+# ==========================================================
+class ReplayEngine:
+    """
+    Drives callback_manager from a TickFile.
+    speed: 1.0 = real time, N = N× faster, 0 = as fast as possible.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0, symbols: Optional[List[str]] = None,
+                 fill_latency: float = 0.001):
+        from Services.callback_manager import callback_manager
+        from Services.order_wait_service import wait_service
+
+        self.tick_file = TickFile(path)
+        self.speed = speed
+        self.only = {s.upper() for s in symbols} if symbols else None
+        self.dispatcher = callback_manager
+        self.wait_service = wait_service
+
+        self.feed = ReplayPolygon(callback_manager)
+        self.tws = SimFillTWS(self.feed, fill_latency)
+        self._saved = (wait_service.polygon, wait_service.tws)
+        wait_service.polygon, wait_service.tws = self.feed, self.tws
+
+    def add_order(self, symbol: str, right: str, trigger: float, sl_offset: Optional[float] = None,
+                  expiry: str = "20990101", strike: Optional[float] = None,
+                  entry_price: float = 1.0, position: float = 1000.0):
+        from Helpers.Order import Order
+        if sl_offset is None:
+            sl_offset = round(trigger * 0.01, 2)
+        order = Order(symbol.upper(), expiry, strike or round(trigger), right, 1,
+                      entry_price, None, sl_offset, trigger=trigger)
+        order.set_position_size(position)
+        order._order_ready = True
+        self.wait_service.add_order(order, mode="ws")
+        return order
+
+    def run(self) -> Dict:
+        import Services.order_wait_service as ows
+
+        # Recorded sessions are replayed as regular trading hours
+        saved_session_check = ows.is_market_closed_or_pre_market
+        ows.is_market_closed_or_pre_market = lambda *a, **k: False
+
+        symbols = self.tick_file.symbols
+        last = self.feed.last
+        trigger = self.dispatcher.trigger
+        ticks = 0
+        max_behind = 0.0
+        first_recv = None
+
+        start = time.perf_counter()
+        try:
+            for sid, _exch, recv, price, _size in self.tick_file.records():
+                sym = symbols[sid] if sid < len(symbols) else str(sid)
+                if self.only and sym not in self.only:
+                    continue
+
+                if self.speed:
+                    if first_recv is None:
+                        first_recv = recv
+                    due = start + (recv - first_recv) / 1e9 / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        max_behind = max(max_behind, -delay)
+
+                last[sym] = price
+                trigger(sym, price)
+                ticks += 1
+
+            fed = time.perf_counter() - start
+            self.dispatcher.drain()   # let queued callbacks finish
+            elapsed = time.perf_counter() - start
+        finally:
+            ows.is_market_closed_or_pre_market = saved_session_check
+
+        return {
+            "file": self.tick_file.path,
+            "ticks": ticks,
+            "elapsed_sec": round(elapsed, 4),
+            "feed_sec": round(fed, 4),
+            "ticks_per_sec": round(ticks / fed, 1) if fed else None,
+            "triggers_fired": len(self.tws.entries),
+            "stop_losses_fired": len(self.tws.exits),
+            "max_behind_schedule_ms": round(max_behind * 1000, 3) if self.speed else None,
+        }
+
+    def close(self):
+        self.wait_service.polygon, self.wait_service.tws = self._saved
+        self.tws.stop()
+        self.tick_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded tick file through the trigger pipeline")
+    parser.add_argument("path", help="ticks/<YYYYMMDD>.ticks")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, N = N× faster, 0 = max")
+    parser.add_argument("--symbols", help="comma-separated filter")
+    parser.add_argument("--order", action="append", default=[],
+                        help="SYMBOL,C|P,TRIGGER[,SL_OFFSET] – may be repeated")
+    parser.add_argument("--fill-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    # Importing the services builds the Polygon singleton, which insists on a key
+    os.environ.setdefault("POLYGON_API_KEY", "replay")
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    engine = ReplayEngine(args.path, args.speed, args.symbols.split(",") if args.symbols else None,
+                          fill_latency=args.fill_ms / 1000)
+    try:
+        for spec in args.order:
+            parts = spec.split(",")
+            sl = float(parts[3]) if len(parts) > 3 else None
+            engine.add_order(parts[0], parts[1], float(parts[2]), sl)
+        result = engine.run()
+    finally:
+        engine.close()
+
+    for k, v in result.items():
+        print(f"{k:>22}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+# Sim/soak.py
+"""
+Multi-symbol soak run over a simulated trading session.
+
+Arms N breakout tickets across M symbols through AppModel.place_option_order
+(so GeneralApp, OrderWaitService and the real TWSService are all in the
+path), drives seeded random-walk prices through callback_manager and the
+wait service's price feed, and advances a VirtualClock from 09:30 to 16:00 ET.
+TWSService talks to the local TWS stand-in, so entries and stop-loss exits
+go over the real socket API.
+
+Every --sample-sec of virtual time it records thread count (by name),
+RSS, the callback pool's queue depth and the sizes of the
+OrderWaitService / TWSService / WatcherInfo maps. Series that keep growing
+in the second half of the session are reported as leak suspects; threads
+still alive after every watcher was cancelled are listed at the end.
+
+    python -m Sim.soak --tickets 200 --symbols 20 --churn --out soak.jsonl
+"""
+import argparse
+import collections
+import datetime
+import json
+import logging
+import os
+import random
+import re
+import resource
+import threading
+import time
+from typing import Dict, List, Optional
+
+from Services.clock import VirtualClock
+from Services.nasdaq_info import EASTERN
+from Sim.polygon_standin import TickSource
+from Sim.replay import ReplayPolygon
+from Sim.tws_standin import TWSStandIn
+
+WAIT_MAPS = ("pending_orders", "active_stop_losses", "cancelled_orders", "trigger_status",
+             "_stoplosses", "_ws_callbacks")
+TWS_MAPS = ("_pending_orders", "_positions_by_order_id", "_ib_to_order_id", "_ib_to_custom_id",
+            "_pre_conid_cache", "_contract_details", "option_chains")
+
+RSS_NOISE = 0.02   # relative RSS growth ignored by leak_suspects
+
+_THREAD_ID = re.compile(r"[-_ ]?(?:[0-9a-f]{4,}|\d+)(?=\b|[-_ (])")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def thread_groups() -> Dict[str, int]:
+    """Live threads grouped by name with ids/counters stripped."""
+    groups = collections.Counter(_THREAD_ID.sub("", t.name) for t in threading.enumerate())
+    return dict(groups.most_common())
+
+
+def watcher_threads() -> int:
+    """Trigger / stop-loss poll threads started by OrderWaitService."""
+    return sum(1 for t in threading.enumerate()
+               if "_poll_snapshot_thread" in t.name or t.name.startswith("StopLoss-"))
+
+
+def last_weekday(before: Optional[datetime.date] = None) -> datetime.date:
+    day = (before or datetime.date.today()) - datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+# ==========================================================
+# HARNESS
+# ==========================================================
+class SoakHarness:
+    """
+    tickets       → AppModel tickets armed at the open
+    symbols       → distinct underlyings (tickets are spread round-robin)
+    hours         → virtual session length from 09:30 ET
+    step          → virtual seconds between price steps
+    trades        → synthetic trades per step (across all symbols)
+    poll_interval → OrderWaitService poll interval while soaking
+    churn         → re-arm every model whose ticket left PENDING at each sample
+    speed         → cap on virtual seconds per wall second (0 = as fast as possible);
+                    blocking TWS calls run in real time, so a cap keeps them in proportion
+    """
+
+    def __init__(self, tickets: int = 100, symbols: int = 10, hours: float = 6.5, step: float = 1.0,
+                 trades: int = 20, sample_sec: float = 300.0, poll_interval: float = 1.0,
+                 churn: bool = False, seed: int = 7, date: Optional[datetime.date] = None,
+                 fill_latency: float = 0.005, volatility: float = 0.0008, speed: float = 0.0):
+        from model import general_app
+        from Services.callback_manager import callback_manager
+        from Services.order_wait_service import wait_service
+        from Services.tws_service import create_tws_service
+        from Services.watcher_info import watcher_info
+
+        self.n_tickets = tickets
+        self.hours = hours
+        self.step = step
+        self.trades = trades
+        self.sample_sec = sample_sec
+        self.churn = churn
+        self.speed = speed
+        self._rng = random.Random(seed)
+
+        self.symbols = [f"SK{i:03d}" for i in range(symbols)]
+        self.source = TickSource(self.symbols, seed=seed, volatility=volatility)
+
+        session = date or last_weekday()
+        self.clock = VirtualClock.at(EASTERN.localize(datetime.datetime.combine(session, datetime.time(9, 30))))
+        self.session_end = self.clock.time() + hours * 3600
+
+        self.dispatcher = callback_manager
+        self.app = general_app
+        self.wait_service = wait_service
+        self.watchers = watcher_info
+        self.feed = ReplayPolygon(callback_manager)
+        for sym, st in self.source.state.items():
+            self.feed.last[sym] = st.last
+
+        self.standin = TWSStandIn(port=0, fill_latency=fill_latency, price_source=self.source).start()
+        self.tws = create_tws_service()
+        if not self.tws.connect_and_start(host=self.standin.host, port=self.standin.port, timeout=5):
+            self.standin.stop()
+            raise RuntimeError("TWSService could not connect to the stand-in")
+
+        self._saved = {
+            "wait": (wait_service.polygon, wait_service.tws, wait_service.clock, wait_service.poll_interval),
+            "app": (general_app._tws, general_app._polygon, general_app._order_wait),
+        }
+        wait_service.polygon, wait_service.tws, wait_service.clock = self.feed, self.tws, self.clock
+        wait_service.poll_interval = poll_interval
+        general_app._tws, general_app._polygon, general_app._order_wait = self.tws, self.feed, wait_service
+
+        self._chains: Dict[str, Dict] = {}
+        self.models: List = []
+        self.samples: List[Dict] = []
+        self.armed = 0
+        self.arm_failures = 0
+
+    # ------------------------------------------------------------------
+    # TICKETS
+    # ------------------------------------------------------------------
+    def _chain(self, symbol: str) -> Dict:
+        chain = self._chains.get(symbol)
+        if chain is None:
+            chain = self.tws.get_maturities(symbol) or {"expirations": [], "strikes": []}
+            self._chains[symbol] = chain
+        return chain
+
+    def _arm(self, model) -> bool:
+        """Place one breakout ticket on `model` a random distance from the market."""
+        sym = model.symbol
+        price = self.feed.last[sym]
+        right = self._rng.choice(("C", "P"))
+        offset = price * self._rng.uniform(0.0005, 0.01)
+        trigger = round(price + offset if right == "C" else price - offset, 2)
+
+        chain = self._chain(sym)
+        if not chain["expirations"] or not chain["strikes"]:
+            return False
+        strike = min(chain["strikes"], key=lambda s: abs(s - trigger))
+        try:
+            model.set_option_contract(chain["expirations"][0], strike, right)
+            model.set_stop_loss(round(price * self._rng.uniform(0.002, 0.01), 2))
+            model._take_profit = None
+            model.place_option_order(action="BUY", position=1000, quantity=1, trigger_price=trigger)
+            self.armed += 1
+            return True
+        except Exception as e:
+            self.arm_failures += 1
+            logging.warning(f"[Soak] Arming {sym} failed: {e}")
+            return False
+
+    def arm_all(self):
+        from model import AppModel
+
+        for i in range(self.n_tickets):
+            model = AppModel(self.symbols[i % len(self.symbols)])
+            self.app.add_model(model)
+            self.models.append(model)
+            self._arm(model)
+
+    def rearm_finished(self) -> int:
+        from Helpers.Order import OrderState
+
+        count = 0
+        for model in self.models:
+            order = model.get_order()
+            if order is None or order.state != OrderState.PENDING:
+                count += self._arm(model)
+        return count
+
+    # ------------------------------------------------------------------
+    # METRICS
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _sizes(obj, names) -> Dict[str, int]:
+        return {n: len(getattr(obj, n)) for n in names if hasattr(obj, n)}
+
+    def sample(self, phase: str = "session") -> Dict:
+        with self.wait_service.lock:
+            wait_sizes = self._sizes(self.wait_service, WAIT_MAPS)
+        row = {
+            "phase": phase,
+            "virtual_time": datetime.datetime.fromtimestamp(self.clock.time(), EASTERN).strftime("%H:%M:%S"),
+            "wall_sec": round(time.perf_counter() - self._wall_start, 3),
+            "threads": threading.active_count(),
+            "rss_mb": round(rss_bytes() / 2**20, 2),
+            "pool_queue": self.dispatcher.queued(),
+            "pool_unfinished": self.dispatcher.pending(),
+            "clock_sleepers": self.clock.sleepers(),
+            # watcher threads stuck outside clock.sleep (socket waits, locks)
+            "blocked_watchers": max(0, watcher_threads() - self.clock.sleepers()),
+            "watchers": len(self.watchers._watchers),
+            "subscribed_symbols": len(self.dispatcher.list_symbols()),
+            "armed": self.armed,
+            "fills": self.standin.filled,
+            **{f"wait.{k}": v for k, v in wait_sizes.items()},
+            **{f"tws.{k}": v for k, v in self._sizes(self.tws, TWS_MAPS).items()},
+            "thread_groups": thread_groups(),
+        }
+        self.samples.append(row)
+        return row
+
+    # ------------------------------------------------------------------
+    # RUN
+    # ------------------------------------------------------------------
+    def run(self, progress=None) -> Dict:
+        import Services.order_wait_service as ows
+
+        self._wall_start = time.perf_counter()
+        baseline_threads = threading.active_count()
+        self.sample("baseline")
+        self.arm_all()
+        self.sample("armed")
+
+        next_sample = self.clock.time() + self.sample_sec
+        last, trigger = self.feed.last, self.dispatcher.trigger
+        ticks = 0
+        virtual_start, wall_start = self.clock.time(), time.perf_counter()
+        while self.clock.time() < self.session_end:
+            for t in self.source.next_batch(self.trades):
+                last[t["sym"]] = t["p"]
+                trigger(t["sym"], t["p"])
+            ticks += self.trades
+            self.clock.advance(self.step)
+
+            if self.speed:
+                ahead = (self.clock.time() - virtual_start) / self.speed - (time.perf_counter() - wall_start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+            if self.clock.time() >= next_sample:
+                next_sample += self.sample_sec
+                if self.churn:
+                    self.rearm_finished()
+                row = self.sample()
+                if progress:
+                    progress(row)
+
+        # Wind down: cancel every watcher we can reach, let the threads see it
+        for model in self.models:
+            order = model.get_order()
+            if order is not None:
+                self.wait_service.cancel_order(order.order_id)
+        for oid in list(self.wait_service.active_stop_losses):
+            self.wait_service.cancel_order(oid)
+        self._drain()
+        final = self.sample("wound_down")
+
+        return {
+            "virtual_hours": self.hours,
+            "wall_sec": round(time.perf_counter() - self._wall_start, 2),
+            "ticks": ticks,
+            "tickets_armed": self.armed,
+            "arm_failures": self.arm_failures,
+            "entries_filled": self.standin.filled,
+            "baseline_threads": baseline_threads,
+            "peak_threads": max(s["threads"] for s in self.samples),
+            "threads_left": final["threads"] - baseline_threads,
+            "leftover_thread_groups": {
+                k: v - self.samples[0]["thread_groups"].get(k, 0)
+                for k, v in final["thread_groups"].items()
+                if v > self.samples[0]["thread_groups"].get(k, 0)
+            },
+            "peak_pool_queue": max(s["pool_queue"] for s in self.samples),
+            "rss_growth_mb": round(final["rss_mb"] - self.samples[1]["rss_mb"], 2),
+            "leak_suspects": self.leak_suspects(),
+        }
+
+    def _drain(self, real_timeout: float = 15.0):
+        """
+        Keep virtual time moving until the thread count settles. Threads
+        blocked outside clock.sleep (socket waits, locks) get up to
+        real_timeout seconds of wall time.
+        """
+        deadline = time.perf_counter() + real_timeout
+        while time.perf_counter() < deadline:
+            self.clock.advance(max(1.0, self.wait_service.poll_interval))
+            time.sleep(0.05)
+            if (watcher_threads() <= self.clock.sleepers()
+                    and self.dispatcher.pending() == 0):
+                break
+
+    def leak_suspects(self) -> Dict[str, Dict]:
+        """Numeric series that never shrank over the second half and ended higher than they started it."""
+        session = [s for s in self.samples if s["phase"] == "session"]
+        if len(session) < 4:
+            return {}
+        half = session[len(session) // 2:]
+        out = {}
+        for key, first in half[0].items():
+            if key in ("wall_sec", "armed", "fills") or not isinstance(first, (int, float)):
+                continue
+            series = [s[key] for s in half]
+            if key == "rss_mb" and series[-1] - series[0] < series[0] * RSS_NOISE:
+                continue
+            if series[-1] > series[0] and all(b >= a for a, b in zip(series, series[1:])):
+                out[key] = {"from": series[0], "to": series[-1]}
+        return out
+
+    def close(self):
+        ws, app = self.wait_service, self.app
+        ws.polygon, ws.tws, ws.clock, ws.poll_interval = self._saved["wait"]
+        app._tws, app._polygon, app._order_wait = self._saved["app"]
+        try:
+            self.tws.disconnect_gracefully()
+        except Exception as e:
+            logging.debug(f"[Soak] TWS disconnect ignored: {e}")
+        self.standin.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak the trigger engine over a simulated session")
+    parser.add_argument("--tickets", type=int, default=100)
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--hours", type=float, default=6.5)
+    parser.add_argument("--step", type=float, default=1.0, help="virtual seconds per price step")
+    parser.add_argument("--trades", type=int, default=20, help="synthetic trades per step")
+    parser.add_argument("--sample-sec", type=float, default=300.0, help="virtual seconds between samples")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--churn", action="store_true", help="re-arm finished tickets at every sample")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="max virtual seconds per wall second (0 = unbounded)")
+    parser.add_argument("--date", help="session date YYYYMMDD (default: last weekday)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write samples as JSON lines")
+    args = parser.parse_args()
+
+    # Importing the services builds the Polygon singleton, which insists on a key
+    os.environ.setdefault("POLYGON_API_KEY", "soak")
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    date = datetime.datetime.strptime(args.date, "%Y%m%d").date() if args.date else None
+    harness = SoakHarness(args.tickets, args.symbols, args.hours, args.step, args.trades, args.sample_sec,
+                          args.poll_interval, args.churn, args.seed, date, speed=args.speed)
+
+    def progress(row):
+        print(f"{row['virtual_time']}  threads={row['threads']:<5} rss={row['rss_mb']:>8.1f}MB "
+              f"queue={row['pool_queue']:<5} pending={row.get('wait.pending_orders', 0):<5} "
+              f"sl={row.get('wait._stoplosses', 0):<5} watchers={row['watchers']:<5} "
+              f"blocked={row['blocked_watchers']:<4} fills={row['fills']}",
+              flush=True)
+
+    try:
+        result = harness.run(progress)
+    finally:
+        # Same exit path as the app: stop the runtime so leftover watcher loops end
+        from Services.runtime_manager import runtime_man
+        runtime_man.stop()
+        harness.close()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for row in harness.samples:
+                f.write(json.dumps(row) + "\n")
+
+    print()
+    for k, v in result.items():
+        print(f"{k:>24}: {v}")
+
+
+if __name__ == "__main__":
+    main()
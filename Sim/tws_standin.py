@@ -0,0 +1,568 @@
+# Sim/tws_standin.py
+"""
+Local TWS / IB Gateway stand-in for deterministic order-path benchmarks.
+
+Speaks the IB socket API (length-prefixed, null-separated fields) at a fixed
+server version, enough for the flows TWSService uses:
+    startApi / reqIds            → nextValidId, managedAccounts
+    reqContractDetails           → contractDetails + contractDetailsEnd
+    reqSecDefOptParams           → securityDefinitionOptionParameter(+End)
+    reqMktData (snapshot/stream) → tickPrice (+ tickSnapshotEnd)
+    placeOrder                   → orderStatus Submitted, then execDetails +
+                                   orderStatus Filled after a configurable latency
+    cancelOrder                  → orderStatus Cancelled
+
+Point TWSService at it with TWS_HOST / TWS_PORT, or run the built-in bench:
+    python -m Sim.tws_standin --bench 200 --fill-ms 5
+"""
+import argparse
+import datetime
+import heapq
+import itertools
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+SERVER_VERSION = 111     # MIN_SERVER_VER_CASH_QTY – older ibapi builds refuse placeOrder below it
+ACCOUNT = "DU0000001"
+
+# Incoming message ids
+IN_REQ_MKT_DATA = 1
+IN_CANCEL_MKT_DATA = 2
+IN_PLACE_ORDER = 3
+IN_CANCEL_ORDER = 4
+IN_REQ_IDS = 8
+IN_REQ_CONTRACT_DATA = 9
+IN_START_API = 71
+IN_REQ_SEC_DEF_OPT_PARAMS = 78
+
+# Outgoing message ids
+OUT_TICK_PRICE = 1
+OUT_ORDER_STATUS = 3
+OUT_ERR_MSG = 4
+OUT_NEXT_VALID_ID = 9
+OUT_CONTRACT_DATA = 10
+OUT_EXECUTION_DATA = 11
+OUT_MANAGED_ACCTS = 15
+OUT_CONTRACT_DATA_END = 52
+OUT_TICK_SNAPSHOT_END = 57
+OUT_SEC_DEF_OPT_PARAMETER = 75
+OUT_SEC_DEF_OPT_PARAMETER_END = 76
+
+TICK_BID, TICK_ASK, TICK_LAST = 1, 2, 4
+
+
+def _fmt(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _encode(fields) -> bytes:
+    payload = b"".join(_fmt(f).encode() + b"\0" for f in fields)
+    return struct.pack(">I", len(payload)) + payload
+
+
+def con_id_for(symbol: str, sec_type: str, expiry: str = "", strike: float = 0.0, right: str = "") -> int:
+    """Deterministic conId so repeated runs resolve identically."""
+    key = f"{symbol.upper()}|{sec_type}|{expiry}|{float(strike or 0):.3f}|{(right or '')[:1].upper()}"
+    return zlib.crc32(key.encode()) & 0x7FFFFFFF
+
+
+# ==========================================================
+# SCHEDULER
+# ==========================================================
+class _Timeline:
+    """Single thread running delayed callbacks in (due, seq) order."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="TWSStandInTimeline", daemon=True)
+        self._thread.start()
+
+    def at(self, delay: float, fn: Callable, *args):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + max(0.0, delay), next(self._seq), fn, args))
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _, _, fn, args = heapq.heappop(self._heap)
+            try:
+                fn(*args)
+            except Exception as e:
+                logging.error(f"[TWSStandIn] Timeline task failed: {e}")
+
+
+# ==========================================================
+# CLIENT SESSION
+# ==========================================================
+class _Session:
+    def __init__(self, standin: "TWSStandIn", sock: socket.socket, addr):
+        self.standin = standin
+        self.sock = sock
+        self.addr = addr
+        self.client_id = None
+        self.alive = True
+        self.send_lock = threading.Lock()
+        self.streams: Dict[int, Dict] = {}   # reqId → contract info for streaming market data
+
+    def send(self, *fields):
+        data = _encode(fields)
+        try:
+            with self.send_lock:
+                self.sock.sendall(data)
+        except OSError:
+            self.alive = False
+
+    def _recv_exact(self, n: int) -> bytes:
+        buf = b""
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("client closed")
+            buf += chunk
+        return buf
+
+    def read_message(self) -> List[str]:
+        (size,) = struct.unpack(">I", self._recv_exact(4))
+        payload = self._recv_exact(size) if size else b""
+        fields = payload.split(b"\0")
+        if fields and fields[-1] == b"":
+            fields.pop()
+        return [f.decode(errors="replace") for f in fields]
+
+    def handshake(self) -> bool:
+        prefix = self._recv_exact(4)
+        if prefix != b"API\0":
+            return False
+        self.read_message()   # "v100..187" (+ connect options) – we answer with our fixed version
+        now = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S EST")
+        self.send(SERVER_VERSION, now)
+        return True
+
+
+# ==========================================================
+# STAND-IN
+# ==========================================================
+class TWSStandIn:
+    """
+    fill_latency  → seconds from placeOrder to the fill (execDetails + Filled)
+    ack_latency   → seconds from placeOrder to orderStatus Submitted
+    jitter        → uniform extra delay [0, jitter) added to the fill
+    price_source  → optional object with get(symbol).last (e.g. polygon stand-in TickSource)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 7497, fill_latency: float = 0.005,
+                 ack_latency: float = 0.0005, jitter: float = 0.0, seed: int = 7,
+                 price_source=None, stream_interval: float = 0.5):
+        self.host = host
+        self.port = port
+        self.fill_latency = fill_latency
+        self.ack_latency = ack_latency
+        self.jitter = jitter
+        self.price_source = price_source
+        self.stream_interval = stream_interval
+        self._rng = random.Random(seed)
+
+        self._sock = None
+        self._running = False
+        self._timeline = None
+        self._sessions: List[_Session] = []
+        self._lock = threading.Lock()
+
+        self._next_order_id = 1
+        self._exec_seq = itertools.count(1)
+        self._orders: Dict[int, Dict] = {}
+        self._underlying: Dict[str, float] = {}
+
+        # order-path metrics
+        self.placed = 0
+        self.filled = 0
+        self.cancelled = 0
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------
+    def start(self):
+        self._running = True
+        self._timeline = _Timeline()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(8)
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name="TWSStandInAccept", daemon=True).start()
+        logging.info(f"[TWSStandIn] Listening on {self.host}:{self.port} (server version {SERVER_VERSION})")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._timeline:
+            self._timeline.stop()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for s in sessions:
+            try:
+                s.sock.close()
+            except OSError:
+                pass
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, addr = self._sock.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = _Session(self, sock, addr)
+            with self._lock:
+                self._sessions.append(session)
+            threading.Thread(target=self._serve, args=(session,), daemon=True).start()
+
+    def _serve(self, session: _Session):
+        try:
+            if not session.handshake():
+                return
+            while self._running and session.alive:
+                fields = session.read_message()
+                if fields:
+                    self._dispatch(session, fields)
+        except (OSError, ConnectionError):
+            pass
+        except Exception as e:
+            logging.error(f"[TWSStandIn] Session error: {e}")
+        finally:
+            session.alive = False
+            with self._lock:
+                if session in self._sessions:
+                    self._sessions.remove(session)
+            try:
+                session.sock.close()
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # PRICING
+    # ------------------------------------------------------------------
+    def underlying_price(self, symbol: str) -> float:
+        sym = symbol.upper()
+        if self.price_source is not None:
+            st = self.price_source.get(sym)
+            if st is not None:
+                return st.last
+        if sym not in self._underlying:
+            self._underlying[sym] = round(50 + self._rng.random() * 400, 2)
+        return self._underlying[sym]
+
+    def option_quote(self, symbol: str, strike: float, right: str):
+        spot = self.underlying_price(symbol)
+        intrinsic = max(0.0, spot - strike) if right.upper().startswith("C") else max(0.0, strike - spot)
+        mid = round(intrinsic + max(0.05, spot * 0.004), 2)
+        return round(mid - 0.02, 2), round(mid + 0.02, 2), mid
+
+    # ------------------------------------------------------------------
+    # DISPATCH
+    # ------------------------------------------------------------------
+    def _dispatch(self, s: _Session, f: List[str]):
+        msg_id = int(f[0])
+        if msg_id == IN_START_API:
+            s.client_id = int(f[2])
+            s.send(OUT_NEXT_VALID_ID, 1, self._next_order_id)
+            s.send(OUT_MANAGED_ACCTS, 1, ACCOUNT)
+        elif msg_id == IN_REQ_IDS:
+            s.send(OUT_NEXT_VALID_ID, 1, self._next_order_id)
+        elif msg_id == IN_REQ_CONTRACT_DATA:
+            self._contract_details(s, f)
+        elif msg_id == IN_REQ_SEC_DEF_OPT_PARAMS:
+            self._sec_def_opt_params(s, f)
+        elif msg_id == IN_REQ_MKT_DATA:
+            self._mkt_data(s, f)
+        elif msg_id == IN_CANCEL_MKT_DATA:
+            s.streams.pop(int(f[2]), None)
+        elif msg_id == IN_PLACE_ORDER:
+            self._place_order(s, f)
+        elif msg_id == IN_CANCEL_ORDER:
+            self._cancel_order(s, int(f[2]))
+        else:
+            logging.debug(f"[TWSStandIn] Ignoring message id {msg_id}")
+
+    # reqContractDetails: 9, ver, reqId, conId, symbol, secType, ltd, strike, right, mult,
+    #                     exchange, primaryExchange, currency, localSymbol, tradingClass, ...
+    def _contract_details(self, s: _Session, f: List[str]):
+        req_id = int(f[2])
+        symbol, sec_type, ltd, right = f[4], f[5], f[6], f[8]
+        strike = float(f[7] or 0)
+        exchange = f[10] or "SMART"
+        currency = f[12] or "USD"
+        multiplier = f[9] or ("100" if sec_type == "OPT" else "")
+        con_id = con_id_for(symbol, sec_type, ltd, strike, right)
+        local = symbol if sec_type != "OPT" else f"{symbol} {ltd[2:]}{right[:1]}{int(strike * 1000):08d}"
+
+        s.send(
+            OUT_CONTRACT_DATA, 8, req_id,
+            symbol, sec_type, ltd, strike, right[:1] if right else "", exchange, currency,
+            local, symbol, symbol,               # localSymbol, marketName, tradingClass
+            con_id, 0.01, 1, multiplier,         # conId, minTick, mdSizeMultiplier, multiplier
+            "LMT,MKT,STP", "SMART,CBOE", 1,      # orderTypes, validExchanges, priceMagnifier
+            0, symbol, "NASDAQ",                 # underConId, longName, primaryExchange
+            "", "", "", "", "US/Eastern", "", "",  # contractMonth..liquidHours
+            "", 0,                               # evRule, evMultiplier
+            0,                                   # secIdList count
+        )
+        s.send(OUT_CONTRACT_DATA_END, 1, req_id)
+
+    # reqSecDefOptParams: 78, reqId, symbol, futFopExchange, secType, conId
+    def _sec_def_opt_params(self, s: _Session, f: List[str]):
+        req_id, symbol, under_con_id = int(f[1]), f[2], int(f[5] or 0)
+        spot = self.underlying_price(symbol)
+        step = 1.0 if spot < 200 else 5.0
+        base = round(spot / step) * step
+        strikes = [base + k * step for k in range(-20, 21) if base + k * step > 0]
+
+        today = datetime.date.today()
+        first_friday = today + datetime.timedelta(days=(4 - today.weekday()) % 7)
+        expirations = [(first_friday + datetime.timedelta(weeks=w)).strftime("%Y%m%d") for w in range(8)]
+
+        for exchange in ("SMART", "CBOE"):
+            s.send(
+                OUT_SEC_DEF_OPT_PARAMETER, req_id, exchange, under_con_id, symbol, "100",
+                len(expirations), *expirations, len(strikes), *strikes,
+            )
+        s.send(OUT_SEC_DEF_OPT_PARAMETER_END, req_id)
+
+    # reqMktData: 1, ver, reqId, conId, symbol, secType, ltd, strike, right, mult, exchange,
+    #             primaryExchange, currency, localSymbol, tradingClass, deltaNeutral, ticks, snapshot
+    def _mkt_data(self, s: _Session, f: List[str]):
+        req_id = int(f[2])
+        info = {"symbol": f[4], "sec_type": f[5], "strike": float(f[7] or 0), "right": f[8]}
+        snapshot = f[17] == "1" if len(f) > 17 else False
+
+        self._send_quote(s, req_id, info)
+        if snapshot:
+            s.send(OUT_TICK_SNAPSHOT_END, 1, req_id)
+        else:
+            s.streams[req_id] = info
+            self._timeline.at(self.stream_interval, self._stream_tick, s, req_id)
+
+    def _send_quote(self, s: _Session, req_id: int, info: Dict):
+        if info["sec_type"] == "OPT":
+            bid, ask, last = self.option_quote(info["symbol"], info["strike"], info["right"])
+        else:
+            last = self.underlying_price(info["symbol"])
+            bid, ask = round(last - 0.01, 2), round(last + 0.01, 2)
+        for tick_type, price in ((TICK_BID, bid), (TICK_ASK, ask), (TICK_LAST, last)):
+            s.send(OUT_TICK_PRICE, 6, req_id, tick_type, price, 10, 0)
+
+    def _stream_tick(self, s: _Session, req_id: int):
+        info = s.streams.get(req_id)
+        if not info or not s.alive or not self._running:
+            return
+        self._send_quote(s, req_id, info)
+        self._timeline.at(self.stream_interval, self._stream_tick, s, req_id)
+
+    # placeOrder: 3, ver, orderId, conId, symbol, secType, ltd, strike, right, mult, exchange,
+    #             primaryExchange, currency, localSymbol, tradingClass, secIdType, secId,
+    #             action, totalQty, orderType, lmtPrice, auxPrice, ...
+    def _place_order(self, s: _Session, f: List[str]):
+        order_id = int(f[2])
+        order = {
+            "session": s,
+            "order_id": order_id,
+            "con_id": int(f[3] or 0),
+            "symbol": f[4], "sec_type": f[5], "ltd": f[6],
+            "strike": float(f[7] or 0), "right": f[8], "multiplier": f[9] or "100",
+            "exchange": f[10] or "SMART", "currency": f[12] or "USD",
+            "local_symbol": f[13], "trading_class": f[14] or f[4],
+            "action": f[17].upper(),
+            "qty": float(f[18] or 0),
+            "type": f[19].upper(),
+            "lmt": float(f[20]) if f[20] not in ("", None) and float(f[20]) < 1e300 else None,
+            "perm_id": 100000 + order_id,
+            "placed_at": time.monotonic(),
+            "state": "Submitted",
+        }
+        with self._lock:
+            self._orders[order_id] = order
+            self._next_order_id = max(self._next_order_id, order_id + 1)
+            self.placed += 1
+
+        self._timeline.at(self.ack_latency, self._ack, order)
+        delay = self.fill_latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+        self._timeline.at(delay, self._fill, order)
+
+    def _status(self, order: Dict, status: str, filled: float, avg: float, last: float):
+        order["session"].send(
+            OUT_ORDER_STATUS, 8, order["order_id"], status, filled, order["qty"] - filled,
+            avg, order["perm_id"], 0, last, order["session"].client_id or 0, "",
+        )
+
+    def _ack(self, order: Dict):
+        if order["state"] == "Submitted":
+            self._status(order, "Submitted", 0.0, 0.0, 0.0)
+
+    def _fill(self, order: Dict):
+        if order["state"] != "Submitted":
+            return
+        if order["lmt"] is not None and order["type"] == "LMT":
+            price = order["lmt"]
+        elif order["sec_type"] == "OPT":
+            price = self.option_quote(order["symbol"], order["strike"], order["right"])[2]
+        else:
+            price = self.underlying_price(order["symbol"])
+
+        order["state"] = "Filled"
+        s = order["session"]
+        exec_id = f"0000e{next(self._exec_seq):08d}.01.01"
+        side = "BOT" if order["action"] == "BUY" else "SLD"
+        now = datetime.datetime.now().strftime("%Y%m%d  %H:%M:%S")
+
+        s.send(
+            OUT_EXECUTION_DATA, 10, -1, order["order_id"],
+            order["con_id"], order["symbol"], order["sec_type"], order["ltd"], order["strike"],
+            order["right"], order["multiplier"], order["exchange"], order["currency"],
+            order["local_symbol"], order["trading_class"],
+            exec_id, now, ACCOUNT, order["exchange"], side, order["qty"], price,
+            order["perm_id"], s.client_id or 0, 0, order["qty"], price,
+            "", "", 0, "",                       # orderRef, evRule, evMultiplier, modelCode
+        )
+        self._status(order, "Filled", order["qty"], price, price)
+
+        with self._lock:
+            self.filled += 1
+            order["fill_latency"] = time.monotonic() - order["placed_at"]
+
+    def _cancel_order(self, s: _Session, order_id: int):
+        with self._lock:
+            order = self._orders.get(order_id)
+        if not order:
+            s.send(OUT_ERR_MSG, 2, order_id, 135, "Can't find order with id")
+            return
+        if order["state"] != "Submitted":
+            return
+        order["state"] = "Cancelled"
+        with self._lock:
+            self.cancelled += 1
+        self._status(order, "Cancelled", 0.0, 0.0, 0.0)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"placed": self.placed, "filled": self.filled, "cancelled": self.cancelled,
+                    "sessions": len(self._sessions)}
+
+
+# ==========================================================
+# ORDER-PATH BENCH
+# ==========================================================
+def _pct(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def bench_order_path(n: int = 100, fill_latency: float = 0.005, jitter: float = 0.0,
+                     symbol: str = "SPY") -> Dict:
+    """
+    Drive the real TWSService against the stand-in: resolve, place `n` custom
+    orders and wait for each fill. Returns throughput and latency percentiles (ms).
+    """
+    standin = TWSStandIn(port=0, fill_latency=fill_latency, jitter=jitter).start()
+    tws = None
+    try:
+        from Helpers.Order import Order
+        from Services.tws_service import create_tws_service
+
+        tws = create_tws_service()
+        if not tws.connect_and_start(host=standin.host, port=standin.port, timeout=5):
+            raise RuntimeError("TWSService could not connect to the stand-in")
+
+        chain = tws.get_maturities(symbol)
+        expiry = chain["expirations"][0]
+        strike = chain["strikes"][len(chain["strikes"]) // 2]
+
+        place_ms, fill_ms = [], []
+        t0 = time.perf_counter()
+        for _ in range(n):
+            order = Order(symbol, expiry, strike, "C", 1, 1.0, None, None)
+            order.set_position_size(100.0)
+            start = time.perf_counter()
+            if not tws.place_custom_order(order):
+                continue
+            placed = time.perf_counter()
+            order._fill_event.wait(5)
+            done = time.perf_counter()
+            place_ms.append((placed - start) * 1000)
+            fill_ms.append((done - start) * 1000)
+        elapsed = time.perf_counter() - t0
+
+        return {
+            "orders": len(fill_ms),
+            "orders_per_sec": len(fill_ms) / elapsed if elapsed else None,
+            "place_p50_ms": _pct(place_ms, 0.50), "place_p99_ms": _pct(place_ms, 0.99),
+            "fill_p50_ms": _pct(fill_ms, 0.50), "fill_p95_ms": _pct(fill_ms, 0.95),
+            "fill_p99_ms": _pct(fill_ms, 0.99), "fill_max_ms": max(fill_ms) if fill_ms else None,
+            "standin": standin.stats(),
+        }
+    finally:
+        if tws is not None:
+            tws.disconnect_gracefully()
+        standin.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local TWS / IB Gateway stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7497)
+    parser.add_argument("--fill-ms", type=float, default=5.0, help="placeOrder → fill latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform extra fill latency")
+    parser.add_argument("--bench", type=int, default=0, help="run N orders through TWSService and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING if args.bench else logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.bench:
+        result = bench_order_path(args.bench, args.fill_ms / 1000, args.jitter_ms / 1000)
+        for k, v in result.items():
+            print(f"{k:>16}: {v}")
+        return
+
+    standin = TWSStandIn(args.host, args.port, args.fill_ms / 1000, jitter=args.jitter_ms / 1000).start()
+    print(f"TWS_HOST={standin.host}")
+    print(f"TWS_PORT={standin.port}")
+    try:
+        while True:
+            time.sleep(5)
+            logging.info(f"[TWSStandIn] {standin.stats()}")
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# codec_test.py - Helpers.codec round trips, including values the text formats can't carry
+#
+#   python -m pytest codec_test.py     (or: python codec_test.py)
+
+import os
+import struct
+
+os.environ.setdefault("POLYGON_API_KEY", "test")
+
+import pytest
+
+from Helpers import codec
+from Helpers.Order import Order, OrderState
+
+
+def _order(i: int, symbol: str = "TSLA", right: str = "C") -> Order:
+    o = Order(symbol, "20251219", 240.0 + i % 5 * 5, right, 3, 4.25, 6.5, 1.25,
+              trigger=None if i % 2 else 250.0 + i)
+    o.set_position_size(1500.0)
+    o.result = None if i % 3 else f"IB Order ID: {i}"
+    return o
+
+
+def _fields(o: Order):
+    return (o.to_dict(), o.type, o.previous_id, o._position_size)
+
+
+def _awkward():
+    orders = [_order(i) for i in range(3)]
+    orders[0].symbol, orders[1].symbol, orders[2].result = "BRK_B", "A:B", "Filled: 1_2|3"
+    orders[2].previous_id = orders[1].order_id
+    return orders
+
+
+def test_orders_round_trip():
+    orders = [_order(i, f"SYM{i % 7}", "CP"[i % 2]) for i in range(50)] + _awkward()
+    back = codec.loads_orders(codec.dumps_orders(orders))
+    assert [_fields(o) for o in back] == [_fields(o) for o in orders]
+
+
+def test_order_bytes_round_trip():
+    for o in _awkward():
+        assert _fields(Order.from_bytes(o.to_bytes())) == _fields(o)
+
+
+def test_every_state_round_trips():
+    orders = [_order(i) for i in range(len(OrderState))]
+    for o, state in zip(orders, OrderState):
+        o.state = state
+    assert [o.state for o in codec.loads_orders(codec.dumps_orders(orders))] == list(OrderState)
+
+
+def test_models_round_trip():
+    from model import AppModel
+
+    models = []
+    for i, o in enumerate(_awkward()):
+        m = AppModel(o.symbol)
+        m._expiry, m._strike, m._right, m._stop_loss, m._take_profit = o.expiry, o.strike, o.right, 1.25, 6.5
+        m._order = o if i else None
+        models.append(m)
+    back = codec.loads_models(codec.dumps_models(models), AppModel)
+    assert [(m._id, m._symbol, m._strike, m._order and _fields(m._order)) for m in back] == \
+           [(m._id, m._symbol, m._strike, m._order and _fields(m._order)) for m in models]
+
+
+def test_unknown_state_code_rejected():
+    data = bytearray(codec.dumps_orders([_order(0)]))
+    # the state byte sits right after the last f64 (pos_size) of the single order record
+    record = len(data) - codec._ORDER_V1.size
+    state_at = record + struct.calcsize("<IIIdIidddIIdd")
+    assert data[state_at] == codec._STATE_CODES[OrderState.PENDING]
+    data[state_at] = 200
+    with pytest.raises(ValueError):
+        codec.loads_orders(bytes(data))
+
+
+def test_newer_schema_rejected():
+    data = bytearray(codec.dumps_orders([_order(0)]))
+    struct.pack_into("<H", data, len(codec.MAGIC), codec.SCHEMA_VERSION + 1)
+    with pytest.raises(ValueError):
+        codec.loads_orders(bytes(data))
+
+
+if __name__ == "__main__":
+    test_orders_round_trip()
+    test_order_bytes_round_trip()
+    test_every_state_round_trips()
+    test_models_round_trip()
+    test_unknown_state_code_rejected()
+    test_newer_schema_rejected()
+    print("✅ codec round trips OK")
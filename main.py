@@ -5,11 +5,14 @@ import time
 from datetime import datetime
 from pathlib import Path
 from Helpers.debugger import DebugFrame, TkinterHandler
+from Helpers.log_pipeline import log_pipeline
 from Services.order_manager import order_manager
-from model import general_app
+from model import general_app, AppModel
+from Helpers import codec
 # --- MODIFIED IMPORT ---
 from view import Banner, OrderFrame, ScrollableFrame
 from Services.watcher_info import watcher_info
+from Services.order_journal import order_journal
 import os, sys
 import threading
 from datetime import datetime, timedelta
@@ -32,17 +35,14 @@ def setup_logging():
     log_dir = Path("logs"); log_dir.mkdir(exist_ok=True)
     log_file = log_dir / (datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".log")
 
-    root = logging.getLogger()
-    if root.hasHandlers():
-        root.handlers.clear()
-
     handler_file = logging.FileHandler(log_file, encoding='utf-8')
     handler_console = logging.StreamHandler()
     fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
     for h in (handler_file, handler_console):
         h.setFormatter(fmt)
-        root.addHandler(h)
-    root.setLevel(logging.INFO)
+
+    # File/console I/O runs on the pipeline's writer thread, never on the caller
+    log_pipeline.start([handler_file, handler_console], level=logging.INFO)
     logging.info("Logging initialised → %s", log_file)
 
 
@@ -101,6 +101,15 @@ class ArcTriggerApp(tk.Tk):
         
 
 
+        # Order journal: position maps + armed watchers up to the last group commit
+        try:
+            from Services.order_wait_service import wait_service
+            from Services.tws_service import create_tws_service
+            order_journal.start()
+            order_journal.restore(create_tws_service(), wait_service)
+        except Exception as e:
+            logging.error(f"[ArcTriggerApp] Order journal restore failed: {e}")
+
 # Attempt auto-restore on startup
         restored = self.load_session(auto=True)
         if restored:
@@ -114,11 +123,14 @@ class ArcTriggerApp(tk.Tk):
         open_positions_window(self)
 
 
-    def save_session(self, filename: str = "arctrigger.dat", background: bool = False):
+    def save_session(self, filename: str = "arctrigger.dat", background: bool = False, binary: bool = False):
         """
         Robust save: writes to temp file then atomically replaces.
-        Includes header marker + frame count.
+        Includes header marker + frame count. binary=True writes the
+        Helpers.codec session format; load_session() detects either.
         """
+        if binary:
+            return self._save_session_binary(filename)
         try:
             header = ["#ARCTRIGGER_SESSION_V1"]
             header.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
@@ -145,7 +157,23 @@ class ArcTriggerApp(tk.Tk):
         except Exception as e:
             logging.error(f"[ArcTriggerApp.save_session] ❌ Save failed: {e}")
 
-    
+    def _save_session_binary(self, filename: str):
+        try:
+            records = []
+            for frame in self.order_frames:
+                try:
+                    records.append(frame.to_record())
+                except Exception as e:
+                    logging.error(f"[ArcTriggerApp.save_session] Failed to serialize frame: {e}")
+
+            tmpfile = filename + ".tmp"
+            with open(tmpfile, "wb") as f:
+                f.write(codec.dumps_session(records))
+            os.replace(tmpfile, filename)
+            logging.info(f"[ArcTriggerApp.save_session] ✓ Saved {len(records)} frames (binary) → {filename}")
+        except Exception as e:
+            logging.error(f"[ArcTriggerApp.save_session] ❌ Save failed: {e}")
+
     def load_session(self, filename: str = "arctrigger.dat", auto=False):
         """
         Robust load with version + timestamp check.
@@ -155,6 +183,10 @@ class ArcTriggerApp(tk.Tk):
             logging.info("[ArcTriggerApp.load_session] No session file found.")
             return False
 
+        with open(filename, "rb") as f:
+            if codec.is_binary(f.read(len(codec.MAGIC))):
+                return self._load_session_binary(filename, auto)
+
         try:
             with open(filename, "r", encoding="utf-8") as f:
                 lines = [ln.strip() for ln in f if ln.strip()]
@@ -199,6 +231,36 @@ class ArcTriggerApp(tk.Tk):
         return restored > 0
 
 
+    def _load_session_binary(self, filename: str, auto=False):
+        try:
+            with open(filename, "rb") as f:
+                created, records = codec.loads_session(f.read(), AppModel)
+        except Exception as e:
+            logging.error(f"[ArcTriggerApp.load_session] Failed to read {filename}: {e}")
+            return False
+
+        if auto and time.time() - created > 15 * 60:
+            logging.info("[ArcTriggerApp.load_session] Last session too old, skipping auto-restore.")
+            return False
+
+        for frame in self.order_frames:
+            frame.destroy()
+        self.order_frames.clear()
+
+        restored = 0
+        for i, record in enumerate(records, start=1):
+            try:
+                frame = OrderFrame.from_record(record, parent=self.order_container.scrollable_frame)
+                frame.pack(fill="x", pady=10, padx=10)
+                self.order_frames.append(frame)
+                restored += 1
+            except Exception as e:
+                logging.error(f"[ArcTriggerApp.load_session] Frame {i} failed: {e}")
+
+        logging.info(f"[ArcTriggerApp.load_session] Restored {restored}/{len(records)} frames.")
+        return restored > 0
+
+
     def start_auto_save_thread(self):
         """
         Background thread that saves the session every 15 minutes.
@@ -230,6 +292,7 @@ class ArcTriggerApp(tk.Tk):
 
             self.save_session("arctrigger.dat")
             logging.info("[ArcTriggerApp.on_exit] Final session autosaved.")
+            order_journal.close()
         except Exception as e:
             logging.error(f"[ArcTriggerApp.on_exit] Error during final save: {e}")
         finally:
@@ -295,26 +358,40 @@ class ArcTriggerApp(tk.Tk):
                 logging.info(f"Failed to cancel watcher {order_id}: {e}")
                 messagebox.showerror("Error", f"Failed to cancel watcher {order_id}: {e}")
 
+        version = 0
+
         def refresh():
-            # Clear and re-populate
-            for i in tree.get_children():
-                tree.delete(i)
-            for w in watcher_info.list_all():
-                order_id = w["order_id"]
-                # Insert row
-                tree.insert("", "end", values=(
+            nonlocal version
+            if not win.winfo_exists():
+                return
+            # Only rows that changed since the last poll, keyed by order_id
+            feed = watcher_info.changes_since(version)
+            version = feed["version"]
+            changed = {w["order_id"]: w for w in feed["changed"]}
+            if feed["full"]:
+                for iid in tree.get_children():
+                    if iid not in changed:
+                        tree.delete(iid)
+            for iid in feed["removed"]:
+                if tree.exists(iid):
+                    tree.delete(iid)
+            for order_id, w in changed.items():
+                values = (
                     order_id, w["symbol"], w["watcher_type"], w["mode"],
                     w["status_label"], w["stop_loss"], w["last_price"],
                     w["start_time"][:19], "Cancel"
-                ))
+                )
+                if tree.exists(order_id):
+                    tree.item(order_id, values=values)
+                else:
+                    tree.insert("", "end", iid=order_id, values=values)
             win.after(2000, refresh)
 
         def on_tree_click(event):
             item = tree.identify_row(event.y)
             col = tree.identify_column(event.x)
             if col == f"#{len(cols)}" and item:  # 'Action' column
-                order_id = tree.item(item)["values"][0]
-                on_cancel(order_id)
+                on_cancel(item)   # row iid is the order_id
 
         tree.bind("<Button-1>", on_tree_click)
         refresh()
@@ -367,18 +444,16 @@ class ArcTriggerApp(tk.Tk):
     # ------------------------------------------------------------------
     def toggle_debug(self):
         if self.debug_frame and self.debug_frame.winfo_exists():
+            for h in log_pipeline.handlers(TkinterHandler):
+                log_pipeline.remove_handler(h)
             self.debug_frame.destroy()
             self.debug_frame = None
-            for h in logging.handlers[:]:
-                if isinstance(h, TkinterHandler):
-                    logging.removeHandler(h)
         else:
             self.debug_frame = DebugFrame(self)
             self.debug_frame.pack(fill="both", expand=True, padx=10, pady=10)
             handler = TkinterHandler(self.debug_frame)
             handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
-            logging.addHandler(handler)
-            logging.setLevel(logging.INFO)
+            log_pipeline.add_handler(handler)
 
 
 # ---------- ENTRY ----------
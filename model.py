@@ -4,9 +4,11 @@ import uuid
 from Services.price_watcher import PriceWatcher
 from Services.tws_service import create_tws_service, TWSService
 from Services.polygon_service import polygon_service
+from Services.rate_limiter import PRIORITY_UI
 from Services.order_wait_service import wait_service
 from Services.order_manager import order_manager
 from Helpers.Order import Order, OrderState
+from Helpers import codec
 import random
 import time
 from Services.nasdaq_info import is_market_closed_or_pre_market
@@ -38,7 +40,7 @@ class GeneralApp:
         return self._tws.pre_conid(order)
 
 
-    def save(self, filename: Optional[str] = "ARCTRIGGER.DAT") -> str:
+    def save(self, filename: Optional[str] = "ARCTRIGGER.DAT", binary: bool = False) -> str:
         """
         Save all models to ARCTRIGGER.DAT (or given filename) in this format:
 
@@ -48,8 +50,19 @@ class GeneralApp:
             AppModel:...
             ...
 
+        binary=True writes the Helpers.codec format instead; load() detects it.
         Returns the filename used.
         """
+        if binary:
+            try:
+                with open(filename, "wb") as f:
+                    f.write(codec.dumps_models(self._models))
+                logging.info(f"[GeneralApp.save()] Saved {len(self._models)} models (binary) → {filename}")
+            except Exception as e:
+                logging.error(f"[GeneralApp.save()] Failed to save models: {e}")
+                raise
+            return filename
+
         lines = [str(len(self._models))]
         for m in self._models:
             serialized = m.serialize()
@@ -72,8 +85,8 @@ class GeneralApp:
         Each model may consume 1 or 2 lines depending on whether it has an order.
         """
         try:
-            with open(filename, "r", encoding="utf-8") as f:
-                lines = [ln.strip() for ln in f if ln.strip()]
+            with open(filename, "rb") as f:
+                raw = f.read()
         except FileNotFoundError:
             logging.warning(f"[GeneralApp.load()] File not found: {filename}")
             return
@@ -81,6 +94,24 @@ class GeneralApp:
             logging.error(f"[GeneralApp.load()] Failed to read file: {e}")
             return
 
+        if codec.is_binary(raw):
+            try:
+                models = codec.loads_models(raw, AppModel)
+            except Exception as e:
+                logging.error(f"[GeneralApp.load()] Invalid binary file: {e}")
+                return
+            self._models.clear()
+            self._models.update(models)
+            logging.info(f"[GeneralApp.load()] Restored {len(models)} models (binary) from {filename}")
+            self._reattach_orders()
+            return
+
+        try:
+            lines = [ln.strip() for ln in raw.decode("utf-8").splitlines() if ln.strip()]
+        except UnicodeDecodeError as e:
+            logging.error(f"[GeneralApp.load()] Failed to read file: {e}")
+            return
+
         if not lines:
             logging.warning(f"[GeneralApp.load()] File empty: {filename}")
             return
@@ -109,7 +140,9 @@ class GeneralApp:
                 idx += 1  # skip to next line safely
 
         logging.info(f"[GeneralApp.load()] Restored {loaded}/{count} models from {filename}")
+        self._reattach_orders()
 
+    def _reattach_orders(self):
         # Reattach pending orders (safe)
         for model in self._models:
             if model.order and (model.order.state in (OrderState.PENDING, OrderState.ACTIVE)):
@@ -255,10 +288,10 @@ class GeneralApp:
             raise RuntimeError("GeneralApp: TWS not connected")
         return self._tws.search_symbol(query)
 
-    def get_snapshot(self, symbol: str):
+    def get_snapshot(self, symbol: str, priority: int = PRIORITY_UI):
         if not self._polygon:
             raise RuntimeError("GeneralApp: Polygon not connected")
-        return self._polygon.get_snapshot(symbol)
+        return self._polygon.get_snapshot(symbol, priority=priority)
 
     def get_maturity(self, symbol: str) -> Optional[str]:
         if not self._tws:
@@ -898,6 +931,14 @@ class AppModel:
 
         return model, consumed
 
+    def to_bytes(self) -> bytes:
+        """Binary form (Helpers.codec), including the attached order."""
+        return codec.dumps_models([self])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "AppModel":
+        return codec.loads_models(data, cls)[0]
+
 
 
 # --- Per-symbol model registry ---
@@ -15,10 +15,14 @@ def open_positions_window(parent):
 
     columns = (
         "UUID", "Symbol", "Qty", "Avg", "Mid", "PnL",
-        "Delta", "Gamma", "Theta", "Vega",
+        "IV", "Delta", "Gamma", "Theta", "Vega",
         "Exposure", "Status", "Stale", "Action"
     )
 
+    toolbar = ttk.Frame(win)
+    toolbar.pack(fill="x")
+    ttk.Button(toolbar, text="Scenarios", command=lambda: _open_scenarios(win)).pack(side="left", padx=5, pady=4)
+
     tree = ttk.Treeview(win, columns=columns, show="headings", height=20)
     tree.pack(fill="both", expand=True)
 
@@ -29,6 +33,7 @@ def open_positions_window(parent):
     tree.column("Avg", width=70)
     tree.column("Mid", width=70)
     tree.column("PnL", width=90)
+    tree.column("IV", width=60)
     tree.column("Delta", width=70)
     tree.column("Gamma", width=70)
     tree.column("Theta", width=70)
@@ -59,47 +64,72 @@ def open_positions_window(parent):
         item = tree.identify_row(event.y)
         col = tree.identify_column(event.x)
 
-        if col == f"#{len(columns)}":
-            vals = tree.item(item)["values"]
-            if vals:
-                uuid = vals[0]
-                on_close(uuid)
+        if col == f"#{len(columns)}" and item:
+            on_close(item)      # row iid is the position uuid
 
     tree.bind("<Button-1>", on_tree_click)
 
-    # Periodic refresh
+    # Periodic refresh – apply row-level diffs against the last snapshot seen
+    shown = {}          # uuid → values currently in the tree
+    seen_version = -1
+
     def refresh():
-        for r in tree.get_children():
-            tree.delete(r)
+        nonlocal seen_version
+        if not win.winfo_exists():
+            return
 
         try:
-            positions = options_manager.list_positions()
+            snap = options_manager.snapshot()
         except Exception as e:
             logging.error(f"[opmng_ui] Failed to fetch positions: {e}")
             win.after(REFRESH_MS, refresh)
             return
 
-        for pos in positions:
-            pnl = pos["unrealized_pnl"]
-            pnl_str = f"{pnl:.2f}" if pnl is not None else "-"
-
-            tree.insert("", "end", values=(
-                pos["uuid"],
-                pos["symbol"],
-                pos["qty"],
-                round(pos["avg_price"], 4) if pos["avg_price"] else "-",
-                round(pos["mid"], 4) if pos["mid"] else "-",
-                pnl_str,
-                round(pos["delta"], 4) if pos["delta"] else "-",
-                round(pos["gamma"], 4) if pos["gamma"] else "-",
-                round(pos["theta"], 4) if pos["theta"] else "-",
-                round(pos["vega"], 4) if pos["vega"] else "-",
-                round(pos["exposure"], 2) if pos["exposure"] else "-",
-                pos["status"],
-                "YES" if pos["stale"] else "NO",
-                "Close"
-            ))
+        if snap.version != seen_version:
+            seen_version = snap.version
+
+            for uuid in [u for u in shown if u not in snap.rows]:
+                tree.delete(uuid)
+                del shown[uuid]
+
+            for uuid, pos in snap.rows.items():
+                values = _row_values(pos)
+                if uuid not in shown:
+                    tree.insert("", "end", iid=uuid, values=values)
+                elif shown[uuid] != values:
+                    tree.item(uuid, values=values)
+                else:
+                    continue
+                shown[uuid] = values
 
         win.after(REFRESH_MS, refresh)
 
     refresh()
+
+
+def _open_scenarios(parent):
+    from scenario_view import ScenarioView
+    ScenarioView(parent)
+
+
+def _row_values(pos):
+    pnl = pos["unrealized_pnl"]
+    pnl_str = f"{pnl:.2f}" if pnl is not None else "-"
+
+    return (
+        pos["uuid"],
+        pos["symbol"],
+        pos["qty"],
+        round(pos["avg_price"], 4) if pos["avg_price"] else "-",
+        round(pos["mid"], 4) if pos["mid"] else "-",
+        pnl_str,
+        f"{pos['iv']:.1%}" if pos["iv"] else "-",
+        round(pos["delta"], 4) if pos["delta"] else "-",
+        round(pos["gamma"], 4) if pos["gamma"] else "-",
+        round(pos["theta"], 4) if pos["theta"] else "-",
+        round(pos["vega"], 4) if pos["vega"] else "-",
+        round(pos["exposure"], 2) if pos["exposure"] else "-",
+        pos["status"],
+        "YES" if pos["stale"] else "NO",
+        "Close"
+    )
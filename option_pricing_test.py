@@ -0,0 +1,27 @@
+# option_pricing_test.py - expiry close timestamps across the EDT/EST switch
+#
+#   python -m pytest option_pricing_test.py     (or: python option_pricing_test.py)
+
+import datetime
+
+from Services.option_pricing import expiry_timestamp
+
+
+def _utc(ts: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).replace(tzinfo=None)
+
+
+def test_expiry_close_edt():
+    # July: 16:00 EDT (UTC-4) == 20:00 UTC
+    assert _utc(expiry_timestamp("20250718")) == datetime.datetime(2025, 7, 18, 20, 0)
+
+
+def test_expiry_close_est():
+    # November, after the switch: 16:00 EST (UTC-5) == 21:00 UTC
+    assert _utc(expiry_timestamp("20251121")) == datetime.datetime(2025, 11, 21, 21, 0)
+
+
+if __name__ == "__main__":
+    test_expiry_close_edt()
+    test_expiry_close_est()
+    print("✅ expiry_timestamp OK")
@@ -0,0 +1,52 @@
+# order_journal_test.py - a restored journal carries its positions into the risk caps
+#
+#   python -m pytest order_journal_test.py     (or: python order_journal_test.py)
+
+import os
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault("POLYGON_API_KEY", "test")
+
+from Services.order_journal import OrderJournal
+from Services.risk_book import risk_book
+
+
+def _fake_tws():
+    return SimpleNamespace(_positions_by_order_id={}, _ib_to_order_id={},
+                           _ib_to_custom_id={}, _pending_orders={})
+
+
+def test_restore_replays_positions_into_risk_book():
+    symbol = "JRNLTEST"
+    with tempfile.TemporaryDirectory() as d:
+        journal = OrderJournal(d, fsync=False)
+        journal.start()
+        journal.position("ord-1", {"symbol": symbol, "expiry": "20250718", "strike": 100.0,
+                                   "right": "C", "qty": 3, "avg_price": 2.5, "status": "Filled"})
+        assert journal.sync()
+        journal.close()
+
+        restarted = OrderJournal(d, fsync=False)
+        restarted.start()
+        try:
+            tws = _fake_tws()
+            counts = restarted.restore(tws, wait_service=None)
+        finally:
+            restarted.close()
+
+    assert counts["positions"] == 1
+    assert tws._positions_by_order_id["ord-1"]["qty"] == 3
+    exposure = risk_book.exposure(symbol)
+    assert exposure["contracts"] == 3
+    assert exposure["premium_at_risk"] == 750.0
+
+    risk_book.set_limits(symbol, max_contracts=4)
+    assert risk_book.reserve("ord-2", symbol, 2, 2.5) is not None      # 3 open + 2 > 4
+    assert risk_book.reserve("ord-2", symbol, 1, 2.5) is None
+    risk_book.release("ord-2")
+
+
+if __name__ == "__main__":
+    test_restore_replays_positions_into_risk_book()
+    print("✅ order_journal restore OK")
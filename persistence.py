@@ -1,11 +1,35 @@
 import sqlite3
 import json
 import os
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Iterator, Optional, Tuple
 
 DB_FILE = "arctrigger.sqlite"
 
+FLUSH_INTERVAL = 0.05      # seconds between writer commits
+MAX_RETRIES = 4            # failed attempts of a batch before it is dead-lettered
+RETRY_BACKOFF_MAX = 2.0    # seconds; retry delay doubles from FLUSH_INTERVAL up to this
+DEAD_LETTER_SUFFIX = ".deadletter.jsonl"
+READ_FLUSH_TIMEOUT = 0.5   # seconds a read waits for pending writes before reading anyway
+PAGE_SIZE = 500
+
+_COLUMNS = ("id", "symbol", "expiry", "strike", "right", "trigger_price", "position_size", "qty",
+            "sl_price", "tp_price", "order_type", "action", "created_at", "updated_at")
+# upsert, never REPLACE: created_at must keep its first value or the row
+# would jump around in (created_at, id) paging on every re-save
+_UPSERT_SQL = (
+    f"INSERT INTO order_ticket ({', '.join(_COLUMNS)}) VALUES ({','.join('?' * len(_COLUMNS))}) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in _COLUMNS if c not in ("id", "created_at"))
+)
+_DELETE_SQL = "DELETE FROM order_ticket WHERE id=?"
+
 # ---------- low-level helpers ----------
 @contextmanager
 def get_conn():
@@ -33,23 +57,235 @@ def init_db():
             created_at        TEXT DEFAULT CURRENT_TIMESTAMP,
             updated_at        TEXT DEFAULT CURRENT_TIMESTAMP
           )""")
+        # paging by (created_at, id), optionally per symbol
+        c.execute("CREATE INDEX IF NOT EXISTS idx_ticket_created ON order_ticket (created_at, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_ticket_symbol_created ON order_ticket (symbol, created_at, id)")
+
+# ---------- background writer ----------
+class TicketWriter:
+    """
+    Owns the only write connection. save/delete calls just record the
+    latest mutation per ticket id (so repeated writes to one id coalesce);
+    every FLUSH_INTERVAL the thread commits everything pending in one
+    transaction. flush() is the barrier for shutdown and read-your-writes.
+
+    A failing batch is retried with exponential backoff; after MAX_RETRIES
+    failures (or at shutdown) it is appended to <DB_FILE>.deadletter.jsonl
+    instead, so a broken database can't wedge the writer or its readers.
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._pending: "OrderedDict[str, Optional[tuple]]" = OrderedDict()   # id → row, None = delete
+        self._gen = 0            # mutations accepted
+        self._done = 0           # mutations committed
+        self._flush_now = False
+        self._running = False
+        self._failures = 0       # consecutive failed attempts (writer thread)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"mutations": 0, "coalesced": 0, "commits": 0, "rows": 0, "errors": 0, "dead_lettered": 0}
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        try:
+            init_db()
+        except sqlite3.Error as e:
+            # still start: batches then fail the same way and get retried / dead-lettered
+            logging.error("[Persistence] init_db failed on %s: %s", DB_FILE, e)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="TicketWriter")
+        self._thread.start()
+
+    def submit(self, ticket_id: str, row: Optional[tuple]):
+        if not self._running:
+            self.start()
+        with self._cond:
+            if ticket_id in self._pending:
+                self.stats["coalesced"] += 1
+                self._pending.move_to_end(ticket_id)
+            self._pending[ticket_id] = row
+            self._gen += 1
+            self.stats["mutations"] += 1
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Block until every mutation submitted before this call is settled.
+        False on timeout, or if some of them had to be dead-lettered.
+        """
+        with self._cond:
+            target = self._gen
+            if self._done >= target:
+                return True
+            dead = self.stats["dead_lettered"]
+            self._flush_now = True
+            self._cond.notify_all()
+            settled = self._cond.wait_for(lambda: self._done >= target or not self._running, timeout)
+            return settled and self.stats["dead_lettered"] == dead
+
+    @property
+    def backing_off(self) -> bool:
+        """A batch failed and is waiting for its retry; a flush() would just sit out the backoff."""
+        return self._failures > 0
+
+    def close(self, timeout: float = 5.0):
+        if not self._running:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    if self._failures:
+                        # backing off: flush() can't cut the delay short, only close() can
+                        delay = min(self.interval * 2 ** self._failures, RETRY_BACKOFF_MAX)
+                        self._cond.wait_for(lambda: not self._running, delay)
+                    else:
+                        self._cond.wait_for(lambda: self._flush_now or not self._running, self.interval)
+                    batch, self._pending = self._pending, OrderedDict()
+                    gen = self._gen
+                    self._flush_now = False
+                    stopping = not self._running
+                settled = self._settle(batch, stopping) if batch else True
+                with self._cond:
+                    if settled:
+                        self._done = gen
+                    self._cond.notify_all()
+                if stopping:
+                    return
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _settle(self, batch, stopping: bool) -> bool:
+        """Commit, or requeue for a retry, or dead-letter. True unless requeued."""
+        error = self._commit(batch)
+        if error is None:
+            self._failures = 0
+            return True
+        self._failures += 1
+        self.stats["errors"] += 1
+        if self._failures <= MAX_RETRIES and not stopping:
+            logging.warning("[Persistence] Ticket batch of %d failed (attempt %d/%d), retrying: %s",
+                            len(batch), self._failures, MAX_RETRIES + 1, error)
+            with self._cond:
+                # requeue unless a newer mutation for the same id arrived meanwhile
+                for tid, row in batch.items():
+                    if tid not in self._pending:
+                        self._pending[tid] = row
+                        self._pending.move_to_end(tid, last=False)
+            return False
+        self._failures = 0
+        self._dead_letter(batch, error)
+        return True
+
+    def _commit(self, batch) -> Optional[str]:
+        """One transaction for the whole batch. Returns the error, or None on success."""
+        saves = [row for row in batch.values() if row is not None]
+        deletes = [(tid,) for tid, row in batch.items() if row is None]
+        try:
+            if self._conn is None:
+                self._conn = sqlite3.connect(DB_FILE, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            conn = self._conn
+            conn.execute("BEGIN")
+            if saves:
+                conn.executemany(_UPSERT_SQL, saves)
+            if deletes:
+                conn.executemany(_DELETE_SQL, deletes)
+            conn.execute("COMMIT")
+            self.stats["commits"] += 1
+            self.stats["rows"] += len(batch)
+            return None
+        except sqlite3.Error as e:
+            if self._conn is not None:
+                # reopen on the next attempt
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
+            return str(e)
+
+    def _dead_letter(self, batch, error: str):
+        path = DB_FILE + DEAD_LETTER_SUFFIX
+        self.stats["dead_lettered"] += len(batch)
+        logging.error("[Persistence] Giving up on ticket batch of %d after %d attempts (%s) – written to %s",
+                      len(batch), MAX_RETRIES + 1, error, path)
+        ts = time.time()
+        lines = [json.dumps({"ts": ts, "error": error, "id": tid,
+                             "op": "delete" if row is None else "save",
+                             "row": None if row is None else dict(zip(_COLUMNS, row))}, default=str)
+                 for tid, row in batch.items()]
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logging.error("[Persistence] Dead-letter write failed (%s); lost: %s", e, lines)
+
+ticket_writer = TicketWriter()
+atexit.register(ticket_writer.close)
 
 # ---------- CRUD ----------
 def save_ticket(t: Dict) -> None:
-    with get_conn() as c:
-        c.execute("REPLACE INTO order_ticket VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-                  (t["id"], t["symbol"], t["expiry"], t["strike"],
-                   t["right"], t.get("trigger_price"), t.get("position_size"),
-                   t.get("qty"), t.get("sl_price"), t.get("tp_price"),
-                   t.get("order_type", "LMT"), t.get("action", "BUY"),
-                   t.get("created_at"), t.get("updated_at")))
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    ticket_writer.submit(t["id"], (
+        t["id"], t["symbol"], t["expiry"], t["strike"],
+        t["right"], t.get("trigger_price"), t.get("position_size"),
+        t.get("qty"), t.get("sl_price"), t.get("tp_price"),
+        t.get("order_type", "LMT"), t.get("action", "BUY"),
+        t.get("created_at") or now, t.get("updated_at") or now))
 
-def load_all_tickets() -> List[Dict]:
+def delete_ticket(ticket_id: str) -> None:
+    ticket_writer.submit(ticket_id, None)
+
+def flush(timeout: Optional[float] = 5.0) -> bool:
+    """Barrier: everything saved/deleted so far is on disk."""
+    return ticket_writer.flush(timeout)
+
+def load_tickets(symbol: Optional[str] = None, limit: int = PAGE_SIZE,
+                 after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+    """
+    One page of tickets ordered by (created_at, id). Pass the
+    (created_at, id) of the last row as `after` to get the next page.
+    """
+    # read-your-writes, but a page never waits out a retrying writer
+    if not ticket_writer.backing_off:
+        ticket_writer.flush(READ_FLUSH_TIMEOUT)
+    where, args = [], []
+    if symbol is not None:
+        where.append("symbol = ?")
+        args.append(symbol)
+    if after is not None:
+        where.append("(created_at, id) > (?, ?)")
+        args.extend(after)
+    sql = "SELECT * FROM order_ticket"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at, id LIMIT ?"
+    args.append(limit)
     with get_conn() as c:
         c.row_factory = sqlite3.Row
-        rows = c.execute("SELECT * FROM order_ticket ORDER BY created_at").fetchall()
-        return [dict(r) for r in rows]
+        return [dict(r) for r in c.execute(sql, args).fetchall()]
 
-def delete_ticket(ticket_id: str) -> None:
-    with get_conn() as c:
-        c.execute("DELETE FROM order_ticket WHERE id=?", (ticket_id,))
\ No newline at end of file
+def iter_tickets(symbol: Optional[str] = None, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+    after = None
+    while True:
+        page = load_tickets(symbol, page_size, after)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = (page[-1]["created_at"], page[-1]["id"])
+
+def load_all_tickets() -> List[Dict]:
+    return list(iter_tickets())
@@ -0,0 +1,90 @@
+# persistence_test.py - ticket writer retries, dead-letters a broken batch, never stalls reads
+#
+#   python -m pytest persistence_test.py     (or: python persistence_test.py)
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import persistence as p
+
+
+def _ticket(i: int) -> dict:
+    return {"id": f"t{i}", "symbol": "TSLA", "expiry": "20251219", "strike": 250.0, "right": "C",
+            "trigger_price": 251.0, "qty": i + 1}
+
+
+def _broken_db(directory: str) -> str:
+    """A DB whose order_ticket table lacks the ticket columns, so every upsert raises sqlite3.Error."""
+    path = os.path.join(directory, "tickets.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE order_ticket (id TEXT PRIMARY KEY, created_at TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _with_writer(directory: str, interval: float):
+    saved = p.DB_FILE, p.ticket_writer
+    p.DB_FILE = _broken_db(directory)
+    p.ticket_writer = p.TicketWriter(interval)
+    return saved
+
+
+def _restore(saved):
+    p.DB_FILE, p.ticket_writer = saved
+
+
+def test_failed_batch_is_retried_then_dead_lettered():
+    with tempfile.TemporaryDirectory() as d:
+        saved = _with_writer(d, interval=0.005)
+        writer = p.ticket_writer
+        try:
+            p.save_ticket(_ticket(0))
+            p.save_ticket(_ticket(1))
+            p.delete_ticket("t2")
+            assert p.flush(timeout=5.0) is False
+            assert writer.stats["errors"] == p.MAX_RETRIES + 1
+            assert writer.stats["commits"] == 0
+            assert writer.stats["dead_lettered"] == 3
+            assert p.flush(timeout=1.0) is True          # nothing left pending
+
+            with open(p.DB_FILE + p.DEAD_LETTER_SUFFIX, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        finally:
+            writer.close(timeout=1.0)
+            _restore(saved)
+
+    assert [(r["id"], r["op"]) for r in lines] == [("t0", "save"), ("t1", "save"), ("t2", "delete")]
+    assert lines[1]["row"]["qty"] == 2 and lines[1]["row"]["symbol"] == "TSLA"
+    assert lines[2]["row"] is None
+    assert all("order_ticket" in r["error"] for r in lines)
+
+
+def test_reads_skip_the_barrier_while_backing_off():
+    with tempfile.TemporaryDirectory() as d:
+        saved = _with_writer(d, interval=0.5)          # retries wait 1 s, then 2 s
+        writer = p.ticket_writer
+        try:
+            p.save_ticket(_ticket(0))
+            deadline = time.monotonic() + 5.0
+            while not writer.backing_off and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert writer.backing_off
+
+            start = time.monotonic()
+            assert p.load_tickets() == []
+            assert time.monotonic() - start < 0.25
+        finally:
+            writer.close(timeout=0.1)                   # shutdown dead-letters instead of retrying
+            _restore(saved)
+
+    assert writer.stats["dead_lettered"] == 1
+
+
+if __name__ == "__main__":
+    test_failed_batch_is_retried_then_dead_lettered()
+    test_reads_skip_the_barrier_while_backing_off()
+    print("✅ ticket writer retries / dead-letter OK")
@@ -0,0 +1,109 @@
+# scenario_view.py
+
+import tkinter as tk
+from tkinter import ttk
+import logging
+import time
+
+from Services.options_manager import options_manager
+from Services.scenario_engine import ScenarioGrid, scenario_pnl
+
+
+REFRESH_MS = 1000          # same cadence as the Position Monitor
+RECOMPUTE_SEC = 60         # re-run even without position changes (time decay)
+
+
+class ScenarioView(tk.Toplevel):
+    """
+    Portfolio P&L over underlying move (rows) × IV shift (columns) for a
+    chosen number of days of decay. Recomputed when OptionsManager publishes
+    a new position snapshot.
+    """
+
+    def __init__(self, parent, grid: ScenarioGrid = ScenarioGrid()):
+        super().__init__(parent)
+        self.title("ArcTrigger — Scenarios")
+        self.geometry("900x700")
+
+        self.grid_spec = grid
+        self._result = None
+        self._version = -1
+        self._computed_at = 0.0
+
+        # ---------- Controls ----------
+        top = ttk.Frame(self)
+        top.pack(fill="x", padx=8, pady=6)
+
+        ttk.Label(top, text="Days forward:").pack(side="left")
+        self.days_var = tk.StringVar(value=str(grid.days[0]))
+        days_box = ttk.Combobox(top, textvariable=self.days_var, width=5, state="readonly",
+                                values=[str(d) for d in grid.days])
+        days_box.pack(side="left", padx=5)
+        days_box.bind("<<ComboboxSelected>>", lambda _e: self._render())
+
+        self.summary = ttk.Label(top, text="")
+        self.summary.pack(side="left", padx=15)
+
+        # ---------- Grid ----------
+        columns = ["Move"] + [f"IV {s * 100:+.0f}" for s in grid.iv_shifts]
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=len(grid.moves))
+        for c in columns:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=90, anchor="e")
+        self.tree.tag_configure("loss", foreground="red")
+        self.tree.tag_configure("gain", foreground="green")
+        self.tree.tag_configure("flat", background="#eeeeee")
+
+        scroll_y = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll_y.set)
+        scroll_y.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+
+        for i, move in enumerate(grid.moves):
+            self.tree.insert("", "end", iid=str(i), values=[f"{move * 100:+.1f}%"] + [""] * len(grid.iv_shifts),
+                             tags=("flat",) if move == 0 else ())
+
+        self._refresh()
+
+    # ------------------------------------------------------------------
+    def _refresh(self):
+        if not self.winfo_exists():
+            return
+        try:
+            snap = options_manager.snapshot()
+            stale = time.time() - self._computed_at > RECOMPUTE_SEC
+            if snap.version != self._version or stale:
+                self._version = snap.version
+                self._computed_at = time.time()
+                self._result = scenario_pnl(snap.book, self.grid_spec)
+                self._render()
+        except Exception as e:
+            logging.error(f"[ScenarioView] refresh failed: {e}")
+        self.after(REFRESH_MS, self._refresh)
+
+    def _render(self):
+        r = self._result
+        if r is None:
+            return
+        try:
+            d = list(self.grid_spec.days).index(float(self.days_var.get()))
+        except ValueError:
+            d = 0
+
+        for i, move in enumerate(self.grid_spec.moves):
+            row = r.pnl[i, :, d]
+            tags = ("flat",) if move == 0 else ()
+            if move != 0 and r.positions:
+                tags = ("loss",) if row.mean() < 0 else ("gain",)
+            self.tree.item(str(i), values=[f"{move * 100:+.1f}%"] + [f"{v:,.0f}" for v in row], tags=tags)
+
+        if not r.positions:
+            self.summary.configure(text=f"No priceable positions ({r.skipped} without IV/underlying)")
+            return
+        worst, best = r.worst(), r.best()
+        self.summary.configure(text=(
+            f"{r.positions} positions, {self.grid_spec.size} scenarios in {r.elapsed_ms:.0f} ms   "
+            f"worst {worst['pnl']:,.0f} ({worst['move'] * 100:+.1f}%, IV {worst['iv_shift'] * 100:+.0f}, "
+            f"{worst['days']}d)   best {best['pnl']:,.0f}"
+            + (f"   skipped {r.skipped}" if r.skipped else "")
+        ))
@@ -8,6 +8,7 @@ from model import general_app, get_model, AppModel
 from Services import nasdaq_info
 from Services.order_manager import order_manager
 from Helpers.Order import OrderState
+from Helpers.codec import FrameRecord
 from Services.nasdaq_info import is_market_closed_or_pre_market
 from Services.order_wait_service import wait_service
 from Services.amo_service import amo, LOSS
@@ -998,6 +999,22 @@ class OrderFrame(tk.Frame):
             elif p.startswith("symbol="):
                 symbol = p.split("=", 1)[1]
 
+        frame = cls._restore(parent, frame_id, state, symbol)
+        consumed = 1
+
+        # --- Parse attached model if present ---
+        if len(lines) > 1 and lines[1].startswith("AppModel:"):
+            try:
+                model, used = AppModel.deserialize(lines[1:3])
+                frame.model = model
+                consumed += used
+            except Exception as e:
+                logging.error(f"[OrderFrame.deserialize] Model restore failed: {e}")
+
+        return frame, consumed
+
+    @classmethod
+    def _restore(cls, parent, frame_id, state, symbol) -> "OrderFrame":
         # --- Instantiate frame ---
         frame = cls(parent)
         frame.frame_id = frame_id
@@ -1013,19 +1030,21 @@ class OrderFrame(tk.Frame):
                 logging.info(f"[OrderFrame.deserialize] Restored symbol {symbol}")
         except Exception as e:
             logging.error(f"[OrderFrame.deserialize] Symbol restore failed: {e}")
+        return frame
 
-        consumed = 1
+    def to_record(self) -> FrameRecord:
+        """Binary-session counterpart of serialize() (see Helpers.codec)."""
+        symbol = getattr(self.model, "symbol", None) if hasattr(self, "model") else None
+        return FrameRecord(str(getattr(self, "frame_id", id(self))), getattr(self, "_view_state", "UNKNOWN"),
+                           symbol, getattr(self, "model", None))
 
-        # --- Parse attached model if present ---
-        if len(lines) > 1 and lines[1].startswith("AppModel:"):
-            try:
-                model, used = AppModel.deserialize(lines[1:3])
-                frame.model = model
-                consumed += used
-            except Exception as e:
-                logging.error(f"[OrderFrame.deserialize] Model restore failed: {e}")
-
-        return frame, consumed
+    @classmethod
+    def from_record(cls, record: FrameRecord, parent) -> "OrderFrame":
+        """Counterpart of deserialize() for a FrameRecord read from a binary session."""
+        frame = cls._restore(parent, record.frame_id, record.state or "UNKNOWN", record.symbol)
+        if record.model is not None:
+            frame.model = record.model
+        return frame
     
 
 class ScrollableFrame(ttk.Frame):